@@ -0,0 +1,52 @@
+"""
+Throughput comparison of the HTML extractor backends.
+
+    python -m benchmarks.bench_html_extractor --records 2000
+"""
+import argparse
+import time
+from pathlib import Path
+
+from pipelib.components.core.record import Record
+from pipelib.components.core.settings import PipelineConfig
+from pipelib.components.modifiers.html_extractor import HTMLExtractorModifier, HTML_BACKENDS, etree
+
+PAGE = (
+    "<html><head><title>Page {i}</title><script>var tracking = {i};</script><style>p {{ color: red; }}</style></head>"
+    "<body><nav><a href='/'>Home</a> <a href='/about'>About</a></nav>"
+    "<div class='content'><h1>Article {i}</h1>"
+    "<p>The quick brown fox jumps over the lazy dog. It was <b>not</b> the first time &amp; "
+    "it would <em>not</em> be the last.</p>"
+    "<ul><li>First point</li><li>Second point with <a href='#'>a link</a></li></ul>"
+    "<pre><code>print('skipped')</code></pre>"
+    "<p>Another paragraph with enough text to be kept by the extractor, {i} times over.</p></div>"
+    "<div class='sidebar'>Related links</div><footer>Copyright</footer></body></html>"
+)
+
+
+def bench_backend(backend: str, pages: list[str]) -> float:
+    config = PipelineConfig(input_path=Path(''), output_dir=Path(''), html_backend=backend)
+    modifier = HTMLExtractorModifier(config)
+    records = [Record(page, url='') for page in pages]
+    start = time.perf_counter()
+    for record in records:
+        modifier.process(record)
+    elapsed = time.perf_counter() - start
+    return len(records) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTML extractor backend benchmark")
+    parser.add_argument('--records', type=int, default=2000, help="Number of HTML pages to extract")
+    args = parser.parse_args()
+
+    pages = [PAGE.format(i=i) for i in range(args.records)]
+    for backend in HTML_BACKENDS:
+        if backend == 'lxml' and etree is None:
+            print(f'{backend:>8}: skipped (lxml not installed)')
+            continue
+        print(f'{backend:>8}: {bench_backend(backend, pages):,.0f} rec/s')
+
+
+if __name__ == '__main__':
+    main()
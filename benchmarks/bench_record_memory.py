@@ -0,0 +1,69 @@
+"""
+Bytes held per in-flight record after normalization and attribute evaluation, with the
+original text and token list kept (before) against lazy originals and released tokens (after).
+
+    python -m benchmarks.bench_record_memory --records 20000
+"""
+import argparse
+import json
+import random
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+from pipelib.components.core.record import Record
+from pipelib.components.modifiers.attribute_evaluate import evaluate_text
+from pipelib.components.modifiers.normalize import normalize_text
+from pipelib.io.reader import JsonlReader
+
+WORDS = "the of and to in data pipeline record memory text token café naïve «quoted» value".split()
+
+
+def write_corpus(path: Path, n_records: int, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8') as handle:
+        for i in range(n_records):
+            text = '  '.join(' '.join(rng.choices(WORDS, k=rng.randint(50, 400))) for _ in range(3))
+            handle.write(json.dumps({'text': text, 'url': f'https://example.com/{i}'}) + '\n')
+
+
+def process(record: Record, release: bool) -> Record:
+    record.cleaned = normalize_text(record.cleaned)
+    record.tokens, record.char_count, _, _ = evaluate_text(record.cleaned)
+    record.token_count = len(record.tokens)
+    if release:
+        record.release()
+    return record
+
+
+def measure(path: Path, lazy: bool) -> tuple[float, int]:
+    tracemalloc.start()
+    records = []
+    for record in JsonlReader(path):
+        if not lazy:
+            # Pin the decoded text, as records did before originals were read back from the input
+            record.original = record.cleaned
+        records.append(process(record, release=lazy))
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current / len(records), len(records)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record memory benchmark")
+    parser.add_argument('--records', type=int, default=20_000, help="Records held in flight")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / 'corpus.jsonl'
+        write_corpus(path, args.records)
+        before, n = measure(path, lazy=False)
+        after, _ = measure(path, lazy=True)
+    print(f'{n} records in flight')
+    print(f'  before: {before:,.0f} bytes/record (original and tokens kept)')
+    print(f'   after: {after:,.0f} bytes/record (lazy original, tokens released)')
+    print(f'   saved: {1 - after / before:.1%}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,279 @@
+"""
+Benchmark suite on the synthetic corpus of benchmarks.corpus: a micro-benchmark of every step
+class, run record by record on the records that reach it, and end-to-end throughput and record
+latency of the pipeline in each executor mode. Results are written as JSON and compared against a
+baseline, exiting with status 1 when a metric is worse than the baseline by more than the threshold.
+Steps whose models cannot be loaded are reported as skipped and left out of the pipeline.
+
+    python -m benchmarks.bench_suite --records 5000 --save-baseline baseline.json
+    python -m benchmarks.bench_suite --records 5000 --baseline baseline.json --output results.json
+"""
+import argparse
+import dataclasses
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.corpus import write_corpus
+from pipelib.components.core.models import models, required_models
+from pipelib.components.core.pipeline import Pipeline
+from pipelib.components.core.record import Record
+from pipelib.components.core.settings import PipelineConfig
+from pipelib.components.filters import CodeSnippetFilter, DedupFilter, LanguageFilter, PreliminaryFilter, ToxicityFilter
+from pipelib.components.modifiers import AttributeEvaluationStep, HTMLExtractorModifier, NormalizeModifier, PIIModifier
+from pipelib.io import JsonlReader, RecordWriter
+
+# The steps of main.setup_pipeline, in order
+STEPS = [
+    NormalizeModifier,
+    AttributeEvaluationStep,
+    PreliminaryFilter,
+    HTMLExtractorModifier,
+    CodeSnippetFilter,
+    DedupFilter,
+    LanguageFilter,
+    ToxicityFilter,
+    PIIModifier,
+]
+
+# Metrics compared against the baseline, and whether higher is better
+METRICS = {'records_per_second': True, 'latency_p95_ms': False}
+
+
+def modes(workers: int, batch_size: int, process_workers: int) -> dict[str, dict]:
+    """Config overrides of each executor mode of Pipeline.process."""
+    return {
+        'serial': {'workers': 1, 'batch_size': 1},
+        'threads': {'workers': workers, 'batch_size': 1},
+        'batch': {'workers': 1, 'batch_size': batch_size},
+        'threads_batch': {'workers': workers, 'batch_size': batch_size},
+        'processes': {'workers': workers, 'batch_size': batch_size, 'process_workers': process_workers},
+    }
+
+
+def available_steps(with_models: bool) -> dict[type, str | None]:
+    """Each step class with the reason it is skipped, or None when it can run."""
+    skipped = {}
+    for step_class in STEPS:
+        names = required_models(step_class)
+        skipped[step_class] = None
+        if names and not with_models:
+            skipped[step_class] = 'models disabled'
+            continue
+        models.warm_up(names)
+        try:
+            models.wait(names)
+        except Exception as e:
+            skipped[step_class] = f'{", ".join(names)} unavailable: {type(e).__name__}: {e}'
+    return skipped
+
+
+def latency_summary(latencies: list[float], elapsed: float) -> dict:
+    values = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    return {
+        'seconds': elapsed,
+        'records_per_second': len(latencies) / elapsed if elapsed > 0 else 0.0,
+        'latency_p50_ms': float(np.percentile(values, 50)),
+        'latency_p95_ms': float(np.percentile(values, 95)),
+        'latency_p99_ms': float(np.percentile(values, 99)),
+    }
+
+
+def bench_steps(path: Path, config: PipelineConfig, skipped: dict[type, str | None]) -> dict:
+    """Time Step.process of every step on each record still kept by the steps before it."""
+    records: list[Record] = list(JsonlReader(path))
+    results = {}
+    for step_class in STEPS:
+        if skipped[step_class]:
+            results[step_class.__name__] = {'skipped': skipped[step_class]}
+            continue
+        step = step_class(config)
+        kept = []
+        latencies = []
+        start = time.perf_counter()
+        for record in records:
+            call_start = time.perf_counter()
+            record = step.process(record)
+            latencies.append(time.perf_counter() - call_start)
+            if not record.omit:
+                kept.append(record)
+        elapsed = time.perf_counter() - start
+        results[step_class.__name__] = {'records': len(records), 'omitted': len(records) - len(kept)}
+        results[step_class.__name__].update(latency_summary(latencies, elapsed))
+        records = kept
+    return results
+
+
+def bench_end_to_end(path: Path, config: PipelineConfig, skipped: dict[type, str | None]) -> dict:
+    """
+    Run the pipeline over the corpus, writing its outputs. The latency of a record runs from the
+    pipeline taking it from the reader to its write or omit callback, so it includes the time spent
+    waiting in the executor windows.
+    """
+    pipeline = Pipeline(config)
+    for step_class in STEPS:
+        if not skipped[step_class]:
+            pipeline.register_step(step_class)
+    reader = JsonlReader(path, workers=config.workers)
+    writer = RecordWriter(config.output_dir, shard_size=config.shard_size)
+    entered: dict[int, float] = {}
+    latencies = []
+
+    def timed(records):
+        for record in records:
+            entered[record.id] = time.perf_counter()
+            yield record
+
+    def finished(callback):
+        def on_record(record: Record) -> None:
+            latencies.append(time.perf_counter() - entered.pop(record.id))
+            callback(record)
+        return on_record
+
+    pipeline.register_record_write_callback(finished(writer.write_record))
+    pipeline.register_omit_callback(finished(writer.write_omit))
+    start = time.perf_counter()
+    pipeline.process(timed(reader))
+    writer.close()
+    elapsed = time.perf_counter() - start
+    results = {
+        'records': len(latencies),
+        'omitted': sum(pipeline.omit_reasons.values()),
+        'startup_seconds': pipeline.startup_seconds,
+    }
+    results.update(latency_summary(latencies, elapsed))
+    return results
+
+
+def run_suite(
+        records: int,
+        seed: int,
+        workers: int,
+        batch_size: int,
+        process_workers: int,
+        repeat: int = 1,
+        with_models: bool = True,
+        selected_modes: list[str] | None = None,
+) -> dict:
+    """Run all benchmarks on a fresh corpus. Each end-to-end mode keeps its fastest of repeat runs."""
+    all_modes = modes(workers, batch_size, process_workers)
+    selected_modes = selected_modes or list(all_modes)
+    skipped = available_steps(with_models)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp = Path(tmp_dir)
+        path = tmp / 'corpus.jsonl'
+        corpus = write_corpus(path, records, seed)
+        config = PipelineConfig(path, tmp / 'output')
+        results = {
+            'machine': {
+                'platform': platform.platform(),
+                'python': platform.python_version(),
+                'cpu_count': os.cpu_count(),
+            },
+            'corpus': corpus,
+            'settings': {
+                'workers': workers,
+                'batch_size': batch_size,
+                'process_workers': process_workers,
+                'repeat': repeat,
+            },
+            'steps': bench_steps(path, config, skipped),
+            'end_to_end': {},
+        }
+        for mode in selected_modes:
+            runs = [
+                bench_end_to_end(path, dataclasses.replace(config, output_dir=tmp / f'{mode}_{run}', **all_modes[mode]), skipped)
+                for run in range(max(repeat, 1))
+            ]
+            results['end_to_end'][mode] = max(runs, key=lambda run: run['records_per_second'])
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """The metrics of results that are worse than in the baseline by more than threshold, as a fraction."""
+    regressions = []
+    for section in ('steps', 'end_to_end'):
+        for name, current in results.get(section, {}).items():
+            previous = baseline.get(section, {}).get(name)
+            if not previous or 'skipped' in previous or 'skipped' in current:
+                continue
+            for metric, higher_is_better in METRICS.items():
+                old, new = previous.get(metric), current.get(metric)
+                if not old or new is None:
+                    continue
+                change = (old - new) / old if higher_is_better else (new - old) / old
+                if change > threshold:
+                    regressions.append(f'{section}.{name}.{metric}: {old:,.4g} -> {new:,.4g} ({change:.0%} worse)')
+    return regressions
+
+
+def format_results(results: dict) -> str:
+    lines = [f'{results["corpus"]["records"]} records, {results["corpus"]["bytes"]:,} bytes']
+    for section in ('steps', 'end_to_end'):
+        lines.append(section)
+        for name, result in results[section].items():
+            if 'skipped' in result:
+                lines.append(f'  {name}: skipped ({result["skipped"]})')
+            else:
+                lines.append(
+                    f'  {name}: {result["records_per_second"]:,.0f} records/s, '
+                    f'p50 {result["latency_p50_ms"]:.3f} ms, p95 {result["latency_p95_ms"]:.3f} ms'
+                )
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline benchmark suite")
+    parser.add_argument('--records', type=int, default=5_000, help="Records in the synthetic corpus")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the synthetic corpus")
+    parser.add_argument('--workers', type=int, default=4, help="Worker threads of the threaded modes")
+    parser.add_argument('--batch-size', type=int, default=64, help="Batch size of the batch modes")
+    parser.add_argument('--process-workers', type=int, default=2, help="Worker processes of the processes mode")
+    parser.add_argument('--modes', type=str, default=None, help="Comma-separated end-to-end modes, all by default")
+    parser.add_argument('--repeat', type=int, default=1, help="Runs of each end-to-end mode, the fastest is kept")
+    parser.add_argument('--no-models', action='store_true', help="Skip the steps that need models")
+    parser.add_argument('--output', type=Path, default=None, help="Write the results JSON here")
+    parser.add_argument('--baseline', type=Path, default=None, help="Baseline results JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=0.25, help="Largest tolerated relative regression")
+    parser.add_argument('--save-baseline', type=Path, default=None, help="Write the results as the new baseline")
+    args = parser.parse_args()
+
+    results = run_suite(
+        args.records,
+        args.seed,
+        args.workers,
+        args.batch_size,
+        args.process_workers,
+        repeat=args.repeat,
+        with_models=not args.no_models,
+        selected_modes=args.modes.split(',') if args.modes else None,
+    )
+    print(format_results(results))
+    for path in (args.output, args.save_baseline):
+        if path is not None:
+            with open(path, 'w', encoding='utf-8') as handle:
+                json.dump(results, handle, indent=4)
+
+    if args.baseline is not None:
+        with open(args.baseline, encoding='utf-8') as handle:
+            baseline = json.load(handle)
+        for key in ('machine', 'corpus', 'settings'):
+            if baseline.get(key) != results[key]:
+                print(f'warning: the {key} differs from the baseline, the comparison may not be meaningful')
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f'{len(regressions)} regressions beyond {args.threshold:.0%}:')
+            for regression in regressions:
+                print(f'  {regression}')
+            sys.exit(1)
+        print(f'no regressions beyond {args.threshold:.0%}')
+
+
+if __name__ == '__main__':
+    main()
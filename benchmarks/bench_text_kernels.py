@@ -0,0 +1,49 @@
+"""
+Per-kernel timings of the normalization and attribute kernels against their reference implementations.
+
+    python -m benchmarks.bench_text_kernels --repeat 200
+"""
+import argparse
+import time
+
+from pipelib.components.modifiers.attribute_evaluate import compute_char_counts, compute_char_counts_reference
+from pipelib.components.modifiers.normalize import normalize_text, normalize_text_reference
+
+SAMPLES = {
+    'ascii': "The quick brown fox jumps over the lazy dog; it isn't the first time.\t\t  \n\n\n" * 60,
+    'unicode': "Café crème “brûlée” — 中文文本。 naïve résumé \U0001f600\n\n" * 60,
+    'html_entities': "&lt;p&gt;Fish &amp; chips&lt;/p&gt; &#8220;quoted&#8221;\x0b\x0c  text  \n\n" * 60,
+}
+
+KERNELS = [
+    ('normalize', normalize_text_reference, normalize_text),
+    ('char_counts', compute_char_counts_reference, compute_char_counts),
+]
+
+
+def bench(func, text: str, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(text)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Text kernel benchmark")
+    parser.add_argument('--repeat', type=int, default=200, help="Calls per kernel and sample")
+    args = parser.parse_args()
+
+    for sample_name, text in SAMPLES.items():
+        print(f'{sample_name} ({len(text)} chars)')
+        for kernel_name, reference, kernel in KERNELS:
+            assert reference(text) == kernel(text), kernel_name
+            reference_time = bench(reference, text, args.repeat)
+            kernel_time = bench(kernel, text, args.repeat)
+            print(
+                f'  {kernel_name:>12}: reference={reference_time * 1e6:,.1f}us '
+                f'kernel={kernel_time * 1e6:,.1f}us speedup={reference_time / kernel_time:.2f}x'
+            )
+
+
+if __name__ == '__main__':
+    main()
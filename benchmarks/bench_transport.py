@@ -0,0 +1,89 @@
+"""
+Throughput of the process workers with records passed through shared-memory rings against
+pickled records, on the synthetic corpus of benchmarks.corpus. The 'echo' pipeline upper-cases
+cleaned in the workers, so its time is mostly transport; the 'steps' pipeline runs the
+model-free steps of main.setup_pipeline.
+
+    python -m benchmarks.bench_transport --records 20000 --process-workers 4
+"""
+import argparse
+import dataclasses
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.corpus import write_corpus
+from pipelib.components.core.pipeline import Pipeline
+from pipelib.components.core.record import Record
+from pipelib.components.core.settings import PipelineConfig
+from pipelib.components.core.step import Step
+from pipelib.components.filters import CodeSnippetFilter, PreliminaryFilter
+from pipelib.components.modifiers import AttributeEvaluationStep, HTMLExtractorModifier, NormalizeModifier
+from pipelib.io import JsonlReader
+
+TRANSPORTS = ('pickle', 'shared')
+
+
+class Echo(Step):
+    def process(self, record: Record) -> Record:
+        record.cleaned = record.cleaned.upper()
+        return record
+
+
+PIPELINES = {
+    'echo': [Echo],
+    'steps': [NormalizeModifier, AttributeEvaluationStep, PreliminaryFilter, HTMLExtractorModifier, CodeSnippetFilter],
+}
+
+
+def bench(path: Path, config: PipelineConfig, steps: list[type[Step]]) -> dict:
+    records = list(JsonlReader(path))
+    # Records keep their originals in memory, as those read from a compressed input do
+    for record in records:
+        record.original = record.cleaned
+    pipeline = Pipeline(config)
+    for step_class in steps:
+        pipeline.register_step(step_class)
+    start = time.perf_counter()
+    pipeline.process(records)
+    elapsed = time.perf_counter() - start
+    return {
+        'records_per_second': len(records) / elapsed,
+        'megabytes_per_second': sum(len(record.cleaned) for record in records) / elapsed / 1e6,
+        'workers': pipeline.worker_insights,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Process worker transport benchmark")
+    parser.add_argument('--records', type=int, default=20_000, help="Records in the synthetic corpus")
+    parser.add_argument('--process-workers', type=int, default=4, help="Worker processes")
+    parser.add_argument('--batch-size', type=int, default=64, help="Records per batch sent to a worker")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per transport, the fastest is kept")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / 'corpus.jsonl'
+        corpus = write_corpus(path, args.records, seed=0)
+        print(f'{corpus["records"]} records, {corpus["bytes"]:,} bytes, {args.process_workers} workers')
+        config = PipelineConfig(
+            path, Path(tmp_dir) / 'output', process_workers=args.process_workers, batch_size=args.batch_size,
+            progress_interval=3600.0, memory_interval=0.0,
+        )
+        for name, steps in PIPELINES.items():
+            results = {}
+            for transport in TRANSPORTS:
+                runs = [bench(path, dataclasses.replace(config, transport=transport), steps) for _ in range(args.repeat)]
+                results[transport] = max(runs, key=lambda run: run['records_per_second'])
+                workers = results[transport]['workers']
+                print(
+                    f'  {name:>5} {transport:>6}: {results[transport]["records_per_second"]:,.0f} records/s, '
+                    f'{results[transport]["megabytes_per_second"]:,.1f} MB/s '
+                    f'({workers.get("shared_batches", 0)} shared, {workers.get("pickled_batches", 0)} pickled batches)'
+                )
+            speedup = results['shared']['records_per_second'] / results['pickle']['records_per_second']
+            print(f'  {name:>5} speedup: {speedup:.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+"""
+Deterministic synthetic corpus that mimics the mix of the crawl the pipeline runs on: plain prose,
+HTML pages, code snippets, exact and near duplicates, non-English text, PII-rich text, long
+documents and junk. The same seed always gives the same bytes.
+
+    python -m benchmarks.corpus --records 10000 --seed 0 --output corpus.jsonl
+"""
+import argparse
+import json
+import random
+from collections import Counter
+from pathlib import Path
+
+# Share of each kind of record in the corpus
+MIX = {
+    'prose': 0.38,
+    'html': 0.12,
+    'code': 0.10,
+    'duplicate': 0.10,
+    'non_english': 0.08,
+    'pii': 0.12,
+    'long': 0.04,
+    'junk': 0.06,
+}
+
+WORDS = (
+    'the of and to in is that for it as was with be by on not he this are or his from at which but '
+    'have an they you were her she there one all we their been has would when if more will so about '
+    'research market city water system report people history music school energy health policy team '
+    'project community development season data process model results study design government service '
+    'analysis network program support growth country public local national change value increase '
+    'building river museum library festival garden recipe travel weather station village century'
+).split()
+
+FOREIGN_WORDS = {
+    'de': 'der die und in den von zu das mit sich des auf für ist im dem nicht ein eine als auch es an '
+          'werden aus er hat dass sie nach wird bei einer um am sind noch wie einem über einen so zum'.split(),
+    'fr': 'le de un être et à il avoir ne je son que se qui ce dans en du elle au pour pas que vous par '
+          'sur faire plus dire me on mon lui nous comme mais pouvoir avec tout y aller voir en bien'.split(),
+    'es': 'el la de que y a en un ser se no haber por con su para como estar tener le lo todo pero más '
+          'hacer o poder decir este ir otro ese si me ya ver porque dar cuando él muy sin vez mucho'.split(),
+    'zh': '的 一 是 不 了 人 我 在 有 他 这 中 大 来 上 国 个 到 说 们 为 子 和 你 地 出 道 也 时 年'.split(),
+}
+
+FIRST_NAMES = 'James Mary Robert Patricia John Jennifer Michael Linda David Elizabeth William Susan Ana Wei Priya'.split()
+LAST_NAMES = 'Smith Johnson Williams Brown Jones Garcia Miller Davis Rodriguez Martinez Chen Patel Silva Kim'.split()
+STREETS = 'Main Oak Pine Maple Cedar Elm Washington Lake Hill Park'.split()
+
+CODE_SNIPPETS = [
+    'def {name}(items):\n    result = []\n    for item in items:\n        if item.{attr} > {n}:\n'
+    '            result.append(item)\n    return result\n',
+    'function {name}(req, res) {{\n  const {attr} = req.params.{attr};\n  if (!{attr}) {{\n'
+    '    return res.status({n}).json({{ error: "missing" }});\n  }}\n  res.send({attr});\n}}\n',
+    'for (int i = 0; i < {n}; i++) {{\n    {name}[i] = {attr}[i] * 2;\n    total += {name}[i];\n}}\n',
+    'SELECT {attr}, COUNT(*) FROM {name} WHERE {attr} > {n} GROUP BY {attr} ORDER BY 2 DESC;\n',
+]
+
+
+def sentence(rng: random.Random, words: list[str] = WORDS, low: int = 6, high: int = 22) -> str:
+    text = ' '.join(rng.choice(words) for _ in range(rng.randint(low, high)))
+    return text[0].upper() + text[1:] + '.'
+
+
+def paragraph(rng: random.Random, sentences: int) -> str:
+    return ' '.join(sentence(rng) for _ in range(sentences))
+
+
+def prose(rng: random.Random) -> str:
+    return '\n\n'.join(paragraph(rng, rng.randint(2, 6)) for _ in range(rng.randint(1, 6)))
+
+
+def html(rng: random.Random) -> str:
+    title = sentence(rng, low=3, high=7)
+    body = ''.join(f'<p>{paragraph(rng, rng.randint(2, 5))}</p>\n' for _ in range(rng.randint(2, 6)))
+    links = ''.join(f'<li><a href="/{rng.choice(WORDS)}">{rng.choice(WORDS)}</a></li>' for _ in range(8))
+    return (
+        f'<!DOCTYPE html>\n<html><head><title>{title}</title>'
+        f'<script>var tracker = {{"id": {rng.randint(1000, 9999)}}};</script>'
+        f'<style>body {{ margin: 0; }}</style></head>\n'
+        f'<body><nav><ul>{links}</ul></nav>\n<article><h1>{title}</h1>\n{body}</article>\n'
+        f'<footer>&copy; {rng.randint(1999, 2024)} {rng.choice(LAST_NAMES)} &amp; Co.</footer></body></html>'
+    )
+
+
+def code(rng: random.Random) -> str:
+    snippets = []
+    for _ in range(rng.randint(2, 8)):
+        snippets.append(rng.choice(CODE_SNIPPETS).format(
+            name=rng.choice(WORDS) + '_' + rng.choice(WORDS), attr=rng.choice(WORDS), n=rng.randint(1, 500),
+        ))
+    intro = sentence(rng) if rng.random() < 0.5 else ''
+    return intro + '\n\n' + '\n'.join(snippets)
+
+
+def non_english(rng: random.Random) -> str:
+    words = FOREIGN_WORDS[rng.choice(list(FOREIGN_WORDS))]
+    joiner = '' if words is FOREIGN_WORDS['zh'] else ' '
+    paragraphs = []
+    for _ in range(rng.randint(1, 4)):
+        clauses = [joiner.join(rng.choice(words) for _ in range(rng.randint(8, 24))) for _ in range(rng.randint(2, 6))]
+        paragraphs.append('. '.join(clause.capitalize() for clause in clauses) + '.')
+    return '\n\n'.join(paragraphs)
+
+
+def pii(rng: random.Random) -> str:
+    parts = []
+    for _ in range(rng.randint(2, 6)):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        parts.append(rng.choice([
+            f'Contact {first} {last} at {first.lower()}.{last.lower()}@example.com for details.',
+            f'Call {first} on +1 ({rng.randint(200, 999)}) {rng.randint(200, 999)}-{rng.randint(1000, 9999)} after 5pm.',
+            f'{first} {last} lives at {rng.randint(1, 9999)} {rng.choice(STREETS)} Street, Springfield.',
+            f'The server at {rng.randint(1, 254)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)} '
+            f'was registered by {first} {last}.',
+            f'Card number 4{rng.randint(100, 999)} {rng.randint(1000, 9999)} {rng.randint(1000, 9999)} '
+            f'{rng.randint(1000, 9999)} belongs to {first}.',
+        ]))
+        parts.append(sentence(rng))
+    return ' '.join(parts)
+
+
+def long_document(rng: random.Random) -> str:
+    return '\n\n'.join(paragraph(rng, rng.randint(4, 10)) for _ in range(rng.randint(15, 60)))
+
+
+def junk(rng: random.Random) -> str:
+    return rng.choice([
+        lambda: ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 8))),
+        lambda: ''.join(rng.choice('!@#$%^&*()_+=-0123456789') for _ in range(rng.randint(20, 400))),
+        lambda: ' '.join(str(rng.randint(0, 10 ** 6)) for _ in range(rng.randint(10, 100))),
+        lambda: '',
+    ])()
+
+
+def near_duplicate(rng: random.Random, text: str) -> str:
+    """An exact copy, or one that only differs in case or whitespace, so it normalizes to the same text."""
+    return rng.choice([
+        lambda: text,
+        lambda: text.upper(),
+        lambda: '  ' + text.replace(' ', '  ') + '\n\n',
+    ])()
+
+
+GENERATORS = {
+    'prose': prose,
+    'html': html,
+    'code': code,
+    'non_english': non_english,
+    'pii': pii,
+    'long': long_document,
+    'junk': junk,
+}
+
+
+def generate(n_records: int, seed: int = 0):
+    """Yields (kind, record) pairs, the records as they appear in the input."""
+    rng = random.Random(seed)
+    kinds, weights = list(MIX), list(MIX.values())
+    previous: list[str] = []
+    for idx in range(n_records):
+        kind = rng.choices(kinds, weights)[0]
+        if kind == 'duplicate' and not previous:
+            kind = 'prose'
+        if kind == 'duplicate':
+            text = near_duplicate(rng, rng.choice(previous))
+        else:
+            text = GENERATORS[kind](rng)
+            if kind in ('prose', 'html', 'pii') and len(previous) < 1000:
+                previous.append(text)
+        yield kind, {'text': text, 'url': f'https://{rng.choice(WORDS)}.example.com/{kind}/{idx}'}
+
+
+def write_corpus(path: Path, n_records: int, seed: int = 0) -> dict:
+    """Writes the corpus as JSONL and returns its record count, size and mix."""
+    kinds = Counter()
+    size = 0
+    with open(path, 'w', encoding='utf-8') as handle:
+        for kind, record in generate(n_records, seed):
+            line = json.dumps(record) + '\n'
+            handle.write(line)
+            size += len(line.encode('utf-8'))
+            kinds[kind] += 1
+    return {'records': n_records, 'seed': seed, 'bytes': size, 'kinds': dict(sorted(kinds.items()))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic corpus generator")
+    parser.add_argument('--records', type=int, default=10_000, help="Records to generate")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed")
+    parser.add_argument('--output', type=Path, default=Path('corpus.jsonl'), help="Output JSONL path")
+    args = parser.parse_args()
+
+    summary = write_corpus(args.output, args.records, args.seed)
+    print(f'{summary["records"]} records, {summary["bytes"]:,} bytes written to {args.output}')
+    for kind, count in summary['kinds'].items():
+        print(f'  {kind}: {count}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,47 +1,122 @@
 import argparse
+import dataclasses
 import json
 import logging
 from pathlib import Path
-from typing import Iterable, Tuple
-from itertools import islice
 
 from pipelib.components.core.pipeline import Pipeline
-from pipelib.components.core.record import Record
 from pipelib.components.core.settings import PipelineConfig, PipelineConfigDefaults
 from pipelib.components.filters import CodeSnippetFilter, DedupFilter, LanguageFilter, PreliminaryFilter, ToxicityFilter
 from pipelib.components.modifiers import AttributeEvaluationStep, NormalizeModifier, PIIModifier, HTMLExtractorModifier
-from pipelib.utils import ensure_dir, count_file_lines
+from pipelib.distributed import MANIFEST_NAME, WAIT_SECONDS, Coordinator, run_worker, spawn_workers
+from pipelib.io import JsonlReader, RecordWriter
+from pipelib.estimate import estimate, estimate_config, format_estimate
+from pipelib.io.scores import score_metadata
+from pipelib.refilter import refilter
+from pipelib.sweep import evaluate_sweep, format_sweep, loosest_config, parse_grid, select_variant, sweep_variants
+from pipelib.io.tokens import load_tokenizer
+from pipelib.utils import ensure_dir
 
 
 def parse_args() -> PipelineConfig:
     parser = argparse.ArgumentParser(description="Mainpipe data preparation pipeline")
     parser.add_argument("--input", dest="input_path", default="mainpipe_data_v1.jsonl", help="Path to raw JSONL")
     parser.add_argument("--output", dest="output_dir", default="outputs", help="Directory to store outputs")
+    parser.add_argument("--compression", choices=('none', 'gzip', 'zstd'), default=PipelineConfigDefaults.COMPRESSION, help="Compression of the output files, the input codec is detected automatically")
+    parser.add_argument("--format", dest="output_format", choices=('jsonl', 'parquet'), default=PipelineConfigDefaults.OUTPUT_FORMAT, help="File format of the output shards")
+    parser.add_argument("--tokenizer", dest="tokenizer_path", default=None, help="Path to a trained tokenizer.json, writes BPE token shards (.bin/.idx) next to the shards")
+    parser.add_argument("--omit-log", choices=('full', 'compact'), default=PipelineConfigDefaults.OMIT_LOG, help="'compact' logs omitted records by input byte offset instead of copying their text")
+    parser.add_argument("--omit-sample-rate", type=float, default=PipelineConfigDefaults.OMIT_SAMPLE_RATE, help="Fraction of omitted records also written in full to omit_sample.jsonl in compact mode")
+    parser.add_argument("--scores", dest="write_scores", action="store_true", default=PipelineConfigDefaults.WRITE_SCORES, help="Write the per-record scores to scores.parquet for refilter, needs pyarrow")
+    parser.add_argument("--cache-dir", default=None, help="Directory of the step result cache, steps backed by models reuse their results for texts seen in earlier runs")
+    parser.add_argument("--cache-bytes", type=int, default=PipelineConfigDefaults.CACHE_BYTES, help="Size limit of the step result cache, least recently used entries are evicted beyond it")
     parser.add_argument("--debug-info", action="store_true", default=True, help="Enable debug info mode")
-    parser.add_argument('--input-limit', type=int, default=0, help="Limit number of records to process. Set the value to 0 to process all records.")
+    parser.add_argument("--progress-interval", type=float, default=PipelineConfigDefaults.PROGRESS_INTERVAL, help="Seconds between structured progress events in the log")
+    parser.add_argument("--metrics-port", type=int, default=PipelineConfigDefaults.METRICS_PORT, help="Serve live OpenMetrics on http://127.0.0.1:PORT/metrics while processing (0 disables)")
+    parser.add_argument("--profile-top", type=int, default=0, help="Keep the N slowest step calls and the latency of every step against char_count in the insights (0 disables)")
+    parser.add_argument("--profile-step", default=None, help="Trace the calls of this step, by class name, and write its stacks weighted by time to profile.folded for flamegraphs")
+    parser.add_argument("--profile-records", type=int, default=PipelineConfigDefaults.PROFILE_RECORDS, help="Records of the profiled step to trace")
+    parser.add_argument("--memory-interval", type=float, default=PipelineConfigDefaults.MEMORY_INTERVAL, help="Seconds between RSS/USS samples with the sizes of the dedup set and other step state (0 disables)")
+    parser.add_argument("--memory-trace", type=int, default=0, help="Trace allocations per step with tracemalloc over this many records, after a warm-up of as many (0 disables)")
+    parser.add_argument("--sweep", action="append", default=None, metavar="FIELD=V1,V2", help="Sweep a threshold over candidate values, repeat for a grid. Runs once with the loosest values and evaluates every variant from the scores")
+    parser.add_argument("--sweep-select", type=int, default=None, help="Index of the sweep variant to write outputs for")
+    parser.add_argument("--estimate", type=int, nargs="?", const=PipelineConfigDefaults.ESTIMATE_SAMPLES, default=0, metavar="SAMPLES", help="Estimate the runtime, retention and output size of a full run from a sample of the input, without writing outputs")
+    parser.add_argument("--coordinator", default=None, metavar="HOST:PORT", help="Run as the coordinator of a distributed run listening on HOST:PORT, leasing byte ranges of the input to workers")
+    parser.add_argument("--worker", default=None, metavar="HOST:PORT", help="Run as a worker of the coordinator at HOST:PORT, writing the outputs of its tasks under --output/tasks")
+    parser.add_argument("--local-workers", type=int, default=0, help="Worker processes the coordinator starts on its own host")
+    parser.add_argument("--task-bytes", type=int, default=PipelineConfigDefaults.TASK_BYTES, help="Size of the byte ranges of the input leased to workers")
+    parser.add_argument("--lease-seconds", type=float, default=PipelineConfigDefaults.LEASE_SECONDS, help="Lease time of a task, workers renew it while they run the task and expired tasks are retried")
+    parser.add_argument("--max-attempts", type=int, default=PipelineConfigDefaults.MAX_ATTEMPTS, help="Attempts at a task before the distributed run fails")
+    parser.add_argument("--dedup-partitions", type=int, default=PipelineConfigDefaults.DEDUP_PARTITIONS, help="Processes holding the hash partitions of the global dedup set on the coordinator")
+    parser.add_argument('--input-limit', type=int, default=0, help="Limit the number of input lines to read, blank and invalid lines included. Set the value to 0 to process all records.")
+    parser.add_argument("--json-decoder", choices=('auto', 'orjson', 'json'), default=PipelineConfigDefaults.JSON_DECODER, help="JSON decoder for the input, 'auto' prefers orjson when installed")
     parser.add_argument("--workers", type=int, default=PipelineConfigDefaults.WORKERS, help="Number of worker threads for processing")
+    parser.add_argument("--process-workers", type=int, default=PipelineConfigDefaults.PROCESS_WORKERS, help="Fork this many worker processes that share the loaded models copy-on-write (0 uses worker threads)")
+    parser.add_argument("--transport", choices=('shared', 'pickle'), default=PipelineConfigDefaults.TRANSPORT, help="Pass records to the process workers through shared memory or pickled")
+    parser.add_argument("--batch-size", type=int, default=PipelineConfigDefaults.BATCH_SIZE, help="Records per batch passed through the steps (1 processes record by record)")
     parser.add_argument("--shard-size", type=int, default=PipelineConfigDefaults.SHARD_SIZE, help="Number of rows per shard")
+    parser.add_argument("--shard-bytes", type=int, default=PipelineConfigDefaults.SHARD_BYTES, help="Rotate shards at this many bytes of serialized records instead of by row count (0 disables)")
+    parser.add_argument("--shard-tokens", type=int, default=PipelineConfigDefaults.SHARD_TOKENS, help="Rotate shards at this many tokens instead of by row count (0 disables)")
     parser.add_argument("--min-char-len", type=int, default=PipelineConfigDefaults.MIN_CHAR_LEN, help="Minimum characters to keep a sample")
     parser.add_argument("--min-token-len", type=int, default=PipelineConfigDefaults.MIN_TOKEN_LEN, help="Minimum tokens to keep a sample")
     parser.add_argument("--max-char-len", type=int, default=PipelineConfigDefaults.MAX_CHAR_LEN, help="Maximum characters to keep a sample")
     parser.add_argument("--toxicity-batch-size", type=int, default=PipelineConfigDefaults.TOXICITY_BATCH_SIZE, help="Toxicity check batch size")
     parser.add_argument("--toxicity-threshold", type=float, default=PipelineConfigDefaults.TOXICITY_THRESHOLD, help="Toxicity threshold")
+    parser.add_argument("--html-backend", choices=('auto', 'lxml', 'stdlib'), default=PipelineConfigDefaults.HTML_BACKEND, help="HTML parser backend, 'auto' is 'stdlib'; 'lxml' is faster but splits some documents differently")
+    parser.add_argument("--pii-chunk-size", type=int, default=PipelineConfigDefaults.PII_CHUNK_SIZE, help="Texts longer than this are anonymized in overlapping chunks")
+    parser.add_argument("--pii-chunk-overlap", type=int, default=PipelineConfigDefaults.PII_CHUNK_OVERLAP, help="Characters shared by consecutive PII chunks, at most a quarter of the chunk size")
     parser.add_argument("--allow-non-english", action="store_true", default=not PipelineConfigDefaults.REQUIRE_ENGLISH, help="Keep non-English rows (disabled by default)")
+    parser.add_argument("--detect-language", action="store_true", default=PipelineConfigDefaults.DETECT_LANGUAGE, help="Detect the language of kept non-English rows too, so that a refilter can require English")
     args = parser.parse_args()
 
     return PipelineConfig(
         input_path=Path(args.input_path),
         output_dir=Path(args.output_dir),
+        compression=args.compression,
+        output_format=args.output_format,
+        tokenizer_path=Path(args.tokenizer_path) if args.tokenizer_path else None,
+        omit_log=args.omit_log,
+        omit_sample_rate=args.omit_sample_rate,
+        write_scores=args.write_scores,
+        cache_dir=Path(args.cache_dir) if args.cache_dir else None,
+        cache_bytes=args.cache_bytes,
         debug_info=args.debug_info,
+        progress_interval=args.progress_interval,
+        metrics_port=max(args.metrics_port, 0),
+        profile_top=max(args.profile_top, 0),
+        profile_step=args.profile_step,
+        profile_records=args.profile_records,
+        memory_interval=max(args.memory_interval, 0.0),
+        memory_trace=max(args.memory_trace, 0),
         input_limit=args.input_limit,
+        sweep=parse_grid(args.sweep) if args.sweep else None,
+        sweep_select=args.sweep_select,
+        estimate=max(args.estimate, 0),
+        distributed='coordinator' if args.coordinator else 'worker' if args.worker else None,
+        distributed_address=args.coordinator or args.worker,
+        local_workers=max(args.local_workers, 0),
+        task_bytes=max(args.task_bytes, 1),
+        lease_seconds=args.lease_seconds,
+        max_attempts=max(args.max_attempts, 1),
+        dedup_partitions=max(args.dedup_partitions, 1),
+        json_decoder=args.json_decoder,
         shard_size=args.shard_size,
+        shard_bytes=args.shard_bytes,
+        shard_tokens=args.shard_tokens,
         min_char_len=args.min_char_len,
         min_token_len=args.min_token_len,
         max_char_len=args.max_char_len,
         workers=max(args.workers, 1),
+        process_workers=max(args.process_workers, 0),
+        transport=args.transport,
+        batch_size=max(args.batch_size, 1),
         require_english=not args.allow_non_english,
+        detect_language=args.detect_language,
         toxicity_threshold=args.toxicity_threshold,
         toxicity_batch_size=args.toxicity_batch_size,
+        html_backend=args.html_backend,
+        pii_chunk_size=args.pii_chunk_size,
+        pii_chunk_overlap=args.pii_chunk_overlap,
     )
 
 
@@ -59,74 +134,134 @@ def setup_pipeline(config: PipelineConfig) -> Pipeline:
     return pipeline
 
 
-def setup_input(config: PipelineConfig) -> Iterable[Record]:
-    if config.input_limit <= 0:
-        config.input_limit = count_file_lines(config.input_path)
-    with open(config.input_path, 'r', encoding='utf-8') as inf:
-        for line in islice(inf, config.input_limit):
-            try:
-                obj = json.loads(line)
-            except json.decoder.JSONDecodeError:
-                continue
-            text = obj.get('text')
-            url = obj.get('url')
-            if text:
-                yield Record(text, url)
-
-
-def setup_output(config: PipelineConfig) -> Tuple[Path, Path, Path]:
-    output_dir_path = ensure_dir(config.output_dir)
-    shard_dir_path = ensure_dir(output_dir_path / 'shards')
-    cleaned_path = output_dir_path / 'cleaned.jsonl'
-    omit_path = output_dir_path / 'omit_data.jsonl'
-    return cleaned_path, shard_dir_path, omit_path
-
-
-def process_pipeline(pipeline: Pipeline, config: PipelineConfig) -> None:
-    records = setup_input(config)
-    cleaned_path, shard_dir_path, omit_path = setup_output(config)
-
-    cleaned_handle = open(cleaned_path, 'w', encoding='utf-8')
-    omit_handle = open(omit_path, 'w', encoding='utf-8')
-    shard_index = 0
-    records_written = 0
-    shard_written = 0
-    shard_handle = open(shard_dir_path / f'shard_{shard_index}.jsonl', 'w', encoding='utf-8')
-
-    def save_record(record: Record) -> None:
-        nonlocal records_written, shard_written, shard_index, shard_handle
-
-        record.write_successful_jsonl(cleaned_handle)
-        record.write_successful_jsonl(shard_handle)
-
-        records_written += 1
-        shard_written += 1
-        if records_written % config.shard_size == 0:
-            shard_index += 1
-            shard_handle.close()
-            shard_handle = open(shard_dir_path / f'shard_{shard_index}.jsonl', 'w', encoding='utf-8')
-            shard_written = 0
-
-    def on_omit(record: Record) -> None:
-        nonlocal omit_handle
-        record.write_failed_jsonl(omit_handle)
-
-    pipeline.register_record_write_callback(save_record)
-    pipeline.register_omit_callback(on_omit)
-
-    # Pipeline processing
-    pipeline.process(records)
-
-    shard_handle.close()
-    cleaned_handle.close()
-    omit_handle.close()
+def setup_input(config: PipelineConfig) -> JsonlReader:
+    return JsonlReader(
+        config.input_path,
+        workers=config.workers,
+        limit=config.input_limit,
+        decoder=config.json_decoder,
+    )
+
+
+def setup_output(config: PipelineConfig, pipeline: Pipeline) -> RecordWriter:
+    return RecordWriter(
+        config.output_dir,
+        shard_size=config.shard_size,
+        compression=config.compression,
+        output_format=config.output_format,
+        tokenizer=load_tokenizer(config.tokenizer_path) if config.tokenizer_path else None,
+        shard_bytes=config.shard_bytes,
+        shard_tokens=config.shard_tokens,
+        finalize_workers=min(config.workers, 4),
+        omit_log=config.omit_log,
+        omit_sample_rate=config.omit_sample_rate,
+        score_metadata=score_metadata(pipeline.steps, config) if config.write_scores else None,
+    )
+
+
+def process_pipeline(pipeline: Pipeline, config: PipelineConfig, records: JsonlReader | None = None) -> None:
+    records = records if records is not None else setup_input(config)
+    writer = setup_output(config, pipeline)
+
+    pipeline.register_record_write_callback(writer.write_record)
+    pipeline.register_omit_callback(writer.write_omit)
+    pipeline.register_progress_callback(records.progress)
+    pipeline.register_queue_callback('writer', writer.queue_depth)
+
+    # Pipeline processing. The writer is closed on errors too, so that the records already
+    # queued are flushed, the shards finalized and its threads released.
+    try:
+        pipeline.process(records)
+    finally:
+        try:
+            pipeline.close()
+        finally:
+            writer.close()
+
+    if pipeline.profiler is not None and pipeline.profiler.tracer is not None:
+        pipeline.profiler.write_folded(config.output_dir / 'profile.folded')
 
     insight_path = config.output_dir / 'pipeline_insights.json'
     with open(insight_path, 'w', encoding='utf-8') as insight_handle:
         insights_dict = pipeline.generate_insights()
+        insights_dict['io'] = {
+            'input': records.stats(),
+            'writer': writer.stats(),
+        }
         json.dump(insights_dict, insight_handle, indent=4)
 
 
+def run_sweep(config: PipelineConfig) -> list[dict]:
+    """
+    Run the pipeline once with the loosest value of every swept threshold, writing its outputs and
+    scores to sweep_base/, then evaluate all variants from the scores. Writes sweep.json and, for
+    the selected variant, the refiltered outputs.
+    """
+    logger = logging.getLogger(__name__)
+    variants = sweep_variants(config.sweep)
+    selected = select_variant(variants, config.sweep_select) if config.sweep_select is not None else None
+    base_config = dataclasses.replace(
+        loosest_config(config, variants),
+        output_dir=config.output_dir / 'sweep_base',
+        write_scores=True,
+    )
+    pipeline = setup_pipeline(base_config)
+    logger.info(f'Sweeping {len(variants)} variants on {config.input_path} -> {base_config.output_dir}')
+    process_pipeline(pipeline, base_config)
+
+    step_seconds = None
+    if base_config.debug_info:
+        step_seconds = [elapsed / calls if calls else 0.0 for elapsed, calls, _ in pipeline.step_call_insights]
+    results = evaluate_sweep(base_config.output_dir, variants, step_seconds)
+    with open(config.output_dir / 'sweep.json', 'w', encoding='utf-8') as handle:
+        json.dump(results, handle, indent=4)
+    logger.info('Sweep results:\n%s', format_sweep(results))
+
+    if selected is not None:
+        logger.info(f'Writing outputs of variant {config.sweep_select} to {config.output_dir}')
+        refilter(base_config.output_dir, config.output_dir, **selected)
+    return results
+
+
+def run_estimate(config: PipelineConfig) -> dict:
+    """Run a stratified sample of the input through the pipeline and write the extrapolated estimate.json."""
+    logger = logging.getLogger(__name__)
+    sample_config = estimate_config(config)
+    pipeline = setup_pipeline(sample_config)
+    logger.info(f'Estimating a run on {config.input_path} from {config.estimate} samples')
+    try:
+        insights = estimate(pipeline, setup_input(sample_config), config.estimate)
+    finally:
+        pipeline.close()
+    with open(ensure_dir(config.output_dir) / 'estimate.json', 'w', encoding='utf-8') as handle:
+        json.dump(insights, handle, indent=4)
+    logger.info('Estimate with 95%% confidence intervals:\n%s', format_estimate(insights))
+    return insights
+
+
+def run_coordinator(config: PipelineConfig) -> dict:
+    """
+    Lease the input to the workers, local_workers of them started here, until every task is done,
+    and write distributed.json with the task directories that hold the outputs.
+    """
+    logger = logging.getLogger(__name__)
+    coordinator = Coordinator(config)
+    address = coordinator.start(config.distributed_address)
+    logger.info(f'Coordinating {len(coordinator.tasks)} tasks of {config.input_path} on {address}')
+    processes = spawn_workers(config.local_workers, address, config, setup_pipeline, process_pipeline)
+    try:
+        manifest = coordinator.serve()
+    finally:
+        for process in processes:
+            process.join(timeout=2 * WAIT_SECONDS)
+            if process.is_alive():
+                process.terminate()
+    logger.info(f'{manifest["records"]} records, {manifest["kept"]} kept, {manifest["retried_tasks"]} tasks retried')
+    if manifest['failed_tasks']:
+        raise RuntimeError(f'Tasks {manifest["failed_tasks"]} failed {config.max_attempts} times, see {MANIFEST_NAME}')
+    return manifest
+
+
 def main():
     config = parse_args()
 
@@ -137,6 +272,22 @@ def main():
     )
     logger = logging.getLogger(__name__)
 
+    if config.estimate:
+        run_estimate(config)
+        return
+
+    if config.sweep:
+        run_sweep(config)
+        return
+
+    if config.distributed == 'coordinator':
+        run_coordinator(config)
+        return
+
+    if config.distributed == 'worker':
+        run_worker(config.distributed_address, config, setup_pipeline, process_pipeline)
+        return
+
     pipeline = setup_pipeline(config)
 
     logger.info(f'Running pipeline on {config.input_path} -> {config.output_dir}')
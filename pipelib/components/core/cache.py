@@ -0,0 +1,178 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from pipelib.components.core.record import Record
+
+CACHE_FILE_NAME = 'step_cache.sqlite'
+# Pending writes are committed in groups, a commit per record would dominate the cost of a hit
+COMMIT_EVERY = 256
+# Eviction frees space down to this fraction of the limit, so it does not run on every write
+EVICT_TO = 0.9
+# Entries read per query while evicting, the oldest first
+EVICT_BATCH = 256
+
+# Record fields a cached step may change. Identity and input position are never cached, and
+# tokens are too large to be worth storing.
+CACHED_FIELDS = tuple(
+    name for name in Record.__slots__
+    if name not in ('url', 'id', 'tokens', 'source_offset', 'source_length', '_original', '_source')
+)
+
+
+def step_key(step) -> str:
+    """Hash of the step class and the config fields its output depends on."""
+    config = {name: getattr(step.config, name) for name in step.cache_config}
+    # Entries written before a record field was added would not restore it
+    description = json.dumps(
+        [f'{type(step).__module__}.{type(step).__qualname__}', config, CACHED_FIELDS], sort_keys=True, default=str
+    )
+    return hashlib.blake2b(description.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def text_digest(text: str) -> bytes:
+    return hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+
+
+def snapshot(record: Record) -> tuple:
+    return tuple(getattr(record, name) for name in CACHED_FIELDS)
+
+
+def changes(before: tuple, record: Record) -> dict:
+    """Fields of the record that differ from the snapshot taken before a step ran."""
+    return {
+        name: value for name, old, value in zip(CACHED_FIELDS, before, snapshot(record))
+        if value != old or type(value) is not type(old)
+    }
+
+
+class StepCache:
+    """
+    On-disk cache of step results, keyed by (step class and config, content of record.cleaned).
+    An entry holds the record fields the step changed and the time the step took, so re-running
+    a step on a text it has seen applies the stored changes instead of calling the step again.
+    The least recently used entries are evicted once the cache grows beyond max_bytes.
+
+    Connections are opened per process, so forked workers share the cache file through SQLite's
+    own locking.
+    """
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, cache_dir: Path, max_bytes: int):
+        self.path = Path(cache_dir) / CACHE_FILE_NAME
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._connection: sqlite3.Connection | None = None
+        self._pid: int | None = None
+        self._pending = 0
+        self._size = 0
+        Path(cache_dir).mkdir(parents=True, exist_ok=True)
+
+    def get(self, key: str, text: str) -> tuple[dict, float] | None:
+        """The stored changes and the seconds the step took to produce them, or None on a miss."""
+        digest = text_digest(text)
+        with self._lock:
+            connection = self._connect()
+            row = connection.execute(
+                'SELECT value, seconds FROM entries WHERE step = ? AND digest = ?', (key, digest)
+            ).fetchone()
+            if row is None:
+                return None
+            connection.execute(
+                'UPDATE entries SET last_used = ? WHERE step = ? AND digest = ?', (time.time(), key, digest)
+            )
+            self._written()
+        return json.loads(row[0]), row[1]
+
+    def put(self, key: str, text: str, fields: dict, seconds: float) -> None:
+        value = json.dumps(fields)
+        size = len(value) + 48  # the key, digest and bookkeeping columns
+        with self._lock:
+            connection = self._connect()
+            connection.execute(
+                'INSERT OR REPLACE INTO entries (step, digest, value, seconds, size, last_used) VALUES (?, ?, ?, ?, ?, ?)',
+                (key, text_digest(text), value, seconds, size, time.time()),
+            )
+            self._size += size
+            self._written()
+            if self._size > self.max_bytes:
+                self._evict(connection)
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._connection is not None and self._pid == os.getpid():
+                self._connection.commit()
+                self._pending = 0
+
+    def stats(self) -> dict:
+        self.flush()
+        with self._lock:
+            entries, size = self._connect().execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+        return {
+            'path': str(self.path),
+            'entries': entries,
+            'size_bytes': size,
+            'max_bytes': self.max_bytes,
+            'evictions': self.evictions,
+        }
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            if self._connection is not None and self._pid == os.getpid():
+                self._connection.close()
+            self._connection = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is not None and self._pid == os.getpid():
+            return self._connection
+        # A connection inherited through fork belongs to the parent and must not be used
+        connection = sqlite3.connect(self.path, timeout=60, check_same_thread=False)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            'step TEXT NOT NULL, digest BLOB NOT NULL, value TEXT NOT NULL, seconds REAL NOT NULL, '
+            'size INTEGER NOT NULL, last_used REAL NOT NULL, PRIMARY KEY (step, digest))'
+        )
+        connection.execute('CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)')
+        connection.commit()
+        self._connection, self._pid, self._pending = connection, os.getpid(), 0
+        self._size = connection.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        return connection
+
+    def _written(self) -> None:
+        self._pending += 1
+        if self._pending >= COMMIT_EVERY:
+            self._connection.commit()
+            self._pending = 0
+
+    def _evict(self, connection: sqlite3.Connection) -> None:
+        # Other processes may have written too, start from the size on disk
+        self._size = connection.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        target = int(self.max_bytes * EVICT_TO)
+        evicted = 0
+        while self._size > target:
+            rows = connection.execute(
+                'SELECT rowid, size FROM entries ORDER BY last_used LIMIT ?', (EVICT_BATCH,)
+            ).fetchall()
+            if not rows:
+                break
+            victims = []
+            for rowid, size in rows:
+                if self._size <= target:
+                    break
+                victims.append((rowid,))
+                self._size -= size
+            connection.executemany('DELETE FROM entries WHERE rowid = ?', victims)
+            evicted += len(victims)
+        connection.commit()
+        self._pending = 0
+        self.evictions += evicted
+        self.logger.debug('Evicted %d step cache entries', evicted)
@@ -30,6 +30,12 @@ class Filter(Step):
     """
     Expected to modify the record.omit and record.omit_reason
     """
+    # Omit reasons the filter gives, used to attribute persisted decisions to it
+    omit_reasons: tuple[str, ...] = ()
+    # Filters that set it reuse only the scores of their cached results and decide again from
+    # them with refilter(), so the config fields of the decision stay out of cache_config
+    refilter_cached: bool = False
+
     def __init__(self, config: PipelineConfig):
         super().__init__(config)
 
@@ -40,9 +46,38 @@ class Filter(Step):
             record.omit_reason = result.reason
         return record
 
+    def batch_process(self, records: list[Record]) -> list[Record]:
+        for record, filter_result in zip(records, self._batch_filter(records)):
+            if filter_result.status is FilterStatus.OMIT:
+                record.omit = True
+                record.omit_reason = filter_result.reason
+        return records
+
     def _filter(self, record: Record) -> FilterResult:
         raise NotImplementedError()
 
+    def redecide(self, record: Record) -> Record:
+        """Decide under the current config from the scores a cached result restored onto the record."""
+        result = self.refilter({**record.__getstate__(), 'omit_reason': None})
+        if result is not None and result.status is FilterStatus.OMIT:
+            record.omit = True
+            record.omit_reason = result.reason
+        return record
+
+    def _batch_filter(self, records: list[Record]) -> Iterable[FilterResult]:
+        """Filters may override this with a vectorized implementation that agrees with _filter."""
+        return [self._filter(record) for record in records]
+
+    def refilter(self, scores: dict) -> FilterResult | None:
+        """
+        Decide again from the persisted scores of a record (see pipelib.io.scores) under the current
+        config, or None when a score the decision needs was never computed. Filters with thresholds
+        override this; the others keep the decision of the run that persisted the scores.
+        """
+        if scores['omit_reason'] in self.omit_reasons:
+            return FilterResult.omit(scores['omit_reason'])
+        return FilterResult.keep()
+
 
 class BatchFilter(BatchStep):
     def __init__(self, config: PipelineConfig):
@@ -0,0 +1,173 @@
+import threading
+import time
+import tracemalloc
+from typing import TYPE_CHECKING
+
+from pipelib.utils import process_memory
+
+if TYPE_CHECKING:
+    from pipelib.components.core.pipeline import Pipeline
+
+# Samples kept for the insights, every other one is dropped beyond it
+MAX_SAMPLES = 512
+# Source lines reported for the memory retained over the trace window
+TOP_LINES = 20
+
+
+class MemoryMonitor:
+    """
+    Samples the RSS and USS of the process from the processing loop every interval seconds,
+    together with the sizes of the stateful structures of the steps (Step.state_sizes). With
+    trace_records set, tracemalloc runs over a window of that many records, after a warm-up of as
+    many so that loaded models and warmed caches do not show up as growth. The window reports the
+    net memory each step allocated, approximate with worker threads, and the source lines that
+    retained the most.
+    """
+
+    def __init__(self, pipeline: 'Pipeline', interval: float, trace_records: int = 0):
+        self.pipeline = pipeline
+        self.interval = interval
+        self.trace_records = trace_records
+        self.samples: list[dict] = []
+        self.latest: dict = {}
+        self.peak = {'rss': None, 'uss': None}
+        self.tracing = False
+        self.trace: dict | None = None
+        self._started = time.monotonic()
+        self._next_sample = 0.0
+        self._step_bytes: list[int] = []
+        self._step_calls: list[int] = []
+        self._snapshot: tracemalloc.Snapshot | None = None
+        self._trace_start = 0
+        self._stop_tracemalloc = False
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        self._started = time.monotonic()
+        self._next_sample = self._started
+        self._step_bytes = [0] * len(self.pipeline.steps)
+        self._step_calls = [0] * len(self.pipeline.steps)
+        if self.interval > 0:
+            self.sample()
+
+    def update(self) -> None:
+        records = self.pipeline.records_seen
+        if self.trace_records > 0:
+            if not self.tracing and self.trace is None and records >= self.trace_records:
+                self._start_trace()
+            elif self.tracing and records >= 2 * self.trace_records:
+                self._finish_trace()
+        if self.interval > 0 and time.monotonic() >= self._next_sample:
+            self.sample()
+
+    def finish(self) -> None:
+        if self.tracing:
+            self._finish_trace()
+        if self.interval > 0:
+            self.sample()
+
+    def sample(self) -> dict:
+        now = time.monotonic()
+        self._next_sample = now + self.interval
+        memory = process_memory()
+        structures = {}
+        for step in self.pipeline.steps:
+            structures.update({f'{step.__class__.__name__}.{name}': size for name, size in step.state_sizes().items()})
+        self.latest = {
+            'elapsed_seconds': now - self._started,
+            'records': self.pipeline.records_seen,
+            'rss': memory['rss'],
+            'uss': memory['uss'],
+            'structures': structures,
+        }
+        for kind in self.peak:
+            if memory[kind] is not None:
+                self.peak[kind] = max(self.peak[kind] or 0, memory[kind])
+        self.samples.append({name: value for name, value in self.latest.items() if name != 'structures'})
+        if len(self.samples) > MAX_SAMPLES:
+            # Keep the first and the latest sample
+            self.samples = self.samples[:-1:2] + self.samples[-1:]
+        return self.latest
+
+    def step_started(self) -> int | None:
+        """Traced memory before a step call while the window is open, passed to step_finished()."""
+        return tracemalloc.get_traced_memory()[0] if self.tracing else None
+
+    def step_finished(self, step_idx: int, before: int | None) -> None:
+        if before is None or not self.tracing:
+            return
+        allocated = tracemalloc.get_traced_memory()[0] - before
+        with self._lock:
+            self._step_bytes[step_idx] += allocated
+            self._step_calls[step_idx] += 1
+
+    def insights(self) -> dict:
+        insights = {
+            'interval_seconds': self.interval,
+            'rss_bytes': self._summary('rss'),
+            'uss_bytes': self._summary('uss'),
+            'rss_growth_bytes_per_1k_records': self._growth('rss'),
+            'structures': self.latest.get('structures', {}),
+            'samples': self.samples,
+        }
+        if self.trace is not None:
+            insights['trace'] = self.trace
+        return insights
+
+    def _summary(self, kind: str) -> dict:
+        values = [sample[kind] for sample in self.samples if sample[kind] is not None]
+        return {
+            'first': values[0] if values else None,
+            'last': values[-1] if values else None,
+            'peak': self.peak[kind],
+        }
+
+    def _growth(self, kind: str) -> float | None:
+        """Least-squares slope of the memory against the records seen, per 1000 records."""
+        points = [(sample['records'], sample[kind]) for sample in self.samples if sample[kind] is not None]
+        if len(points) < 2:
+            return None
+        n = len(points)
+        mean_x = sum(x for x, _ in points) / n
+        mean_y = sum(y for _, y in points) / n
+        var_x = sum((x - mean_x) ** 2 for x, _ in points)
+        if not var_x:
+            return None
+        return 1000 * sum((x - mean_x) * (y - mean_y) for x, y in points) / var_x
+
+    def _start_trace(self) -> None:
+        self._stop_tracemalloc = not tracemalloc.is_tracing()
+        if self._stop_tracemalloc:
+            tracemalloc.start()
+        self._snapshot = tracemalloc.take_snapshot()
+        self._trace_start = self.pipeline.records_seen
+        self.tracing = True
+
+    def _finish_trace(self) -> None:
+        self.tracing = False
+        snapshot = tracemalloc.take_snapshot()
+        if self._stop_tracemalloc:
+            tracemalloc.stop()
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        differences = snapshot.filter_traces(filters).compare_to(self._snapshot.filter_traces(filters), 'lineno')
+        self._snapshot = None
+        self.trace = {
+            'first_record': self._trace_start,
+            'records': self.pipeline.records_seen - self._trace_start,
+            'steps': {
+                step.__class__.__name__: {
+                    'calls': calls,
+                    'net_bytes': allocated,
+                    'net_bytes_per_call': allocated / calls if calls else 0.0,
+                }
+                for step, allocated, calls in zip(self.pipeline.steps, self._step_bytes, self._step_calls)
+            },
+            'top_lines': [
+                {
+                    'line': f'{difference.traceback[0].filename}:{difference.traceback[0].lineno}',
+                    'size_diff_bytes': difference.size_diff,
+                    'count_diff': difference.count_diff,
+                }
+                for difference in differences[:TOP_LINES]
+            ],
+        }
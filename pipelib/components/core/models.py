@@ -0,0 +1,123 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Iterable
+
+
+class ModelRegistry:
+    """
+    Loads each named model at most once per process. Steps only declare the models they use;
+    registering a step starts loading its models on background threads, so independent models
+    are loaded concurrently while the rest of the pipeline is set up, and the first access
+    blocks until the model is ready.
+    """
+    logger = logging.getLogger(__name__)
+
+    def __init__(self):
+        self._loaders: dict[str, Callable[[], Any]] = {}
+        self._futures: dict[str, Future] = {}
+        self._load_seconds: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+
+    def register(self, name: str, loader: Callable[[], Any]) -> None:
+        self._loaders[name] = loader
+
+    def warm_up(self, names: Iterable[str]) -> None:
+        """Start loading the models in the background."""
+        for name in names:
+            self._future(name, background=True)
+
+    def get(self, name: str) -> Any:
+        return self._future(name, background=False).result()
+
+    def wait(self, names: Iterable[str] | None = None) -> None:
+        """Block until the given models, or all models being loaded, are ready."""
+        with self._lock:
+            futures = [self._futures[name] for name in names if name in self._futures] \
+                if names is not None else list(self._futures.values())
+        for future in futures:
+            future.result()
+
+    def load_times(self) -> dict[str, float]:
+        with self._lock:
+            return dict(self._load_seconds)
+
+    def _future(self, name: str, background: bool) -> Future:
+        with self._lock:
+            future = self._futures.get(name)
+            if future is not None:
+                return future
+            if name not in self._loaders:
+                raise KeyError(f'Unknown model: {name}')
+            if background:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(thread_name_prefix='model-loader')
+                future = self._executor.submit(self._load, name)
+            else:
+                future = Future()
+            self._futures[name] = future
+        if not background:
+            try:
+                future.set_result(self._load(name))
+            except BaseException as e:
+                future.set_exception(e)
+        return future
+
+    def _load(self, name: str) -> Any:
+        self.logger.info('Loading model %s...', name)
+        start = time.perf_counter()
+        model = self._loaders[name]()
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._load_seconds[name] = elapsed
+        self.logger.info('Loaded model %s in %.2fs', name, elapsed)
+        return model
+
+
+models = ModelRegistry()
+
+
+class LazyModel:
+    """
+    Step attribute resolved from the model registry on first access. Assigning to the
+    attribute replaces the model for that step, e.g. with a stub in tests.
+    """
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self.attribute = None
+
+    def __set_name__(self, owner, name: str) -> None:
+        self.attribute = '_' + name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        model = instance.__dict__.get(self.attribute)
+        if model is None:
+            model = instance.__dict__[self.attribute] = models.get(self.model_name)
+        return model
+
+    def __set__(self, instance, value) -> None:
+        instance.__dict__[self.attribute] = value
+
+
+def required_models(step_class: type) -> list[str]:
+    """Names of the models a step class reads through LazyModel attributes."""
+    return list(dict.fromkeys(model.model_name for model in _lazy_models(step_class)))
+
+
+def unresolved_models(step) -> list[str]:
+    """Names of the models a step will still load, those of LazyModel attributes not yet set on it."""
+    return list(dict.fromkeys(
+        model.model_name for model in _lazy_models(type(step)) if model.attribute not in vars(step)
+    ))
+
+
+def _lazy_models(step_class: type) -> list[LazyModel]:
+    return [
+        value for klass in reversed(step_class.__mro__) for value in vars(klass).values()
+        if isinstance(value, LazyModel)
+    ]
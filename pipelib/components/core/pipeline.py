@@ -2,87 +2,286 @@ import time
 import threading
 import logging
 from collections import Counter
+from functools import partial
+from itertools import chain
 from typing import Iterable, Callable
 
 import numpy as np
 from numpy.typing import NDArray
 
+from pipelib.components.core.cache import StepCache, changes, snapshot, step_key
+from pipelib.components.core.memory import MemoryMonitor
+from pipelib.components.core.models import models, required_models, unresolved_models
+from pipelib.components.core.profiling import Profiler, char_count
+from pipelib.components.core.progress import MetricsServer, ProgressReporter
 from pipelib.components.core.record import Record
 from pipelib.components.core.settings import PipelineConfig
 from pipelib.components.core.step import Step
+from pipelib.utils import batched, bounded_map, process_memory
 
 
 class Pipeline:
     logger = logging.getLogger(__name__)
 
     def __init__(self, config: PipelineConfig):
+        self._created = time.perf_counter()
         self.config = config
         self.steps: list[Step] = []
         self.record_write_callback: Callable[[Record], None] = lambda record: None
         self.omit_callback: Callable[[Record], None] = lambda record: None
+        self.records_seen = 0
+        # Fraction of the input processed, the record count against input_limit unless the input reports it
+        self.progress_callback: Callable[[], float] = \
+            lambda: self.records_seen / self.config.input_limit if self.config.input_limit > 0 else 0.0
         self.omit_reasons: Counter[str] = Counter()
+        # Queue name -> current depth, reported with the progress
+        self.queue_callbacks: dict[str, Callable[[], int]] = {}
+        self.progress = ProgressReporter(self, config.progress_interval)
+        self.profiler: Profiler | None = None
+        self.memory = MemoryMonitor(self, config.memory_interval, config.memory_trace)
+        # Step index -> record attributes dropped after that step, the last one that uses them
+        self.release_after: dict[int, tuple[str, ...]] = {}
+        # Time from creating the pipeline until the first record can be processed
+        self.startup_seconds: float | None = None
+        self.worker_insights: dict = {'mode': 'threads', 'count': config.workers}
+        self.cache = StepCache(config.cache_dir, config.cache_bytes) if config.cache_dir else None
+        # Step index -> cache key, for the cacheable steps when the cache is enabled
+        self.cache_keys: dict[int, str] = {}
+        self.step_cache_insights: NDArray[tuple[int, int, float]] = np.array([])  # tuples of (hits, misses, time saved)
+        self._insights_lock = threading.Lock()
         if self.config.debug_info:
             self.step_call_insights: NDArray[tuple[float, int, int]] = np.array([])  # tuples of (total time, number of calls, omits)
-            self._insights_lock = threading.Lock()
 
     def process(self, records: Iterable[Record]) -> Iterable[Record]:
         if self.config.debug_info:
             self.step_call_insights = np.array([(0.0, 0, 0) for _ in self.steps])
+        self.release_after = self._release_plan()
+        self.cache_keys = {
+            step_idx: step_key(step) for step_idx, step in enumerate(self.steps)
+            if self.cache is not None and step.cache_config is not None
+        }
+        self.step_cache_insights = np.array([(0, 0, 0.0) for _ in self.steps])
+        # Profiling hooks into the timed step calls, which only run with debug_info
+        if self.config.debug_info and (self.config.profile_top or self.config.profile_step):
+            self.profiler = Profiler(
+                [step.__class__.__name__ for step in self.steps],
+                self.config.profile_top,
+                self.config.profile_step,
+                self.config.profile_records,
+            )
+            if self.config.process_workers > 0:
+                self.logger.warning('Profiling only covers the steps run in the parent process with process workers')
+        self._wait_for_models()
+        self.startup_seconds = time.perf_counter() - self._created
+        self.memory.start()
+        self.progress.start()
+        metrics_server = MetricsServer(self.progress, self.config.metrics_port) if self.config.metrics_port else None
+        if metrics_server is not None:
+            self.logger.info('Serving metrics on http://127.0.0.1:%d/metrics', metrics_server.port)
         # Run records in parallel if configured, otherwise fall back to serial processing.
-        start = time.time()
-        processed_records = self._process_parallel(records) if self.config.workers > 1 else map(self._process_record, records)
-        for line_no, record in enumerate(processed_records, 1):
-            if record.omit:
-                self.omit_callback(record)
-                self.collect_omit_insights(record)
-            else:
-                self.record_write_callback(record)
-
-            if line_no % 100 == 0:
-                elapsed = time.time() - start
-                time_left_seconds = (elapsed / line_no) * (self.config.input_limit - line_no)
-                # time_left_minutes = (time_left_seconds / 60) % 60
-                # time_left_hours = int(time_left_seconds / 3600)
-                self.logger.info('[progress] %d rows seen', line_no)
-                self.logger.info('[progress] elapsed time: %s', _duration_string(elapsed))
-                self.logger.info('[progress] estimated time left: %s', _duration_string(time_left_seconds))
-                # self.logger.info('[progress] Estimated time left: %d hours %d minutes', time_left_hours, time_left_minutes)
-                if self.config.debug_info:
-                    for step_idx, step in enumerate(self.steps):
-                        name = step.__class__.__name__
-                        elapsed, calls, omits = self.step_call_insights[step_idx]
-                        avg_time = elapsed / calls if calls else 0
-                        omit_percentage = (100.0 * omits) / calls if calls else 0
-                        self.logger.debug(
-                            '[debug] [insights] %s: rate=%.4f Rec/s, omit_percentage=%.2f%%',
-                            name,
-                            (1 / avg_time) if avg_time else 0.0,
-                            omit_percentage,
-                        )
-                    self.logger.debug('[debug] [insights] omit_reasons=%s', dict(self.omit_reasons))
+        counted = self._count_in(records)
+        if self.config.process_workers > 0:
+            processed_records = self._process_forked(counted)
+        elif self.config.batch_size > 1:
+            batches = batched(counted, self.config.batch_size)
+            processed_batches = self._process_parallel(self._process_batch, batches, window=2 * self.config.workers) \
+                if self.config.workers > 1 else map(self._process_batch, batches)
+            processed_records = chain.from_iterable(processed_batches)
+        else:
+            processed_records = self._process_parallel(self._process_record, counted, window=64 * self.config.workers) \
+                if self.config.workers > 1 else map(self._process_record, counted)
+        try:
+            for line_no, record in enumerate(processed_records, 1):
+                self.records_seen = line_no
+                if record.omit:
+                    self.omit_callback(record)
+                    self.collect_omit_insights(record)
+                else:
+                    self.record_write_callback(record)
+                self.memory.update()
+                self.progress.update()
+            self.memory.finish()
+            self.progress.finish()
+        finally:
+            if metrics_server is not None:
+                metrics_server.close()
+        if self.cache is not None:
+            self.cache.flush()
         return records
 
-    def _process_parallel(self, records: Iterable[Record]) -> Iterable[Record]:
+    def _count_in(self, records: Iterable[Record]) -> Iterable[Record]:
+        for record in records:
+            self.progress.records_in += 1
+            yield record
+
+    def _process_parallel(self, func: Callable, items: Iterable, window: int) -> Iterable:
         from concurrent.futures import ThreadPoolExecutor
 
         with ThreadPoolExecutor(max_workers=self.config.workers) as executor:
-            for record in executor.map(self._process_record, records, chunksize=64):
-                yield record
+            for item in bounded_map(executor, func, items, window):
+                yield item
 
     def _process_record(self, record: Record) -> Record:
         for step_idx, step in enumerate(self.steps):
+            process = partial(self._cached_process, step_idx) if step_idx in self.cache_keys else step.process
             if self.config.debug_info:
-                record = self.call_with_insights(step_idx, step.process, record)
+                record = self.call_with_insights(step_idx, process, record)
             else:
-                record = step.process(record)
+                record = process(record)
             if record.omit:
+                record.release()
                 break
+            if step_idx in self.release_after:
+                record.release(self.release_after[step_idx])
         return record
 
+    def _process_batch(self, records: list[Record], start: int = 0, stop: int | None = None) -> list[Record]:
+        # Each step only sees the records that are still kept, as in _process_record.
+        active = [record for record in records if not record.omit]
+        if not active:
+            return records
+        for step_idx, step in enumerate(self.steps[start:stop], start):
+            batch_process = partial(self._cached_batch_process, step_idx) if step_idx in self.cache_keys else step.batch_process
+            if self.config.debug_info:
+                self.batch_call_with_insights(step_idx, batch_process, active)
+            else:
+                batch_process(active)
+            for record in active:
+                if record.omit:
+                    record.release()
+                elif step_idx in self.release_after:
+                    record.release(self.release_after[step_idx])
+            active = [record for record in active if not record.omit]
+            if not active:
+                break
+        return records
+
+    def _cached_process(self, step_idx: int, record: Record) -> Record:
+        return self._cached_batch_process(step_idx, [record])[0]
+
+    def _cached_batch_process(self, step_idx: int, records: list[Record]) -> list[Record]:
+        """Apply the cached results of a step, and run it only on the records whose text it has not seen."""
+        step, key = self.steps[step_idx], self.cache_keys[step_idx]
+        redecide = getattr(step, 'refilter_cached', False)
+        misses = []
+        saved = 0.0
+        for record in records:
+            hit = self.cache.get(key, record.cleaned)
+            if hit is None:
+                misses.append((record, record.cleaned, snapshot(record)))
+                continue
+            fields, seconds = hit
+            for name, value in fields.items():
+                if not (redecide and name in ('omit', 'omit_reason')):
+                    setattr(record, name, value)
+            if redecide:
+                step.redecide(record)
+            saved += seconds
+        if misses:
+            start = time.perf_counter()
+            step.batch_process([record for record, _, _ in misses])
+            seconds = (time.perf_counter() - start) / len(misses)
+            for record, text, before in misses:
+                self.cache.put(key, text, changes(before, record), seconds)
+        with self._insights_lock:
+            hits, n_misses, total_saved = self.step_cache_insights[step_idx]
+            self.step_cache_insights[step_idx] = (hits + len(records) - len(misses), n_misses + len(misses), total_saved + saved)
+        return records
+
+    def _process_forked(self, records: Iterable[Record]) -> Iterable[Record]:
+        from pipelib.components.core.prefork import PREFORK_BATCH_SIZE, PreforkPool
+
+        batches = batched(records, max(self.config.batch_size, PREFORK_BATCH_SIZE))
+        with PreforkPool(self, self.config.process_workers, self.config.transport) as pool:
+            self.startup_seconds = time.perf_counter() - self._created
+            for start, stop in self._stages():
+                if self.steps[start].stateful:
+                    batches = map(partial(self._process_batch, start=start, stop=stop), batches)
+                else:
+                    batches = pool.run_steps(start, stop, batches)
+            yield from chain.from_iterable(batches)
+            self.worker_insights = {
+                'mode': 'processes',
+                'count': pool.processes,
+                'fork_seconds': pool.fork_seconds,
+                'transport': pool.transport,
+                'shared_batches': pool.shared_batches,
+                'pickled_batches': pool.pickled_batches,
+                'parent_memory_bytes': process_memory(),
+                'worker_memory_bytes': pool.worker_memory(),
+            }
+
+    def _stages(self) -> list[tuple[int, int]]:
+        """Split the steps into runs of stateless steps and single stateful steps, as [start, stop) ranges."""
+        stages = []
+        for step_idx, step in enumerate(self.steps):
+            if step.stateful or not stages or self.steps[stages[-1][0]].stateful:
+                stages.append((step_idx, step_idx + 1))
+            else:
+                stages[-1] = (stages[-1][0], step_idx + 1)
+        return stages
+
+    def _wait_for_models(self) -> None:
+        # Models replaced on a step, e.g. by a stub, are not waited for
+        names = [name for step in self.steps for name in unresolved_models(step)]
+        if names:
+            start = time.perf_counter()
+            models.wait(names)
+            self.logger.info('Models ready after waiting %.2fs', time.perf_counter() - start)
+
+    def _release_plan(self) -> dict[int, tuple[str, ...]]:
+        last_use: dict[str, int] = {}
+        for step_idx, step in enumerate(self.steps):
+            for attribute in (*step.produces, *step.consumes):
+                if attribute in Record.RELEASABLE:
+                    last_use[attribute] = step_idx
+        plan: dict[int, tuple[str, ...]] = {}
+        for attribute, step_idx in last_use.items():
+            plan[step_idx] = (*plan.get(step_idx, ()), attribute)
+        return plan
+
+    def batch_call_with_insights(self, step_idx, func, records: list[Record]) -> list[Record]:
+        profiler = self.profiler
+        if profiler is not None:
+            chars = [char_count(record) for record in records]
+            traced = profiler.enter(step_idx)
+        memory_before = self.memory.step_started()
+        t = time.time()
+        res: list[Record] = func(records)
+        elapsed = time.time() - t
+        self.memory.step_finished(step_idx, memory_before)
+        if profiler is not None:
+            if traced:
+                profiler.exit(len(records))
+            for record, count in zip(res, chars):
+                profiler.add(step_idx, record, count, elapsed / len(records))
+        omits = sum(1 for record in res if record.omit)
+        if self.config.workers > 1:
+            with self._insights_lock:
+                self._add_step_insights(step_idx, elapsed, len(records), omits)
+        else:
+            self._add_step_insights(step_idx, elapsed, len(records), omits)
+        return res
+
+    def _add_step_insights(self, step_idx: int, elapsed: float, calls: int, omits: int) -> None:
+        total_time, n_calls, n_omits = self.step_call_insights[step_idx]
+        self.step_call_insights[step_idx] = (total_time + elapsed, n_calls + calls, n_omits + omits)
+
     def call_with_insights(self, step_idx, func, *args, **kwargs):
+        profiler = self.profiler
+        if profiler is not None:
+            chars = char_count(args[0])
+            traced = profiler.enter(step_idx)
+        memory_before = self.memory.step_started()
         t = time.time()
         res: Record = func(*args, **kwargs)
-        elapsed = self.step_call_insights[step_idx][0] + (time.time() - t)
+        call_time = time.time() - t
+        self.memory.step_finished(step_idx, memory_before)
+        if profiler is not None:
+            if traced:
+                profiler.exit(1)
+            profiler.add(step_idx, res, chars, call_time)
+        elapsed = self.step_call_insights[step_idx][0] + call_time
         n_calls = self.step_call_insights[step_idx][1] + 1
         omits = self.step_call_insights[step_idx][2]
         if res.omit:
@@ -102,8 +301,17 @@ class Pipeline:
     def generate_insights(self) -> dict:
         insights = {
             'omit_reasons': dict(self.omit_reasons),
+            'startup_seconds': self.startup_seconds,
+            'model_load_seconds': models.load_times(),
+            'workers': self.worker_insights,
             'steps': {},
         }
+        if self.cache is not None:
+            insights['cache'] = self.cache.stats()
+        if self.profiler is not None:
+            insights['profile'] = self.profiler.insights()
+        if self.memory.samples or self.memory.trace is not None:
+            insights['memory'] = self.memory.insights()
         for step_idx, step in enumerate(self.steps):
             name = step.__class__.__name__
             elapsed, calls, omits = self.step_call_insights[step_idx]
@@ -116,10 +324,24 @@ class Pipeline:
                 'number_of_omits': int(omits),
                 'omit_percentage': omit_percentage,
             }
+            if step_idx in self.cache_keys:
+                hits, misses, saved = self.step_cache_insights[step_idx]
+                insights['steps'][name].update({
+                    'cache_hits': int(hits),
+                    'cache_misses': int(misses),
+                    'cache_hit_rate': hits / (hits + misses) if hits + misses else 0.0,
+                    'cache_time_saved_seconds': saved,
+                })
         return insights
 
 
+    def close(self) -> None:
+        for step in self.steps:
+            step.close()
+
     def register_step(self, GenericStep: type[Step]) -> None:
+        # Models load in the background while the remaining steps are registered
+        models.warm_up(required_models(GenericStep))
         self.logger.info('Initializing %s...', GenericStep.__name__)
         step = GenericStep(self.config)
         self.logger.info('Initialized %s', GenericStep.__name__)
@@ -131,8 +353,8 @@ class Pipeline:
     def register_omit_callback(self, on_omit: Callable[[Record], None]) -> None:
         self.omit_callback = on_omit
 
+    def register_progress_callback(self, progress: Callable[[], float]) -> None:
+        self.progress_callback = progress
 
-def _duration_string(seconds: float) -> str:
-    hours, remainder = divmod(seconds, 3600)
-    minutes, seconds = divmod(remainder, 60)
-    return '%dh %02dm %02ds' % (hours, minutes, seconds)
+    def register_queue_callback(self, name: str, depth: Callable[[], int]) -> None:
+        self.queue_callbacks[name] = depth
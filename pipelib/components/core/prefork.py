@@ -0,0 +1,173 @@
+import gc
+import multiprocessing
+import sys
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Iterable, Iterator
+
+import numpy as np
+
+from pipelib.components.core.record import Record
+from pipelib.components.core.transport import SharedRecordRing, start_tracker
+from pipelib.utils import process_memory
+
+if TYPE_CHECKING:
+    from pipelib.components.core.pipeline import Pipeline
+
+# Records sent to a worker per task, small batches would be dominated by pickling overhead
+PREFORK_BATCH_SIZE = 64
+
+# The parent's pipeline, set before forking so that every worker inherits it with its loaded models
+_pipeline: 'Pipeline | None' = None
+
+# The shared record rings a worker has attached to, by name
+_rings: dict[str, SharedRecordRing] = {}
+
+
+def _init_worker() -> None:
+    torch = sys.modules.get('torch')
+    if torch is not None:
+        torch.set_num_threads(1)  # the worker processes are the parallelism
+
+
+def _process_batch(records: list[Record], start: int, stop: int) -> tuple[np.ndarray | None, np.ndarray]:
+    if _pipeline.config.debug_info:
+        _pipeline.step_call_insights[:] = 0
+    _pipeline.step_cache_insights[:] = 0
+    _pipeline._process_batch(records, start, stop)
+    if _pipeline.cache is not None:
+        _pipeline.cache.flush()  # pool workers exit without running cleanup
+    insights = _pipeline.step_call_insights.copy() if _pipeline.config.debug_info else None
+    return insights, _pipeline.step_cache_insights.copy()
+
+
+def _run_steps(start: int, stop: int, states: list[dict]) -> tuple[list[dict], np.ndarray | None, np.ndarray]:
+    records = []
+    for state in states:
+        record = Record.__new__(Record)
+        record.__setstate__(state)
+        records.append(record)
+    insights, cache_insights = _process_batch(records, start, stop)
+    return [record.__getstate__() for record in records], insights, cache_insights
+
+
+def _run_shared(
+        start: int, stop: int, handle: tuple, slot: int, count: int, input_end: int, live: tuple[str, ...],
+) -> tuple[list[dict] | None, np.ndarray | None, np.ndarray]:
+    """
+    Run the steps on the records of a ring slot and write the results into it after the input.
+    The results are returned pickled instead when they do not fit the slot. Rings that are not
+    among the live ones of the parent have been unlinked, and are closed.
+    """
+    for name in [name for name in _rings if name not in live]:
+        _rings.pop(name).close()
+    ring = _rings.get(handle[0])
+    if ring is None:
+        ring = _rings[handle[0]] = SharedRecordRing.attach(handle)
+    records, texts = ring.read(slot, count)
+    insights, cache_insights = _process_batch(records, start, stop)
+    if ring.write(slot, records, input_end, previous=texts) is None:
+        return [record.__getstate__() for record in records], insights, cache_insights
+    return None, insights, cache_insights
+
+
+class PreforkPool:
+    """
+    Worker processes forked from a parent that has already built every step and loaded every
+    model, so the workers share the models copy-on-write instead of loading their own.
+    gc.freeze() moves the parent's objects out of the collector's reach before the fork, so
+    collections in the workers do not write to, and thereby copy, the shared pages.
+
+    With the 'shared' transport the records of a batch are passed through a SharedRecordRing
+    instead of being pickled, falling back to pickling for the batches that do not fit it.
+    """
+
+    def __init__(self, pipeline: 'Pipeline', processes: int, transport: str = 'shared'):
+        global _pipeline
+        self.pipeline = pipeline
+        self.processes = max(processes, 1)
+        self.transport = transport
+        self.shared_batches = 0
+        self.pickled_batches = 0
+        # Names of the rings of the run_steps calls in progress, stages run concurrently
+        self._live_rings: set[str] = set()
+        start = time.perf_counter()
+        _pipeline = pipeline
+        if transport == 'shared':
+            start_tracker()
+        gc.collect()
+        gc.freeze()
+        self._pool = multiprocessing.get_context('fork').Pool(self.processes, initializer=_init_worker)
+        self.fork_seconds = time.perf_counter() - start
+
+    def run_steps(self, start: int, stop: int, batches: Iterable[list[Record]]) -> Iterator[list[Record]]:
+        """
+        Run steps [start, stop) over the kept records of each batch in the workers, copying the
+        results back onto the parent's records. Batches are yielded in order, with at most two
+        per worker in flight, so each in-flight batch has a slot of its own in the ring.
+        """
+        window = 2 * self.processes
+        pending = deque()
+        ring = None
+        try:
+            for index, batch in enumerate(batches):
+                active = [record for record in batch if not record.omit]
+                if ring is None and self.transport == 'shared':
+                    ring = SharedRecordRing.for_batches(window, len(batch))
+                    self._live_rings.add(ring.name)
+                slot = index % window
+                input_end = ring.write(slot, active) if ring is not None else None
+                if input_end is None:
+                    states = [record.__getstate__() for record in active]
+                    result = self._pool.apply_async(_run_steps, (start, stop, states))
+                    self.pickled_batches += 1
+                else:
+                    result = self._pool.apply_async(
+                        _run_shared, (start, stop, ring.handle, slot, len(active), input_end, tuple(self._live_rings)),
+                    )
+                    self.shared_batches += 1
+                pending.append((batch, active, ring, slot, result))
+                if len(pending) >= window:
+                    yield self._collect(*pending.popleft())
+            while pending:
+                yield self._collect(*pending.popleft())
+        finally:
+            if ring is not None:
+                self._live_rings.discard(ring.name)
+                ring.close()
+                ring.unlink()
+
+    def _collect(
+            self, batch: list[Record], active: list[Record], ring: SharedRecordRing | None, slot: int, result,
+    ) -> list[Record]:
+        states, insights, cache_insights = result.get()
+        if states is None:
+            ring.update(slot, active)
+        for record, state in zip(active, states or ()):
+            record.__setstate__(state)
+        if insights is not None:
+            self.pipeline.step_call_insights += insights
+        self.pipeline.step_cache_insights += cache_insights
+        return batch
+
+    def worker_memory(self) -> list[dict]:
+        return [
+            process_memory(child.pid) for child in multiprocessing.active_children()
+            if child.name.startswith('ForkPoolWorker')
+        ]
+
+    def close(self, terminate: bool = False) -> None:
+        global _pipeline
+        if terminate:
+            self._pool.terminate()
+        else:
+            self._pool.close()
+        self._pool.join()
+        _pipeline = None
+        gc.unfreeze()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close(terminate=exc_type is not None)
@@ -0,0 +1,178 @@
+import heapq
+import itertools
+import math
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from pipelib.components.core.record import Record
+
+_THIS_FILE = __file__
+
+
+class StackTracer:
+    """
+    Times the calls made on the threads it is started on with sys.setprofile, Python and C calls
+    alike, and sums the time spent in each stack in the collapsed format read by flamegraph.pl and
+    speedscope: frames root first, separated by semicolons, weighted in microseconds. A sampler
+    thread would only see the other threads where they give up the GIL, e.g. in numpy, so it
+    would miss most of the time spent in pure Python or regex code.
+    """
+
+    def __init__(self):
+        self.stacks: Counter[str] = Counter()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def start(self, root: str) -> None:
+        """Trace the calls of the current thread, under root, until stop()."""
+        self._local.stack = [root]
+        self._local.last = time.perf_counter()
+        sys.setprofile(self._profile)
+
+    def stop(self) -> None:
+        sys.setprofile(None)
+        self._charge(time.perf_counter())
+
+    def microseconds(self) -> dict[str, int]:
+        return {stack: int(seconds * 1e6) for stack, seconds in self.stacks.most_common()}
+
+    def _charge(self, now: float) -> None:
+        state = self._local
+        stack = ';'.join(name for name in state.stack if name)
+        with self._lock:
+            self.stacks[stack] += now - state.last
+        state.last = now
+
+    def _profile(self, frame, event: str, arg) -> None:
+        now = time.perf_counter()
+        state = self._local
+        if event in ('call', 'c_call'):
+            self._charge(now)
+            code = frame.f_code
+            if not state.stack[-1] or event == 'call' and code.co_filename == _THIS_FILE:
+                # The profiler itself and what it calls are left out of the stacks
+                state.stack.append('')
+            elif event == 'call':
+                state.stack.append(f'{Path(code.co_filename).stem}:{getattr(code, "co_qualname", code.co_name)}')
+            else:
+                state.stack.append(f'{getattr(arg, "__module__", None) or "builtins"}.{getattr(arg, "__qualname__", arg.__name__)}')
+        elif len(state.stack) > 1:  # return, c_return, c_exception
+            self._charge(now)
+            state.stack.pop()
+
+
+class StepLatency:
+    """Running sums of the latency of a step against the char_count of its records."""
+    __slots__ = ('n', 'sum_x', 'sum_y', 'sum_xx', 'sum_yy', 'sum_xy', 'buckets')
+
+    def __init__(self):
+        self.n = 0
+        self.sum_x = self.sum_y = self.sum_xx = self.sum_yy = self.sum_xy = 0.0
+        self.buckets: dict[int, list] = {}  # log2 of the char count -> [records, seconds]
+
+    def add(self, chars: int, seconds: float) -> None:
+        self.n += 1
+        self.sum_x += chars
+        self.sum_y += seconds
+        self.sum_xx += chars * chars
+        self.sum_yy += seconds * seconds
+        self.sum_xy += chars * seconds
+        bucket = self.buckets.setdefault(max(chars, 1).bit_length(), [0, 0.0])
+        bucket[0] += 1
+        bucket[1] += seconds
+
+    def insights(self) -> dict:
+        n = self.n
+        var_x = n * self.sum_xx - self.sum_x ** 2
+        var_y = n * self.sum_yy - self.sum_y ** 2
+        cov = n * self.sum_xy - self.sum_x * self.sum_y
+        slope = cov / var_x if var_x > 0 else 0.0
+        return {
+            'records': n,
+            'latency_char_count_correlation': cov / math.sqrt(var_x * var_y) if var_x > 0 and var_y > 0 else 0.0,
+            'seconds_per_char': slope,
+            'base_seconds': (self.sum_y - slope * self.sum_x) / n if n else 0.0,
+            'latency_by_char_count': [
+                {'max_chars': (1 << bits) - 1, 'records': records, 'mean_seconds': seconds / records}
+                for bits, (records, seconds) in sorted(self.buckets.items())
+            ],
+        }
+
+
+class Profiler:
+    """
+    Opt-in profiling of Pipeline: the top slowest (record, step) calls, the latency of every step
+    against the char_count of its records, and optionally the stacks of one step traced for its
+    first trace_records records, a few more with worker threads. In batch mode every record of a
+    batch is counted with the mean time of the batch.
+    """
+
+    def __init__(self, step_names: list[str], top: int, trace_step: str | None = None, trace_records: int = 0):
+        if trace_step is not None and trace_step not in step_names:
+            raise ValueError(f'Cannot profile {trace_step}, the steps are {", ".join(step_names)}')
+        self.step_names = step_names
+        self.top = top
+        self.slowest: list[tuple[float, int, dict]] = []  # min-heap of (elapsed, sequence, entry)
+        self.latency = [StepLatency() for _ in step_names]
+        self.trace_step = step_names.index(trace_step) if trace_step is not None else None
+        self.trace_records = trace_records
+        self.traced_records = 0
+        self.tracer = StackTracer() if trace_step is not None else None
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+
+    def enter(self, step_idx: int) -> bool:
+        """Whether the call of the step about to run on this thread is traced, until exit()."""
+        if step_idx != self.trace_step or self.traced_records >= self.trace_records:
+            return False
+        self.tracer.start(self.step_names[step_idx])
+        return True
+
+    def exit(self, records: int) -> None:
+        self.tracer.stop()
+        with self._lock:
+            self.traced_records += records
+
+    def add(self, step_idx: int, record: Record, chars: int, elapsed: float) -> None:
+        entry = (elapsed, next(self._sequence), {
+            'id': record.id,
+            'source_offset': record.source_offset,
+            'step': self.step_names[step_idx],
+            'elapsed_seconds': elapsed,
+            'char_count': chars,
+        })
+        with self._lock:
+            self.latency[step_idx].add(chars, elapsed)
+            if len(self.slowest) < self.top:
+                heapq.heappush(self.slowest, entry)
+            elif self.slowest and elapsed > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, entry)
+
+    def write_folded(self, path: Path) -> None:
+        with open(path, 'w', encoding='utf-8') as handle:
+            for stack, microseconds in self.tracer.microseconds().items():
+                if microseconds:
+                    handle.write(f'{stack} {microseconds}\n')
+
+    def insights(self) -> dict:
+        insights = {
+            'slowest': [entry for _, _, entry in sorted(self.slowest, reverse=True)],
+            'steps': {name: latency.insights() for name, latency in zip(self.step_names, self.latency)},
+        }
+        if self.tracer is not None:
+            insights['trace'] = {
+                'step': self.step_names[self.trace_step],
+                'records': self.traced_records,
+                'traced_seconds': sum(self.tracer.stacks.values()),
+            }
+        return insights
+
+
+def char_count(record: Record) -> int:
+    """The char_count of a record, its cleaned length before AttributeEvaluationStep has set it."""
+    if record.char_count is not None:
+        return record.char_count
+    return len(record.cleaned) if record.cleaned else 0
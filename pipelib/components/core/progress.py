@@ -0,0 +1,169 @@
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from pipelib.components.core.pipeline import Pipeline
+
+# Seconds between refreshes of the snapshot served by the metrics endpoint
+REFRESH_SECONDS = 1.0
+OPENMETRICS_CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+
+
+class ProgressReporter:
+    """
+    Tracks the progress of Pipeline.process and logs it as one JSON event per interval, on the
+    pipelib.progress logger, instead of per record count. Snapshots are taken on the processing
+    thread, at most every REFRESH_SECONDS, so the metrics endpoint never reads the counters while
+    they change.
+    """
+    logger = logging.getLogger('pipelib.progress')
+
+    def __init__(self, pipeline: 'Pipeline', interval: float):
+        self.pipeline = pipeline
+        self.interval = interval
+        self.records_in = 0
+        self.latest: dict = {}
+        self._started = time.monotonic()
+        self._next_refresh = 0.0
+        self._next_event = 0.0
+
+    def start(self) -> None:
+        self.records_in = 0
+        self._started = time.monotonic()
+        self._next_refresh = self._started + REFRESH_SECONDS
+        self._next_event = self._started + self.interval
+        self.latest = self.snapshot('start')
+
+    def update(self) -> None:
+        now = time.monotonic()
+        if now < self._next_refresh:
+            return
+        self._next_refresh = now + REFRESH_SECONDS
+        self.latest = self.snapshot('progress')
+        if now >= self._next_event:
+            self._next_event = now + self.interval
+            self.logger.info('%s', json.dumps(self.latest))
+
+    def finish(self) -> None:
+        self.latest = self.snapshot('done')
+        self.logger.info('%s', json.dumps(self.latest))
+
+    def snapshot(self, event: str) -> dict:
+        pipeline = self.pipeline
+        elapsed = time.monotonic() - self._started
+        records_out = pipeline.records_seen
+        omitted = sum(pipeline.omit_reasons.values())
+        progress = pipeline.progress_callback() if event != 'done' else 1.0
+        queues = {'pipeline': max(self.records_in - records_out, 0)}
+        queues.update({name: depth() for name, depth in pipeline.queue_callbacks.items()})
+        snapshot = {
+            'event': event,
+            'time': time.time(),
+            'elapsed_seconds': elapsed,
+            'records_in': self.records_in,
+            'records_out': records_out,
+            'records_kept': records_out - omitted,
+            'records_omitted': omitted,
+            'records_per_second': records_out / elapsed if elapsed > 0 else 0.0,
+            'progress': progress,
+            'eta_seconds': elapsed * (1 - progress) / progress if progress > 0 else None,
+            'omit_reasons': dict(pipeline.omit_reasons),
+            'queues': queues,
+            'memory': pipeline.memory.latest,
+            'steps': {},
+        }
+        if pipeline.config.debug_info and len(pipeline.step_call_insights):
+            for step, (seconds, calls, omits) in zip(pipeline.steps, pipeline.step_call_insights):
+                snapshot['steps'][step.__class__.__name__] = {
+                    'calls': int(calls),
+                    'omits': int(omits),
+                    'seconds': float(seconds),
+                    'rate': calls / elapsed if elapsed > 0 else 0.0,
+                    'latency_seconds': seconds / calls if calls else 0.0,
+                }
+        return snapshot
+
+
+def _label(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_openmetrics(snapshot: dict) -> str:
+    """The snapshot of a ProgressReporter in the OpenMetrics text format."""
+    lines = []
+
+    def family(name: str, kind: str, help_text: str, samples: list[tuple[str, str, float]]) -> None:
+        lines.append(f'# TYPE pipelib_{name} {kind}')
+        lines.append(f'# HELP pipelib_{name} {help_text}')
+        suffix = '_total' if kind == 'counter' else ''
+        for label_name, label_value, value in samples:
+            labels = f'{{{label_name}="{_label(label_value)}"}}' if label_name else ''
+            lines.append(f'pipelib_{name}{suffix}{labels} {value}')
+
+    steps = snapshot.get('steps', {})
+    family('records_in', 'counter', 'Records read into the pipeline.', [('', '', snapshot.get('records_in', 0))])
+    family('records_out', 'counter', 'Records through all steps, by outcome.', [
+        ('status', 'kept', snapshot.get('records_kept', 0)),
+        ('status', 'omitted', snapshot.get('records_omitted', 0)),
+    ])
+    family('omitted', 'counter', 'Omitted records by reason.', [
+        ('reason', reason, count) for reason, count in snapshot.get('omit_reasons', {}).items()
+    ])
+    family('step_calls', 'counter', 'Records processed by each step.', [('step', name, step['calls']) for name, step in steps.items()])
+    family('step_omits', 'counter', 'Records omitted by each step.', [('step', name, step['omits']) for name, step in steps.items()])
+    family('step_seconds', 'counter', 'Time spent in each step.', [('step', name, step['seconds']) for name, step in steps.items()])
+    family('step_rate', 'gauge', 'Records per second through each step.', [('step', name, step['rate']) for name, step in steps.items()])
+    family('step_latency_seconds', 'gauge', 'Average time per record of each step.', [
+        ('step', name, step['latency_seconds']) for name, step in steps.items()
+    ])
+    family('queue_depth', 'gauge', 'Records waiting in each queue.', [
+        ('queue', name, depth) for name, depth in snapshot.get('queues', {}).items()
+    ])
+    memory = snapshot.get('memory') or {}
+    family('memory_bytes', 'gauge', 'Memory of the process at the last memory sample.', [
+        ('kind', kind, memory[kind]) for kind in ('rss', 'uss') if memory.get(kind) is not None
+    ])
+    family('structure_size', 'gauge', 'Sizes of the structures the steps grow across records.', [
+        ('structure', name, size) for name, size in memory.get('structures', {}).items()
+    ])
+    family('records_per_second', 'gauge', 'Records out per second.', [('', '', snapshot.get('records_per_second', 0.0))])
+    family('progress_ratio', 'gauge', 'Fraction of the input processed.', [('', '', snapshot.get('progress', 0.0))])
+    if snapshot.get('eta_seconds') is not None:
+        family('eta_seconds', 'gauge', 'Estimated time left.', [('', '', snapshot['eta_seconds'])])
+    lines.append('# EOF')
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsServer:
+    """Serves the latest snapshot of a ProgressReporter as OpenMetrics text on a background thread."""
+
+    def __init__(self, reporter: ProgressReporter, port: int, host: str = '127.0.0.1'):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = render_openmetrics(reporter.latest).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', OPENMETRICS_CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name='pipelib-metrics', daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
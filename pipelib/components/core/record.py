@@ -1,31 +1,102 @@
 import json
+from typing import Callable
+
+
+class RecordSource:
+    """The memory-mapped input that records read their original text back from."""
+    __slots__ = ('buffer', 'loads')
+
+    def __init__(self, buffer, loads: Callable[[bytes], object]):
+        self.buffer = buffer
+        self.loads = loads
+
+    def text(self, offset: int, length: int) -> str:
+        return self.loads(self.buffer[offset:offset + length])['text']
 
 
 class Record:
+    # Derived attributes that can be dropped once the last step using them has run
+    RELEASABLE = ('tokens',)
+
+    __slots__ = (
+        'url', 'id', 'cleaned', 'lang', 'lang_score', 'toxicity', 'char_count', 'token_count', 'ascii_ratio', 'symbol_ratio', 'tokens',
+        'source_offset', 'source_length', 'anonymized', 'html_extracted', 'omit', 'omit_reason',
+        '_original', '_source',
+    )
+
     _next_id = 1
 
     def __init__(self, original: str, url: str):
-        self.original: str = original
+        self._original: str|None = original
+        self._source: RecordSource|None = None
         self.url: str = url
         self.id: int = Record._next_id
 
         Record._next_id += 1
 
         # Derived
-        self.cleaned: str = self.original
+        self.cleaned: str = original
         self.lang: str|None = None
+        self.lang_score: float|None = None
+        self.toxicity: float|None = None
         self.char_count: int|None = None
         self.token_count: int|None = None
         self.ascii_ratio: float|None = None
         self.symbol_ratio: float|None = None
         self.tokens: list[str]|None = None
 
+        # Position of the source line in the (decompressed) input, set by the reader
+        self.source_offset: int|None = None
+        self.source_length: int|None = None
+
         self.anonymized = False
         self.html_extracted = False
 
         self.omit: bool = False
         self.omit_reason: str|None = None
 
+    @classmethod
+    def number_from(cls, first_id: int) -> None:
+        """Number the records created from now on from first_id."""
+        cls._next_id = first_id
+
+    @classmethod
+    def from_source(cls, text: str, url: str, source: RecordSource, offset: int, length: int) -> 'Record':
+        """
+        Record whose original text is not kept in memory. It is decoded again from the
+        memory-mapped input when needed, e.g. for the omit log.
+        """
+        record = cls(text, url)
+        record._original = None
+        record._source = source
+        record.source_offset = offset
+        record.source_length = length
+        return record
+
+    @property
+    def original(self) -> str:
+        if self._original is None and self._source is not None:
+            return self._source.text(self.source_offset, self.source_length)
+        return self._original
+
+    @original.setter
+    def original(self, value: str) -> None:
+        self._original = value
+
+    def __getstate__(self) -> dict:
+        # The input map stays with the process that read it, the original is not transferred
+        return {name: getattr(self, name) for name in self.__slots__ if name != '_source'}
+
+    def __setstate__(self, state: dict) -> None:
+        if not hasattr(self, '_source'):
+            self._source = None
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    def release(self, attributes: tuple[str, ...] = RELEASABLE) -> None:
+        for attribute in attributes:
+            setattr(self, attribute, None)
+
     def to_dict(self) -> dict:
         return {
             'id': self.id,
@@ -35,17 +106,34 @@ class Record:
             # 'original': self.original,
         }
 
-    def write_successful_jsonl(self, handle):
-        d = self.to_dict()
-        handle.write(json.dumps(d))
-        handle.write('\n')
-
-    def write_failed_jsonl(self, handle):
-        d = {
+    def to_failed_dict(self) -> dict:
+        return {
             'id': self.id,
             'reason': self.omit_reason,
             'lang': self.lang,
             'original': self.original,
         }
-        handle.write(json.dumps(d))
-        handle.write('\n')
+
+    def to_compact_failed_dict(self) -> dict:
+        return {
+            'id': self.id,
+            'reason': self.omit_reason,
+            'lang': self.lang,
+            'offset': self.source_offset,
+            'length': self.source_length,
+        }
+
+    def to_successful_jsonl(self) -> str:
+        return json.dumps(self.to_dict()) + '\n'
+
+    def to_failed_jsonl(self) -> str:
+        return json.dumps(self.to_failed_dict()) + '\n'
+
+    def to_compact_failed_jsonl(self) -> str:
+        return json.dumps(self.to_compact_failed_dict()) + '\n'
+
+    def write_successful_jsonl(self, handle):
+        handle.write(self.to_successful_jsonl())
+
+    def write_failed_jsonl(self, handle):
+        handle.write(self.to_failed_jsonl())
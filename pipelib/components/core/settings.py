@@ -5,6 +5,8 @@ from dataclasses import dataclass
 @dataclass(frozen=True)
 class PipelineConfigDefaults:
     SHARD_SIZE = 10_000
+    SHARD_BYTES = 0
+    SHARD_TOKENS = 0
     MIN_CHAR_LEN = 50
     MIN_TOKEN_LEN = 30
     MAX_CHAR_LEN = 20_000
@@ -12,19 +14,86 @@ class PipelineConfigDefaults:
     MAX_SYMBOL_RATIO = 0.25
     MIN_STOPWORD_HITS = 3
     REQUIRE_ENGLISH = True
+    DETECT_LANGUAGE = False
     TOXICITY_THRESHOLD = 0.7
     TOXICITY_BATCH_SIZE = 1000
+    HTML_BACKEND = 'auto'
+    PII_CHUNK_SIZE = 4_000
+    PII_CHUNK_OVERLAP = 200
     WORKERS = 6
+    PROCESS_WORKERS = 0
+    TRANSPORT = 'shared'
+    BATCH_SIZE = 1
+    JSON_DECODER = 'auto'
+    COMPRESSION = 'none'
+    OUTPUT_FORMAT = 'jsonl'
+    OMIT_LOG = 'full'
+    OMIT_SAMPLE_RATE = 0.0
+    CACHE_BYTES = 1 << 30
+    WRITE_SCORES = False
+    ESTIMATE_SAMPLES = 1000
+    PROGRESS_INTERVAL = 10.0
+    METRICS_PORT = 0
+    PROFILE_RECORDS = 1000
+    MEMORY_INTERVAL = 30.0
+    TASK_BYTES = 256 * 1024 * 1024
+    LEASE_SECONDS = 300.0
+    MAX_ATTEMPTS = 3
+    DEDUP_PARTITIONS = 4
 
 
 @dataclass
 class PipelineConfig:
     input_path: Path
     output_dir: Path
+    compression: str = PipelineConfigDefaults.COMPRESSION
+    output_format: str = PipelineConfigDefaults.OUTPUT_FORMAT
+    tokenizer_path: Path | None = None
+    omit_log: str = PipelineConfigDefaults.OMIT_LOG
+    omit_sample_rate: float = PipelineConfigDefaults.OMIT_SAMPLE_RATE
+    write_scores: bool = PipelineConfigDefaults.WRITE_SCORES
+    cache_dir: Path | None = None
+    cache_bytes: int = PipelineConfigDefaults.CACHE_BYTES
     debug_info: bool = False
+    # Seconds between progress events, and the local port serving OpenMetrics, 0 disables it
+    progress_interval: float = PipelineConfigDefaults.PROGRESS_INTERVAL
+    metrics_port: int = PipelineConfigDefaults.METRICS_PORT
+    # Profiling, needs debug_info: the slowest step calls to keep (0 disables), and the step to
+    # trace the calls of for its first profile_records records
+    profile_top: int = 0
+    profile_step: str | None = None
+    profile_records: int = PipelineConfigDefaults.PROFILE_RECORDS
+    # Seconds between memory samples (0 disables), and the records to trace allocations for
+    # with tracemalloc per step, after a warm-up of as many (0 disables)
+    memory_interval: float = PipelineConfigDefaults.MEMORY_INTERVAL
+    memory_trace: int = 0
     input_limit: int = 0
+    # Threshold sweep, candidate values per threshold field and the variant to write outputs for
+    sweep: dict[str, list] | None = None
+    sweep_select: int | None = None
+    # Records to sample for an estimate of a full run, 0 runs the pipeline
+    estimate: int = 0
+    # Distributed mode, 'coordinator' or 'worker' with the host:port the coordinator listens on.
+    # The coordinator leases byte ranges of task_bytes to workers, optionally local_workers of its
+    # own, and hosts the dedup_partitions of the global dedup set, whose host:port addresses it
+    # hands to the workers in dedup_servers
+    distributed: str | None = None
+    distributed_address: str | None = None
+    local_workers: int = 0
+    task_bytes: int = PipelineConfigDefaults.TASK_BYTES
+    lease_seconds: float = PipelineConfigDefaults.LEASE_SECONDS
+    max_attempts: int = PipelineConfigDefaults.MAX_ATTEMPTS
+    dedup_partitions: int = PipelineConfigDefaults.DEDUP_PARTITIONS
+    dedup_servers: tuple[str, ...] = ()
+    json_decoder: str = PipelineConfigDefaults.JSON_DECODER
     workers: int = PipelineConfigDefaults.WORKERS
+    process_workers: int = PipelineConfigDefaults.PROCESS_WORKERS
+    # How records pass to the process workers, 'shared' memory rings or 'pickle'
+    transport: str = PipelineConfigDefaults.TRANSPORT
+    batch_size: int = PipelineConfigDefaults.BATCH_SIZE
     shard_size: int = PipelineConfigDefaults.SHARD_SIZE
+    shard_bytes: int = PipelineConfigDefaults.SHARD_BYTES
+    shard_tokens: int = PipelineConfigDefaults.SHARD_TOKENS
     min_char_len: int = PipelineConfigDefaults.MIN_CHAR_LEN
     min_token_len: int = PipelineConfigDefaults.MIN_TOKEN_LEN
     max_char_len: int = PipelineConfigDefaults.MAX_CHAR_LEN
@@ -34,11 +103,20 @@ class PipelineConfig:
 
     # Language filter
     require_english: bool = PipelineConfigDefaults.REQUIRE_ENGLISH
+    # Detect the language of records that are kept regardless, so a refilter can require English
+    detect_language: bool = PipelineConfigDefaults.DETECT_LANGUAGE
 
     # Toxicity filter
     toxicity_threshold: float = PipelineConfigDefaults.TOXICITY_THRESHOLD
     toxicity_batch_size: int = PipelineConfigDefaults.TOXICITY_BATCH_SIZE
 
+    # HTML extractor
+    html_backend: str = PipelineConfigDefaults.HTML_BACKEND
+
+    # PII modifier
+    pii_chunk_size: int = PipelineConfigDefaults.PII_CHUNK_SIZE
+    pii_chunk_overlap: int = PipelineConfigDefaults.PII_CHUNK_OVERLAP
+
 #
 # try:
 #     nltk.data.find("corpora/stopwords")
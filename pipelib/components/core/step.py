@@ -5,12 +5,31 @@ from pipelib.components.core.settings import PipelineConfig
 
 
 class Step:
+    # Record attributes the step sets and reads, used to release them after their last use
+    produces: tuple[str, ...] = ()
+    consumes: tuple[str, ...] = ()
+    # Steps with state shared across records run in the parent process in pre-fork mode
+    stateful: bool = False
+    # Config fields the step's output depends on. Steps that set it only read record.cleaned,
+    # and their results are cached by its content when a cache directory is configured.
+    cache_config: tuple[str, ...] | None = None
+
     def __init__(self, config: PipelineConfig):
         self.config = config
 
     def process(self, record: Record) -> Record:
         raise NotImplementedError()
 
+    def batch_process(self, records: list[Record]) -> list[Record]:
+        return [self.process(record) for record in records]
+
+    def state_sizes(self) -> dict[str, int]:
+        """Sizes of the structures the step grows across records, reported by the memory monitor."""
+        return {}
+
+    def close(self) -> None:
+        """Release the resources of the step, called once the pipeline is done with it."""
+
 
 class BatchStep:
     def __init__(self, config: PipelineConfig):
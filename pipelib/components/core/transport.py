@@ -0,0 +1,208 @@
+from array import array
+from itertools import chain
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from operator import attrgetter
+
+import numpy as np
+
+from pipelib.components.core.record import Record
+
+# Slab bytes per record of a batch, enough for the input and result texts of an ASCII record of
+# max_char_len characters. Batches that do not fit their slab go through the pickled path.
+SLAB_BYTES_PER_RECORD = 64 * 1024
+
+# Record fields by how they are laid out in a slot, tokens are joined with TOKEN_SEPARATOR
+TEXT_FIELDS = ('_original', 'cleaned', 'url', 'lang', 'omit_reason', 'tokens')
+INT_FIELDS = ('id', 'source_offset', 'source_length', 'char_count', 'token_count')
+FLOAT_FIELDS = ('lang_score', 'toxicity', 'ascii_ratio', 'symbol_ratio')
+BOOL_FIELDS = ('omit', 'anonymized', 'html_extracted')
+TOKEN_SEPARATOR = '\x1f'
+
+# Metadata slot of a record. A span is the (offset, length) of a UTF-8 text in the slab of the
+# slot, and the *_none flags mark the numbers that are None.
+SLOT_DTYPE = np.dtype([
+    ('spans', np.int64, (len(TEXT_FIELDS), 2)),
+    ('ints', np.int64, (len(INT_FIELDS),)),
+    ('floats', np.float64, (len(FLOAT_FIELDS),)),
+    ('flags', np.bool_, (len(BOOL_FIELDS),)),
+    ('ints_none', np.bool_, (len(INT_FIELDS),)),
+    ('floats_none', np.bool_, (len(FLOAT_FIELDS),)),
+])
+# Span lengths of a None and of a text left as it was read from the slot
+NONE = -1
+KEPT = -2
+
+INT_TYPES = frozenset((int, np.int64, np.int32, type(None)))
+FLOAT_TYPES = frozenset((float, np.float64, np.float32, type(None)))
+
+_TOKENS = TEXT_FIELDS.index('tokens')
+_texts = attrgetter(*TEXT_FIELDS)
+_ints = attrgetter(*INT_FIELDS)
+_floats = attrgetter(*FLOAT_FIELDS)
+_flags = attrgetter(*BOOL_FIELDS)
+
+
+def _join_tokens(tokens) -> str | None:
+    """Tokens as one text, None when they cannot be split back."""
+    if type(tokens) is not list or not all(type(token) is str and token and TOKEN_SEPARATOR not in token for token in tokens):
+        return None
+    return TOKEN_SEPARATOR.join(tokens)
+
+
+def _split_tokens(text: str) -> list[str]:
+    return text.split(TOKEN_SEPARATOR) if text else []
+
+
+class SharedRecordRing:
+    """
+    Records of the in-flight batches of PreforkPool in a multiprocessing.shared_memory block:
+    a ring of slots, each with fixed-size metadata rows for up to capacity records followed
+    by a slab of their texts as UTF-8. The parent writes a batch into a slot and a worker reads
+    it, runs its steps and writes the results after the input in the same slot, so only the
+    slot handle and the step insights pass through the pool's queues. A text field that a
+    step left unchanged is not copied back.
+    """
+
+    def __init__(self, slots: int, capacity: int, slab_bytes: int, name: str | None = None):
+        self.slots = slots
+        self.capacity = capacity
+        self.slab_bytes = slab_bytes
+        meta_bytes = slots * capacity * SLOT_DTYPE.itemsize
+        self.memory = SharedMemory(name=name, create=name is None, size=meta_bytes + slots * slab_bytes)
+        self.name = self.memory.name
+        self.meta = np.ndarray((slots, capacity), dtype=SLOT_DTYPE, buffer=self.memory.buf)
+        self.slabs = self.memory.buf[meta_bytes:meta_bytes + slots * slab_bytes]
+
+    @classmethod
+    def for_batches(cls, slots: int, capacity: int) -> 'SharedRecordRing':
+        return cls(slots, capacity, capacity * SLAB_BYTES_PER_RECORD)
+
+    @property
+    def handle(self) -> tuple[str, int, int, int]:
+        return self.name, self.slots, self.capacity, self.slab_bytes
+
+    @classmethod
+    def attach(cls, handle: tuple[str, int, int, int]) -> 'SharedRecordRing':
+        name, slots, capacity, slab_bytes = handle
+        return cls(slots, capacity, slab_bytes, name=name)
+
+    def write(self, slot: int, records: list[Record], start: int = 0, previous: list[tuple] | None = None) -> int | None:
+        """
+        Write records into the slot, their texts to the slab from byte start on, and return the
+        end of the texts. Text fields that are still the objects in previous, the values read
+        from the slot, are marked as kept. Returns None when the records do not fit the slot or
+        have a value that cannot be written, leaving the slot to be rewritten.
+        """
+        count = len(records)
+        if count > self.capacity:
+            return None
+        ints = list(chain.from_iterable(map(_ints, records)))
+        floats = list(chain.from_iterable(map(_floats, records)))
+        if not INT_TYPES.issuperset(map(type, ints)) or not FLOAT_TYPES.issuperset(map(type, floats)):
+            return None
+
+        # Texts are encoded one by one, joining them first would widen a batch of ASCII texts to
+        # the widest character of any of them. Spans are collected flat, numpy converts a flat
+        # list far faster than a nested one.
+        slab = self.slabs[slot * self.slab_bytes:(slot + 1) * self.slab_bytes]
+        spans = []
+        position = start
+        for index, record in enumerate(records):
+            values = _texts(record)
+            kept = previous[index] if previous is not None else ()
+            original = None
+            for field_idx, value in enumerate(values):
+                if kept and value is kept[field_idx]:
+                    spans += (0, KEPT)
+                elif value is None:
+                    spans += (0, NONE)
+                elif original is not None and value is values[0]:
+                    spans += original  # cleaned as read, before a step changes it
+                else:
+                    text = _join_tokens(value) if field_idx == _TOKENS else value
+                    if type(text) is not str:
+                        return None
+                    data = text.encode('utf-8', 'surrogatepass')
+                    end = position + len(data)
+                    if end > self.slab_bytes:
+                        return None
+                    slab[position:end] = data
+                    span = (position, len(data))
+                    spans += span
+                    position = end
+                    if field_idx == 0:
+                        original = span
+
+        if count:
+            meta = self.meta[slot, :count]
+            meta['spans'] = np.frombuffer(array('q', spans), np.int64).reshape(count, len(TEXT_FIELDS), 2)
+            meta['ints'] = np.frombuffer(array('q', [0 if value is None else value for value in ints]), np.int64).reshape(count, -1)
+            meta['floats'] = np.frombuffer(array('d', [0.0 if value is None else value for value in floats]), np.float64).reshape(count, -1)
+            meta['flags'] = np.frombuffer(bytes(map(bool, chain.from_iterable(map(_flags, records)))), np.bool_).reshape(count, -1)
+            meta['ints_none'] = np.frombuffer(bytes(value is None for value in ints), np.bool_).reshape(count, -1)
+            meta['floats_none'] = np.frombuffer(bytes(value is None for value in floats), np.bool_).reshape(count, -1)
+        return position
+
+    def read(self, slot: int, count: int) -> tuple[list[Record], list[tuple]]:
+        """Records of the slot with the text field values they were given, for write's previous."""
+        slab = self.slabs[slot * self.slab_bytes:(slot + 1) * self.slab_bytes]
+        records, texts = [], []
+        for row in self._rows(slot, count):
+            record = Record.__new__(Record)
+            record._source = None
+            values = tuple(
+                None if length == NONE else str(slab[position:position + length], 'utf-8', 'surrogatepass')
+                for position, length in row[0]
+            )
+            if values[_TOKENS] is not None:
+                values = (*values[:_TOKENS], _split_tokens(values[_TOKENS]), *values[_TOKENS + 1:])
+            for field, value in zip(TEXT_FIELDS, values):
+                setattr(record, field, value)
+            self._set_numbers(record, row)
+            records.append(record)
+            texts.append(values)
+        return records, texts
+
+    def update(self, slot: int, records: list[Record]) -> None:
+        """Copy the results a worker wrote into the slot onto the records that were written to it."""
+        slab = self.slabs[slot * self.slab_bytes:(slot + 1) * self.slab_bytes]
+        for record, row in zip(records, self._rows(slot, len(records))):
+            for field_idx, (position, length) in enumerate(row[0]):
+                if length == KEPT:
+                    continue
+                value = None if length == NONE else str(slab[position:position + length], 'utf-8', 'surrogatepass')
+                if field_idx == _TOKENS and value is not None:
+                    value = _split_tokens(value)
+                setattr(record, TEXT_FIELDS[field_idx], value)
+            self._set_numbers(record, row)
+
+    def _rows(self, slot: int, count: int) -> zip:
+        # Field by field, tolist() of a structured array would leave the subarrays as arrays
+        meta = self.meta[slot, :count]
+        return zip(*(meta[name].tolist() for name in SLOT_DTYPE.names))
+
+    @staticmethod
+    def _set_numbers(record: Record, row: tuple) -> None:
+        _, ints, floats, flags, ints_none, floats_none = row
+        for field, value, is_none in zip(INT_FIELDS + FLOAT_FIELDS, ints + floats, ints_none + floats_none):
+            setattr(record, field, None if is_none else value)
+        for field, value in zip(BOOL_FIELDS, flags):
+            setattr(record, field, value)
+
+    def close(self) -> None:
+        # The views into the block have to be released before it can be closed
+        self.meta = None
+        self.slabs.release()
+        self.memory.close()
+
+    def unlink(self) -> None:
+        self.memory.unlink()
+
+
+def start_tracker() -> None:
+    """
+    Start the resource tracker before forking, so that the workers register the blocks they
+    attach to with the parent's tracker, which forgets them when the parent unlinks them.
+    """
+    resource_tracker.ensure_running()
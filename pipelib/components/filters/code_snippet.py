@@ -1,5 +1,7 @@
 import re
 
+import numpy as np
+
 from pipelib.components.core import Filter, FilterResult
 from pipelib.components.core.record import Record
 from pipelib.components.core.settings import PipelineConfig
@@ -11,6 +13,9 @@ class CodeSnippetFilter(Filter):
     Optimized for catching Python, JavaScript, and HTML while avoiding false positives.
     """
 
+    consumes = ('tokens',)
+    omit_reasons = ('code_snippet',)
+
     # Code-specific punctuation patterns (reduced set)
     CODE_PUNCT_CHARS = set("{}[]();=<>")
 
@@ -39,6 +44,15 @@ class CodeSnippetFilter(Filter):
     ASSIGNMENT_PATTERN = re.compile(r'^\s*\w+\s*=\s*[\w\[\{\(\'"]', re.MULTILINE)
     METHOD_CALL_PATTERN = re.compile(r'\.\w+\s*\(')
 
+    # The three patterns above as one scanner. Assignments are matched inside a lookahead so that
+    # they never consume the start of a function definition (e.g. "x = function f(").
+    CODE_SIGNAL_PATTERN = re.compile(
+        r'(?P<function_def>' + FUNCTION_DEF_PATTERN.pattern + r')'
+        r'|(?=(?P<assignment>' + ASSIGNMENT_PATTERN.pattern + r'))'
+        r'|(?P<method_call>' + METHOD_CALL_PATTERN.pattern + r')',
+        re.MULTILINE,
+    )
+
     # Common code line starters (must be at start of line after whitespace)
     CODE_LINE_STARTERS = (
         '//', '#', '/*', '*/', '--', '<!--',
@@ -72,55 +86,50 @@ class CodeSnippetFilter(Filter):
         self.english_stopwords = CodeSnippetFilter.ENGLISH_STOPWORDS
 
     def _has_strong_code_patterns(self, text: str) -> bool:
-        """Check for strong indicators of code structure."""
-        # Function definitions are very strong signals
-        if self.FUNCTION_DEF_PATTERN.search(text):
-            return True
-
-        # Multiple method calls (object.method())
-        if len(self.METHOD_CALL_PATTERN.findall(text)) >= 3:
-            return True
-
-        # Multiple assignments at line starts
-        if len(self.ASSIGNMENT_PATTERN.findall(text)) >= 4:
-            return True
-
+        """
+        Check for strong indicators of code structure in a single scan, stopping at the first decisive one:
+        a function definition, 3+ method calls (object.method()) or 4+ assignments at line starts.
+        """
+        method_calls = 0
+        assignments = 0
+        assignment_end = 0
+        for match in self.CODE_SIGNAL_PATTERN.finditer(text):
+            kind = match.lastgroup
+            if kind == 'function_def':
+                return True
+            if kind == 'method_call':
+                method_calls += 1
+                if method_calls >= 3:
+                    return True
+            elif match.start() >= assignment_end:
+                # Count non-overlapping assignments only, as ASSIGNMENT_PATTERN.findall would
+                assignments += 1
+                assignment_end = match.end('assignment')
+                if assignments >= 4:
+                    return True
         return False
 
-    @staticmethod
-    def _count_bracket_pairs(text: str) -> int:
-        """Count matched bracket pairs (indicates structured code)."""
-        pairs = 0
-        pairs += min(text.count('('), text.count(')'))
-        pairs += min(text.count('['), text.count(']'))
-        pairs += min(text.count('{'), text.count('}'))
-        return pairs
+    def _char_stats(self, text: str) -> tuple[int, int]:
+        """Returns (code punctuation count, matched bracket pairs) from one count per punctuation character."""
+        counts = {c: text.count(c) for c in self.CODE_PUNCT_CHARS}
+        bracket_pairs = min(counts['('], counts[')']) + min(counts['['], counts[']']) + min(counts['{'], counts['}'])
+        return sum(counts.values()), bracket_pairs
 
     @staticmethod
     def _found_code_snippet():
         return FilterResult.omit('code_snippet')
 
-    def _filter(self, record: Record) -> FilterResult:
-        text = record.cleaned
-        low = text.lower()
-
-        # Strong pattern check - immediate rejection
-        if self._has_strong_code_patterns(text):
-            return CodeSnippetFilter._found_code_snippet()
-
-        # Analyze lines
-        lines = [ln for ln in low.splitlines() if ln.strip()]
-        if not lines:
-            return FilterResult.keep()
-
-        total_lines = len(lines)
+    def _line_stats(self, low: str) -> tuple[int, int, int]:
+        """Returns (non-blank lines, code-like lines, heavily indented lines)."""
+        total_lines = 0
         codey_lines = 0
         indent_lines = 0
 
-        for ln in lines:
+        for ln in low.splitlines():
             stripped = ln.lstrip()
             if not stripped:
                 continue
+            total_lines += 1
 
             # Count heavily indented lines (8+ spaces or 2+ tabs)
             indent_amount = len(ln) - len(stripped)
@@ -131,9 +140,33 @@ class CodeSnippetFilter(Filter):
             if stripped.startswith(self.CODE_LINE_STARTERS):
                 codey_lines += 1
             # Check line enders
-            elif any(stripped.endswith(ender) for ender in self.CODE_LINE_ENDERS):
+            elif stripped.endswith(self.CODE_LINE_ENDERS):
                 codey_lines += 1
 
+        return total_lines, codey_lines, indent_lines
+
+    def _tokens(self, record: Record, low: str) -> list[str]:
+        return record.tokens if record.tokens else low.split()
+
+    def _token_hits(self, tokens: list[str]) -> tuple[int, int]:
+        """Returns (stopword hits, code keyword hits)."""
+        stop_hits = sum(map(self.english_stopwords.__contains__, tokens))
+        code_kw_hits = sum(map(self.CODE_KEYWORDS.__contains__, tokens))
+        return stop_hits, code_kw_hits
+
+    def _filter(self, record: Record) -> FilterResult:
+        text = record.cleaned
+
+        # Strong pattern check - immediate rejection
+        if self._has_strong_code_patterns(text):
+            return CodeSnippetFilter._found_code_snippet()
+
+        # Analyze lines
+        low = text.lower()
+        total_lines, codey_lines, indent_lines = self._line_stats(low)
+        if not total_lines:
+            return FilterResult.keep()
+
         # Calculate ratios
         codey_ratio = codey_lines / total_lines
         indent_ratio = indent_lines / total_lines
@@ -146,27 +179,19 @@ class CodeSnippetFilter(Filter):
         if indent_ratio > 0.5 and codey_ratio > 0.25:
             return CodeSnippetFilter._found_code_snippet()
 
-        # Character-level analysis
-        code_punct_count = sum(1 for c in text if c in self.CODE_PUNCT_CHARS)
+        # Character-level analysis and bracket pairs
+        code_punct_count, bracket_pairs = self._char_stats(text)
         code_punct_ratio = code_punct_count / max(len(text), 1)
-
-        # Bracket pair analysis
-        bracket_pairs = self._count_bracket_pairs(text)
         bracket_density = bracket_pairs / max(len(text), 1) * 100  # per 100 chars
 
         # Token analysis
-        if not record.tokens:
-            tokens = low.split()
-        else:
-            tokens = record.tokens
+        tokens = self._tokens(record, low)
 
         if len(tokens) == 0:
             return FilterResult.keep()
 
-        stop_hits = sum(1 for t in tokens if t in self.english_stopwords)
+        stop_hits, code_kw_hits = self._token_hits(tokens)
         stop_ratio = stop_hits / len(tokens)
-
-        code_kw_hits = sum(1 for t in tokens if t in self.CODE_KEYWORDS)
         code_kw_ratio = code_kw_hits / len(tokens)
 
         # Natural text typically has 20-40% stopwords, so we use much lower thresholds
@@ -194,3 +219,51 @@ class CodeSnippetFilter(Filter):
                 return CodeSnippetFilter._found_code_snippet()
 
         return FilterResult.keep()
+
+    def _batch_filter(self, records: list[Record]) -> list[FilterResult]:
+        """
+        Columnar version of _filter. Features are gathered stage by stage, only for the records
+        still undecided, and the threshold rules are evaluated as boolean masks over the batch.
+        """
+        n = len(records)
+        texts = [record.cleaned for record in records]
+        lows: list[str | None] = [None] * n
+
+        # Stage 1: strong patterns
+        omit = np.fromiter((self._has_strong_code_patterns(text) for text in texts), dtype=bool, count=n)
+
+        # Stage 2: line statistics
+        line_stats = np.zeros((n, 3), dtype=np.int64)
+        for i in np.flatnonzero(~omit).tolist():
+            lows[i] = texts[i].lower()
+            line_stats[i] = self._line_stats(lows[i])
+        total_lines, codey_lines, indent_lines = line_stats.T
+        has_lines = ~omit & (total_lines > 0)
+        total_lines = np.maximum(total_lines, 1)
+        codey_ratio = codey_lines / total_lines
+        indent_ratio = indent_lines / total_lines
+        omit |= has_lines & ((codey_ratio > 0.4) | ((indent_ratio > 0.5) & (codey_ratio > 0.25)))
+
+        # Stage 3: character and token statistics
+        char_stats = np.zeros((n, 6), dtype=np.int64)
+        for i in np.flatnonzero(has_lines & ~omit).tolist():
+            text = texts[i]
+            tokens = self._tokens(records[i], lows[i])
+            char_stats[i] = (len(text), *self._char_stats(text), len(tokens), *self._token_hits(tokens))
+        text_len, code_punct_count, bracket_pairs, n_tokens, stop_hits, code_kw_hits = char_stats.T
+        has_tokens = has_lines & ~omit & (n_tokens > 0)
+        text_len = np.maximum(text_len, 1)
+        code_punct_ratio = code_punct_count / text_len
+        bracket_density = bracket_pairs / text_len * 100
+        token_len = np.maximum(n_tokens, 1)
+        stop_ratio = stop_hits / token_len
+        code_kw_ratio = code_kw_hits / token_len
+        omit |= has_tokens & (
+            ((stop_ratio < 0.05) & (code_kw_hits >= 3) & (code_punct_ratio > 0.15))
+            | ((bracket_density > 3.0) & (stop_ratio < 0.08))
+            | ((code_kw_ratio > 0.20) & (stop_ratio < 0.10))
+            | ((n_tokens < 15) & (code_kw_hits >= 2) & (stop_ratio < 0.05) & (code_punct_ratio > 0.12))
+            | ((n_tokens >= 30) & (code_kw_hits >= 5) & (code_kw_ratio > 0.15) & (stop_ratio < 0.10))
+        )
+
+        return [CodeSnippetFilter._found_code_snippet() if o else FilterResult.keep() for o in omit.tolist()]
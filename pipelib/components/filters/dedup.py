@@ -1,4 +1,5 @@
 import re
+import sys
 import hashlib
 
 from pipelib.components.core import Filter, FilterResult
@@ -7,15 +8,25 @@ from pipelib.components.core.settings import PipelineConfig
 
 
 class DedupFilter(Filter):
+    stateful = True
+    omit_reasons = ('duplicate',)
+
     def __init__(self, config: PipelineConfig):
         super().__init__(config)
         self.dedup_hashes: set[str] = set()
         self._lock = None
+        # In distributed mode the set is partitioned across the servers of the coordinator
+        self.partitions = None
+        if config.dedup_servers:
+            from pipelib.distributed import DedupClient
+            self.partitions = DedupClient(config.dedup_servers)
         if config.workers > 1:
             import threading
             self._lock = threading.Lock()
 
     def _filter(self, record: Record) -> FilterResult:
+        if self.partitions is not None:
+            return self._batch_filter([record])[0]
         fingerprint = hash_fingerprint(record.cleaned)
         if self._lock:
             with self._lock:
@@ -28,7 +39,25 @@ class DedupFilter(Filter):
             self.dedup_hashes.add(fingerprint)
         return FilterResult.keep()
 
+    def _batch_filter(self, records: list[Record]) -> list[FilterResult]:
+        if self.partitions is None:
+            return super()._batch_filter(records)
+        # Claims carry the input offset of the record, so a retried task keeps the same records
+        keep = self.partitions.claim([(hash_fingerprint(record.cleaned), record.source_offset) for record in records])
+        return [FilterResult.keep() if kept else FilterResult.omit('duplicate') for kept in keep]
+
+    def state_sizes(self) -> dict[str, int]:
+        entries = len(self.dedup_hashes)
+        return {
+            'dedup_hashes': entries,
+            'dedup_hashes_bytes': sys.getsizeof(self.dedup_hashes) + entries * _FINGERPRINT_BYTES,
+        }
+
 
 def hash_fingerprint(text: str) -> str:
     canonical = re.sub(r"\s+", " ", text.lower()).strip()
     return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+
+# Size of one fingerprint string, the set only holds references to them
+_FINGERPRINT_BYTES = sys.getsizeof(hash_fingerprint(''))
@@ -2,32 +2,48 @@ import logging
 
 logging.getLogger('fast_langdetect.infer').setLevel(logging.ERROR)
 
-from fast_langdetect import LangDetectConfig, LangDetector
-
 from pipelib.components.core import Filter, FilterResult
+from pipelib.components.core.models import LazyModel, models
 from pipelib.components.core.record import Record
 from pipelib.components.core.settings import PipelineConfig
 
 
 class LanguageFilter(Filter):
+    lang_detect_model = LazyModel('fast_langdetect')
+    cache_config = ('require_english', 'detect_language')
+    omit_reasons = ('non_english',)
+
     def __init__(self, config: PipelineConfig):
         super().__init__(config)
-        self.lang_detect_config = LangDetectConfig(model='auto')
-        self.lang_detect_model = LangDetector(self.lang_detect_config)
 
     def _filter(self, record: Record) -> FilterResult:
+        if not self.config.require_english and not self.config.detect_language:
+            return FilterResult.keep()
+        detected = self.lang_detect_model.detect(record.cleaned, k=1)[0]
+        record.lang = detected['lang']
+        record.lang_score = float(detected['score']) if 'score' in detected else None
+        if not self.config.require_english:
+            return FilterResult.keep()
+        return self._lang_filter(record.lang)
+
+    @staticmethod
+    def _lang_filter(lang: str) -> FilterResult:
+        return FilterResult.omit('non_english') if lang != 'en' else FilterResult.keep()
+
+    def refilter(self, scores: dict) -> FilterResult | None:
         if not self.config.require_english:
             return FilterResult.keep()
-        record.lang = self.lang_detect_model.detect(record.cleaned, k=1)[0]['lang']
-        if record.lang != 'en':
-            return FilterResult.omit('non_english')
-        return FilterResult.keep()
-
-
-# Attempt downloading from a single thread and cold start
-_lang_detect_config = LangDetectConfig(model='auto')
-_lang_detect_model = LangDetector(_lang_detect_config)
-_lang = _lang_detect_model.detect('hello', k=1)[0]['lang']
-del _lang
-del _lang_detect_model
-del _lang_detect_config
+        if scores['lang'] is None:
+            return None
+        return self._lang_filter(scores['lang'])
+
+
+def _load_lang_detector():
+    from fast_langdetect import LangDetectConfig, LangDetector
+
+    lang_detect_model = LangDetector(LangDetectConfig(model='auto'))
+    lang_detect_model.detect('hello', k=1)  # downloads the model on first use
+    return lang_detect_model
+
+
+models.register('fast_langdetect', _load_lang_detector)
@@ -1,24 +1,73 @@
 import re
 
+import numpy as np
+
 from pipelib.components.core import Filter, FilterResult
 from pipelib.components.core.record import Record
 from pipelib.components.core.settings import PipelineConfig
 
 
 class PreliminaryFilter(Filter):
+    LONG_REPEAT_RE = re.compile(r'([a-zA-Z])\1{9,}')
+    omit_reasons = ('too_short', 'too_long', 'non_ascii_heavy', 'symbol_heavy', 'long_repeat')
+
     def __init__(self, config: PipelineConfig):
         super().__init__(config)
 
     def _filter(self, record: Record) -> FilterResult:
-        if record.char_count < self.config.min_char_len:
+        result = self._threshold_filter(record.char_count, record.ascii_ratio, record.symbol_ratio)
+        if result is not None:
+            return result
+        has_long_repeat = bool(PreliminaryFilter.LONG_REPEAT_RE.search(record.cleaned))
+        if has_long_repeat:
+            return FilterResult.omit('long_repeat')
+        return FilterResult.keep()
+
+    def _threshold_filter(self, char_count: int, ascii_ratio: float, symbol_ratio: float) -> FilterResult | None:
+        if char_count < self.config.min_char_len:
             return FilterResult.omit('too_short')
-        if record.char_count > self.config.max_char_len:
+        if char_count > self.config.max_char_len:
             return FilterResult.omit('too_long')
-        if record.ascii_ratio < self.config.min_ascii_ratio:
+        if ascii_ratio < self.config.min_ascii_ratio:
             return FilterResult.omit('non_ascii_heavy')
-        if record.symbol_ratio > self.config.max_symbol_ratio:
+        if symbol_ratio > self.config.max_symbol_ratio:
             return FilterResult.omit('symbol_heavy')
-        has_long_repeat = bool(re.search(r'([a-zA-Z])\1{9,}' , record.cleaned))
-        if has_long_repeat:
+        return None
+
+    def refilter(self, scores: dict) -> FilterResult | None:
+        if scores['char_count'] is None:
+            return None
+        result = self._threshold_filter(scores['char_count'], scores['ascii_ratio'], scores['symbol_ratio'])
+        if result is not None:
+            return result
+        if scores['omit_reason'] == 'long_repeat':
             return FilterResult.omit('long_repeat')
+        if scores['omit_reason'] in self.omit_reasons:
+            return None  # a threshold omitted the record before the repeat check ran
         return FilterResult.keep()
+
+    def _batch_filter(self, records: list[Record]) -> list[FilterResult]:
+        if not records:
+            return []
+        char_counts = np.array([record.char_count for record in records], dtype=np.int64)
+        ascii_ratios = np.array([record.ascii_ratio for record in records], dtype=np.float64)
+        symbol_ratios = np.array([record.symbol_ratio for record in records], dtype=np.float64)
+
+        # Rules in the same order as _filter, the first matching rule gives the reason
+        rules = [
+            ('too_short', char_counts < self.config.min_char_len),
+            ('too_long', char_counts > self.config.max_char_len),
+            ('non_ascii_heavy', ascii_ratios < self.config.min_ascii_ratio),
+            ('symbol_heavy', symbol_ratios > self.config.max_symbol_ratio),
+        ]
+        reason_idx = np.select([mask for _, mask in rules], np.arange(len(rules)), default=-1)
+
+        results = []
+        for record, idx in zip(records, reason_idx.tolist()):
+            if idx >= 0:
+                results.append(FilterResult.omit(rules[idx][0]))
+            elif PreliminaryFilter.LONG_REPEAT_RE.search(record.cleaned):
+                results.append(FilterResult.omit('long_repeat'))
+            else:
+                results.append(FilterResult.keep())
+        return results
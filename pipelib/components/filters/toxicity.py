@@ -1,39 +1,56 @@
 from typing import Iterable
 
-from detoxify import Detoxify
-
 from pipelib.components.core import BatchFilter, FilterResult, Filter
+from pipelib.components.core.models import LazyModel, models
 from pipelib.components.core.record import Record
 from pipelib.components.core.settings import PipelineConfig
 
 
 class ToxicityBatchFilter(BatchFilter):
+    detoxify_model = LazyModel('detoxify')
+
     def __init__(self, config: PipelineConfig):
         super().__init__(config)
-        self.detoxify_model = Detoxify('original-small')
 
     def _batch_filter(self, records: Iterable[Record]) -> Iterable[FilterResult]:
         record_list = list(records)
         tox_scores = self.detoxify_model.predict([record.cleaned for record in record_list])['toxicity']
-        return [
-            FilterResult.omit('toxic_content') if tox > self.config.toxicity_threshold else FilterResult.keep()
-            for tox in tox_scores
-        ]
+        results = []
+        for record, tox in zip(record_list, tox_scores):
+            record.toxicity = float(tox)
+            results.append(toxicity_filter(record.toxicity, self.config.toxicity_threshold))
+        return results
 
 
 class ToxicityFilter(Filter):
+    detoxify_model = LazyModel('detoxify')
+    cache_config = ()
+    refilter_cached = True
+    omit_reasons = ('toxic_content',)
+
     def __init__(self, config: PipelineConfig):
         super().__init__(config)
-        self.detoxify_model = Detoxify('original-small')
 
     def _filter(self, record: Record) -> FilterResult:
-        tox_score = self.detoxify_model.predict(record.cleaned)['toxicity']
-        return FilterResult.omit('toxic_content') \
-            if tox_score > self.config.toxicity_threshold else FilterResult.keep()
+        record.toxicity = float(self.detoxify_model.predict(record.cleaned)['toxicity'])
+        return toxicity_filter(record.toxicity, self.config.toxicity_threshold)
+
+    def refilter(self, scores: dict) -> FilterResult | None:
+        if scores['toxicity'] is None:
+            return None
+        return toxicity_filter(scores['toxicity'], self.config.toxicity_threshold)
+
+
+def toxicity_filter(tox_score: float, threshold: float) -> FilterResult:
+    return FilterResult.omit('toxic_content') if tox_score > threshold else FilterResult.keep()
+
+
+def _load_detoxify():
+    from detoxify import Detoxify
+
+    detoxify_model = Detoxify('original-small')
+    detoxify_model.predict('hello')
+    return detoxify_model
 
 
-# Attempt downloading from a single thread cold start
-_detoxify_model = Detoxify('original-small')
-_tox_score = _detoxify_model.predict('hello')['toxicity']
-del _tox_score
-del _detoxify_model
+models.register('detoxify', _load_detoxify)
@@ -1,21 +1,22 @@
 import re
 from typing import List
 
+import numpy as np
+
 from pipelib.components.core.attribute_modifier import AttributeModifier
 from pipelib.components.core.record import Record
 from pipelib.components.core.settings import PipelineConfig
 
 
 class AttributeEvaluationStep(AttributeModifier):
+    produces = ('tokens', 'char_count', 'token_count', 'ascii_ratio', 'symbol_ratio')
+
     def __init__(self, config: PipelineConfig):
         super().__init__(config)
 
     def _modify_attributes(self, record: Record) -> None:
-        record.tokens = tokenize(record.cleaned)
-        record.char_count = len(record.cleaned)
+        record.tokens, record.char_count, ascii_count, symbol_count = evaluate_text(record.cleaned)
         record.token_count = len(record.tokens)
-
-        ascii_count, symbol_count = compute_char_counts(record.cleaned)
         record.ascii_ratio = ascii_count / record.char_count if record.char_count else 0.0
         record.symbol_ratio = symbol_count / record.char_count if record.char_count else 0.0
 
@@ -27,7 +28,43 @@ def tokenize(text) -> List[str]:
     return TOKEN_RE.findall(text.lower())
 
 
+def evaluate_text(text: str) -> tuple[List[str], int, int, int]:
+    """Returns (tokens, char count, ASCII count, symbol count) of text."""
+    ascii_count, symbol_count = compute_char_counts(text)
+    return tokenize(text), len(text), ascii_count, symbol_count
+
+
+def _is_symbol(c: str) -> bool:
+    return not c.isalnum() and not c.isspace()
+
+
+_ASCII_SYMBOL_TABLE = np.array([_is_symbol(chr(cp)) for cp in range(128)], dtype=bool)
+
+
 def compute_char_counts(text: str) -> tuple[int, int]:
+    """
+    Vectorized over the code points of text. ASCII characters are classified with a lookup table;
+    the rarer non-ASCII ones are classified once per distinct code point.
+    """
+    if not text:
+        return 0, 0
+    if text.isascii():
+        codepoints = np.frombuffer(text.encode('ascii'), dtype=np.uint8)
+        return len(text), int(np.count_nonzero(_ASCII_SYMBOL_TABLE[codepoints]))
+
+    codepoints = np.frombuffer(text.encode('utf-32-le', 'surrogatepass'), dtype=np.uint32)
+    is_ascii = codepoints < 128
+    ascii_count = int(np.count_nonzero(is_ascii))
+    symbol_count = int(np.count_nonzero(_ASCII_SYMBOL_TABLE[codepoints[is_ascii]]))
+    distinct, counts = np.unique(codepoints[~is_ascii], return_counts=True)
+    for cp, count in zip(distinct.tolist(), counts.tolist()):
+        if _is_symbol(chr(cp)):
+            symbol_count += count
+    return ascii_count, symbol_count
+
+
+def compute_char_counts_reference(text: str) -> tuple[int, int]:
+    """Per-character implementation, kept for equivalence tests and benchmarks."""
     ascii_count = 0
     symbol_count = 0
     for c in text:
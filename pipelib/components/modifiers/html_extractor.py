@@ -1,7 +1,13 @@
 import re
+import threading
 from html.parser import HTMLParser
 from typing import List, Set
 
+try:
+    from lxml import etree
+except ImportError:  # lxml is optional, fall back to the stdlib parser
+    etree = None
+
 from pipelib.components.core import Modifier
 from pipelib.components.core.record import Record
 from pipelib.components.core.settings import PipelineConfig
@@ -46,7 +52,17 @@ class HTMLExtractorModifier(Modifier):
 
     def __init__(self, config: PipelineConfig):
         super().__init__(config)
-        self.parser = CleanHTMLParser()
+        self.parser_class = resolve_parser_class(config.html_backend)
+        # Parsers are stateful, so every worker thread gets its own instance.
+        self._local = threading.local()
+
+    @property
+    def parser(self) -> 'CleanTextCollector':
+        parser = getattr(self._local, 'parser', None)
+        if parser is None:
+            parser = self.parser_class()
+            self._local.parser = parser
+        return parser
 
     def _modify(self, record: Record) -> None:
         """Extract clean text from HTML if the record contains HTML."""
@@ -104,15 +120,12 @@ class HTMLExtractorModifier(Modifier):
         return '\n'.join(deduplicated).strip()
 
 
-class CleanHTMLParser(HTMLParser):
+class CleanTextCollector:
     """
-    Custom HTML parser that extracts clean text while filtering noise.
+    Tag and text handlers shared by the HTML parser backends.
+    Collects clean text while filtering noise.
     """
 
-    def __init__(self):
-        super().__init__()
-        self.reset_state()
-
     def reset_state(self):
         """Reset parser state for new document."""
         self.text_chunks: List[str] = []
@@ -122,9 +135,7 @@ class CleanHTMLParser(HTMLParser):
 
     def extract_text(self, html: str) -> str:
         """Main entry point to extract text from HTML."""
-        self.reset_state()
-        self.feed(html)
-        return ''.join(self.text_chunks)
+        raise NotImplementedError()
 
     def handle_starttag(self, tag, attrs):
         """Handle opening tags."""
@@ -255,6 +266,83 @@ class CleanHTMLParser(HTMLParser):
                     return True
         return False
 
+
+class CleanHTMLParser(CleanTextCollector, HTMLParser):
+    """
+    Pure Python backend built on the stdlib html.parser.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.reset_state()
+
+    def extract_text(self, html: str) -> str:
+        self.reset_state()
+        self.feed(html)
+        return ''.join(self.text_chunks)
+
+
+class LxmlCleanHTMLParser(CleanTextCollector):
+    """
+    Backend driven by the libxml2 HTML tokenizer through the lxml parser target interface.
+    Text is buffered until the next tag, as html.parser delivers it. The output is not always
+    the same as CleanHTMLParser's: libxml2 repairs the tree, so a block inside a <p> closes the
+    paragraph ('<p>a<div>b</div>c</p>' gives 'a\nb\nc' rather than 'ab\nc'), and removed
+    comments do not split the text around them ('a <!-- c --> b' gives 'a b' rather than 'ab').
+    """
+
+    def __init__(self):
+        self.parser = etree.HTMLParser(target=self, remove_comments=True, remove_pis=True)
+        self.pending_data: List[str] = []
+        self.reset_state()
+
+    def extract_text(self, html: str) -> str:
+        self.reset_state()
+        self.pending_data = []
+        self.parser.feed(html)
+        self.parser.close()
+        return ''.join(self.text_chunks)
+
+    def start(self, tag, attrib):
+        self._flush_data()
+        self.handle_starttag(tag, list(attrib.items()))
+
+    def end(self, tag):
+        self._flush_data()
+        self.handle_endtag(tag)
+
+    def data(self, data):
+        self.pending_data.append(data)
+
+    def close(self):
+        self._flush_data()
+
+    def _flush_data(self):
+        if self.pending_data:
+            data = ''.join(self.pending_data)
+            self.pending_data = []
+            self.handle_data(data)
+
+
+HTML_BACKENDS = {
+    'stdlib': CleanHTMLParser,
+    'lxml': LxmlCleanHTMLParser,
+}
+
+
+def resolve_parser_class(backend: str) -> type[CleanTextCollector]:
+    """
+    Map a backend name to its parser class. 'auto' is the stdlib parser, lxml is faster but its
+    output differs on some documents (see LxmlCleanHTMLParser) and has to be chosen explicitly.
+    """
+    if backend == 'auto':
+        backend = 'stdlib'
+    if backend not in HTML_BACKENDS:
+        raise ValueError(f'Unknown HTML backend: {backend}')
+    if backend == 'lxml' and etree is None:
+        raise ImportError('lxml is required for the lxml HTML backend')
+    return HTML_BACKENDS[backend]
+
 #
 # # Example usage and test
 # if __name__ == '__main__':
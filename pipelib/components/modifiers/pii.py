@@ -1,17 +1,18 @@
 import re
 import logging
+from typing import TYPE_CHECKING
 
 logging.getLogger('presidio-analyzer').setLevel(logging.ERROR)
 logging.getLogger('presidio-anonymizer').setLevel(logging.ERROR)
 
-
-from presidio_analyzer import AnalyzerEngine
-from presidio_anonymizer import AnonymizerEngine
-
 from pipelib.components.core import Modifier
+from pipelib.components.core.models import LazyModel, models
 from pipelib.components.core.record import Record
 from pipelib.components.core.settings import PipelineConfig
 
+if TYPE_CHECKING:
+    from presidio_analyzer import RecognizerResult
+
 
 class PIIModifier(Modifier):
     PRONOUN_MAP = {
@@ -27,22 +28,62 @@ class PIIModifier(Modifier):
     PRONOUN_RE = re.compile(
         r"\b(he|she|his|him|hers|her|himself|herself|He|She|His|Him|Hers|Her|Himself|Herself)\b"
     )
+    PII_ENTITIES = ['PERSON', 'EMAIL_ADDRESS', 'LOCATION', 'PHONE_NUMBER', 'IP_ADDRESS']
+
+    pii_analyzer = LazyModel('presidio_analyzer')
+    pii_anonymizer = LazyModel('presidio_anonymizer')
+    cache_config = ('pii_chunk_size', 'pii_chunk_overlap')
 
     def __init__(self, config: PipelineConfig):
         super().__init__(config)
-        self.pii_analyzer = AnalyzerEngine()
-        self.pii_anonymizer = AnonymizerEngine()
+        self._chunk_executor = None
+        if config.workers > 1:
+            from concurrent.futures import ThreadPoolExecutor
+            self._chunk_executor = ThreadPoolExecutor(max_workers=config.workers)
 
     def _modify(self, record: Record) -> None:
         self.anonimize(record)
         self.neutralize_pronouns(record)
 
-    def anonimize(self, record: Record) -> None:
-        analyzer_results = self.pii_analyzer.analyze(
-            text=record.cleaned,
+    def close(self) -> None:
+        if self._chunk_executor is not None:
+            self._chunk_executor.shutdown()
+            self._chunk_executor = None
+
+    def state_sizes(self) -> dict[str, int]:
+        # spaCy adds every new string it tokenizes to the vocab of the analyzer's pipeline
+        sizes = {}
+        nlp = getattr(getattr(self.pii_analyzer, 'nlp_engine', None), 'nlp', None) or {}
+        for language, pipeline in nlp.items():
+            sizes[f'spacy_vocab_{language}'] = len(pipeline.vocab)
+            sizes[f'spacy_strings_{language}'] = len(pipeline.vocab.strings)
+        return sizes
+
+    def analyze(self, text: str) -> list['RecognizerResult']:
+        """
+        Detect PII entities in text. Texts longer than config.pii_chunk_size are split into
+        overlapping chunks on paragraph/sentence boundaries, analyzed concurrently and merged.
+        """
+        if len(text) <= self.config.pii_chunk_size:
+            return self._analyze_chunk(text)
+
+        spans = split_into_chunks(text, self.config.pii_chunk_size, self.config.pii_chunk_overlap)
+        chunks = [text[start:end] for start, end in spans]
+        if self._chunk_executor:
+            chunk_results = list(self._chunk_executor.map(self._analyze_chunk, chunks))
+        else:
+            chunk_results = [self._analyze_chunk(chunk) for chunk in chunks]
+        return merge_chunk_results(spans, chunk_results)
+
+    def _analyze_chunk(self, text: str) -> list['RecognizerResult']:
+        return self.pii_analyzer.analyze(
+            text=text,
             language='en',
-            entities=['PERSON', 'EMAIL_ADDRESS', 'LOCATION', 'PHONE_NUMBER', 'IP_ADDRESS'],
+            entities=PIIModifier.PII_ENTITIES,
         )
+
+    def anonimize(self, record: Record) -> None:
+        analyzer_results = self.analyze(record.cleaned)
         if analyzer_results:
             anon_result = self.pii_anonymizer.anonymize(
                 text=record.cleaned,
@@ -64,19 +105,94 @@ class PIIModifier(Modifier):
             record.anonymized = True
 
 
-# Attempt downloading models in a cold start
-_temp_analyzer_engine = AnalyzerEngine()
-_temp_anonymizer = AnonymizerEngine()
-_temp_analyzer_results = _temp_analyzer_engine.analyze(
-    text='hello',
-    language='en',
-    entities=['PERSON', 'EMAIL_ADDRESS', 'LOCATION', 'PHONE_NUMBER', 'IP_ADDRESS'],
+_CHUNK_BREAK_RES = (
+    re.compile(r'\n\s*\n'),  # paragraphs
+    re.compile(r'(?<=[.!?])\s+'),  # sentences
+    re.compile(r'\s+'),  # words
 )
-_temp_anon_result = _temp_anonymizer.anonymize(
-    text='hello',
-    analyzer_results=_temp_analyzer_results,
-)
-del _temp_anon_result
-del _temp_analyzer_results
-del _temp_analyzer_engine
-del _temp_anonymizer
+
+
+def _find_break(text: str, lo: int, hi: int, last: bool) -> int | None:
+    """Find the end of the last (or first) boundary in text[lo:hi], preferring paragraphs over sentences over words."""
+    for pattern in _CHUNK_BREAK_RES:
+        found = None
+        for match in pattern.finditer(text, lo, hi):
+            found = match.end()
+            if not last:
+                break
+        if found is not None:
+            return found
+    return None
+
+
+def split_into_chunks(text: str, chunk_size: int, overlap: int) -> list[tuple[int, int]]:
+    """
+    Split text into (start, end) spans of at most chunk_size characters. Consecutive spans share
+    roughly `overlap` characters so that entities near a cut are seen whole by at least one chunk.
+    """
+    chunk_size = max(chunk_size, 1)
+    overlap = max(min(overlap, chunk_size // 4), 0)
+    spans = []
+    start = 0
+    while True:
+        end = min(start + chunk_size, len(text))
+        if end < len(text):
+            end = _find_break(text, start + chunk_size // 2, end, last=True) or end
+        spans.append((start, end))
+        if end >= len(text):
+            return spans
+        lo = max(end - overlap, start + 1)
+        start = _find_break(text, lo, end, last=False) or lo
+        if start >= end:
+            start = lo
+
+
+def merge_chunk_results(
+        spans: list[tuple[int, int]],
+        chunk_results: list[list['RecognizerResult']]
+) -> list['RecognizerResult']:
+    """
+    Shift chunk-local results back to document offsets. Each chunk owns the region up to the middle
+    of its overlaps with the neighbouring chunks, so an entity seen by two chunks is kept once.
+    """
+    from presidio_analyzer import RecognizerResult
+
+    merged: dict[tuple[str, int, int], RecognizerResult] = {}
+    for idx, ((start, end), results) in enumerate(zip(spans, chunk_results)):
+        own_lo = (spans[idx - 1][1] + start) // 2 if idx > 0 else 0
+        own_hi = (end + spans[idx + 1][0]) // 2 if idx + 1 < len(spans) else end
+        for result in results:
+            result_start = result.start + start
+            if not own_lo <= result_start < own_hi:
+                continue
+            key = (result.entity_type, result_start, result.end + start)
+            if key in merged and merged[key].score >= result.score:
+                continue
+            merged[key] = RecognizerResult(
+                entity_type=result.entity_type,
+                start=result_start,
+                end=result.end + start,
+                score=result.score,
+                analysis_explanation=result.analysis_explanation,
+                recognition_metadata=result.recognition_metadata,
+            )
+    return sorted(merged.values(), key=lambda result: (result.start, result.end))
+
+
+def _load_analyzer():
+    from presidio_analyzer import AnalyzerEngine
+
+    analyzer = AnalyzerEngine()
+    # Downloads the spaCy model on first use
+    analyzer.analyze(text='hello', language='en', entities=PIIModifier.PII_ENTITIES)
+    return analyzer
+
+
+def _load_anonymizer():
+    from presidio_anonymizer import AnonymizerEngine
+
+    return AnonymizerEngine()
+
+
+models.register('presidio_analyzer', _load_analyzer)
+models.register('presidio_anonymizer', _load_anonymizer)
@@ -0,0 +1,477 @@
+import dataclasses
+import ipaddress
+import json
+import logging
+import mmap
+import multiprocessing
+import os
+import secrets
+import shutil
+import socket
+import threading
+import time
+from collections import Counter
+from multiprocessing.connection import Client, Listener
+from pathlib import Path
+from typing import Callable
+
+from pipelib.components.core.pipeline import Pipeline
+from pipelib.components.core.record import Record
+from pipelib.components.core.settings import PipelineConfig
+from pipelib.io.reader import JsonlReader, split_byte_ranges
+from pipelib.utils import ensure_dir
+
+# Environment variable with the secret the coordinator, its dedup partitions and the workers share
+AUTHKEY_ENV = 'PIPELIB_AUTHKEY'
+TASKS_DIR = 'tasks'
+MANIFEST_NAME = 'distributed.json'
+# Seconds a worker waits before asking again while the remaining tasks are leased to others
+WAIT_SECONDS = 1.0
+# Pending connections of the listeners, every worker thread connects to every dedup partition
+BACKLOG = 128
+# Config fields a worker takes from its own command line, the others come from the coordinator
+WORKER_FIELDS = (
+    'input_path', 'output_dir', 'workers', 'process_workers', 'transport', 'batch_size', 'json_decoder',
+    'cache_dir', 'cache_bytes', 'debug_info', 'progress_interval', 'metrics_port',
+    'memory_interval', 'memory_trace', 'profile_top', 'profile_step', 'profile_records',
+)
+
+
+def authkey() -> bytes:
+    # The connections pass pickles, which run code when loaded, so there is no default secret
+    key = os.environ.get(AUTHKEY_ENV)
+    if not key:
+        raise ValueError(f'Set {AUTHKEY_ENV} to the secret the coordinator and its workers share')
+    return key.encode('utf-8')
+
+
+def is_loopback(host: str) -> bool:
+    try:
+        return ipaddress.ip_address(socket.gethostbyname(host)).is_loopback
+    except (OSError, ValueError):
+        return False
+
+
+def parse_address(address: str) -> tuple[str, int]:
+    host, _, port = address.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+def task_directory(output_dir: Path, task_id: int, attempt: int) -> Path:
+    return Path(output_dir) / TASKS_DIR / f'task_{task_id:05d}_attempt{attempt}'
+
+
+@dataclasses.dataclass
+class Task:
+    task_id: int
+    start: int
+    end: int
+    state: str = 'pending'  # pending, leased, done or failed
+    attempts: int = 0
+    worker: str | None = None
+    deadline: float = 0.0
+    result: dict | None = None
+    errors: list[str] = dataclasses.field(default_factory=list)
+
+
+def serve_dedup_partition(host: str, key: bytes, ports) -> None:
+    """
+    One partition of the global exact dedup set, run in its own process until terminated. The first
+    claim of a fingerprint owns it, so that claim and any later claim from the same input offset,
+    i.e. a retry of the same record, are kept and the claims from other offsets are duplicates.
+    """
+    listener = Listener((host, 0), backlog=BACKLOG, authkey=key)
+    ports.put(listener.address[1])
+    owners: dict[bytes, int] = {}
+    lock = threading.Lock()
+
+    def serve(connection) -> None:
+        with connection:
+            while True:
+                try:
+                    request = connection.recv()
+                except EOFError:
+                    return
+                if request[0] == 'claim':
+                    with lock:
+                        connection.send([owners.setdefault(digest, offset) == offset for digest, offset in request[1]])
+                else:
+                    connection.send({'fingerprints': len(owners)})
+
+    while True:
+        try:
+            connection = listener.accept()
+        except (EOFError, OSError, multiprocessing.AuthenticationError):
+            continue  # The client went away or failed the handshake
+        threading.Thread(target=serve, args=(connection,), daemon=True).start()
+
+
+class DedupClient:
+    """
+    Claims fingerprints from the partitions of the global dedup set, each fingerprint from the
+    partition its leading bytes hash to. Every thread has its own connection to every partition,
+    and a batch of claims costs one round trip per partition.
+    """
+
+    def __init__(self, servers: tuple[str, ...]):
+        self.servers = [parse_address(server) for server in servers]
+        self._local = threading.local()
+
+    def claim(self, claims: list[tuple[str, int]]) -> list[bool]:
+        """Whether each (hex fingerprint, input offset) is kept, i.e. owns its fingerprint."""
+        connections = getattr(self._local, 'connections', None)
+        if connections is None:
+            connections = self._local.connections = [Client(server, authkey=authkey()) for server in self.servers]
+        parts: list[list[tuple[int, bytes, int]]] = [[] for _ in connections]
+        for idx, (fingerprint, offset) in enumerate(claims):
+            digest = bytes.fromhex(fingerprint)
+            parts[int.from_bytes(digest[:4], 'big') % len(connections)].append((idx, digest, offset))
+        for connection, part in zip(connections, parts):
+            if part:
+                connection.send(('claim', [(digest, offset) for _, digest, offset in part]))
+        keep = [False] * len(claims)
+        for connection, part in zip(connections, parts):
+            if part:
+                for (idx, _, _), kept in zip(part, connection.recv()):
+                    keep[idx] = kept
+        return keep
+
+
+class Coordinator:
+    """
+    Splits a plain input into newline-aligned byte ranges of task_bytes and leases them to workers
+    over a socket. Workers renew the lease of their task while they run it; a task whose lease
+    expires, or whose worker reports a failure, is leased again up to max_attempts times. Only the
+    completion of the latest attempt at a task is accepted, so the outputs of every task come from
+    exactly one attempt. The coordinator also runs the partitions of the global dedup set in
+    processes of their own, see serve_dedup_partition.
+    """
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, config: PipelineConfig):
+        if config.input_limit:
+            raise ValueError('The input limit is not supported in distributed mode')
+        reader = JsonlReader(config.input_path)
+        if reader.codec != 'none':
+            raise ValueError(f'Distributed mode needs random access, decompress {config.input_path} first')
+        self.config = config
+        self.input_bytes = reader.bytes_total
+        ranges = []
+        if self.input_bytes:
+            with open(config.input_path, 'rb') as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                ranges = list(split_byte_ranges(buffer, config.task_bytes))
+        self.tasks = [Task(task_id, start, end) for task_id, (start, end) in enumerate(ranges)]
+        self.address: str | None = None
+        self.completed: Counter[str] = Counter()
+        self._condition = threading.Condition()
+        self._partitions: list[tuple[multiprocessing.Process, int]] = []
+        self._listener: Listener | None = None
+        self._host = '127.0.0.1'
+
+    def start(self, address: str) -> str:
+        """
+        Start the dedup partitions and listen on host:port, port 0 picks a free one. Returns the
+        address. Without PIPELIB_AUTHKEY, a coordinator on a loopback host generates a secret for
+        the processes it starts, which inherit it; any other host needs the variable.
+        """
+        host, port = parse_address(address)
+        if not os.environ.get(AUTHKEY_ENV):
+            if not is_loopback(host):
+                raise ValueError(f'Set {AUTHKEY_ENV} to the secret shared with the workers to listen on {host or "all interfaces"}')
+            os.environ[AUTHKEY_ENV] = secrets.token_hex(32)
+        context = multiprocessing.get_context('spawn')
+        ports = context.Queue()
+        for _ in range(max(self.config.dedup_partitions, 1)):
+            process = context.Process(target=serve_dedup_partition, args=(host, authkey(), ports), daemon=True)
+            process.start()
+            self._partitions.append((process, ports.get(timeout=60)))
+        self._host = '127.0.0.1' if host in ('', '0.0.0.0') else host
+        self._listener = Listener((host, port), backlog=BACKLOG, authkey=authkey())
+        self.address = f'{socket.gethostname() if host in ("", "0.0.0.0") else host}:{self._listener.address[1]}'
+        threading.Thread(target=self._accept, args=(self._listener,), name='pipelib-coordinator', daemon=True).start()
+        return self.address
+
+    def serve(self) -> dict:
+        """Block until every task is done or failed, then stop the partitions and write the manifest."""
+        started = time.monotonic()
+        with self._condition:
+            while not self._finished():
+                self._expire()
+                self._condition.wait(timeout=WAIT_SECONDS)
+        manifest = self._manifest(time.monotonic() - started)
+        self.close()
+        self._remove_stale_attempts()
+        with open(ensure_dir(self.config.output_dir) / MANIFEST_NAME, 'w', encoding='utf-8') as handle:
+            json.dump(manifest, handle, indent=4)
+        return manifest
+
+    def close(self) -> None:
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+        for process, _ in self._partitions:
+            process.terminate()
+            process.join()
+        self._partitions = []
+
+    def handle(self, request: tuple):
+        op = request[0]
+        with self._condition:
+            self._expire()
+            if op == 'hello':
+                return self._worker_config(), [port for _, port in self._partitions], self.input_bytes
+            if op == 'lease':
+                return self._lease(request[1])
+            _, worker, task_id, attempt = request[:4]
+            task = self.tasks[task_id]
+            latest = task.attempts == attempt
+            if op == 'renew':
+                # A lease that expired is taken back as long as no other worker has leased the task
+                if latest and task.state in ('leased', 'pending'):
+                    task.state, task.worker = 'leased', worker
+                    task.deadline = time.monotonic() + self.config.lease_seconds
+                    return True
+                return False
+            if op == 'complete':
+                if not latest or task.state == 'done':
+                    return False
+                task.state, task.worker = 'done', worker
+                task.result = request[4]
+                self.completed[worker] += 1
+                self._condition.notify_all()
+                return True
+            if op == 'fail':
+                if latest and task.state == 'leased':
+                    task.errors.append(f'{worker}: {request[4]}')
+                    self._release(task, f'failed on {worker}: {request[4]}')
+                return None
+        raise ValueError(f'Unknown request: {op}')
+
+    def _accept(self, listener: Listener) -> None:
+        while True:
+            try:
+                connection = listener.accept()
+            except (EOFError, multiprocessing.AuthenticationError):
+                continue
+            except OSError:
+                return
+            threading.Thread(target=self._serve_connection, args=(connection,), daemon=True).start()
+
+    def _serve_connection(self, connection) -> None:
+        with connection:
+            while True:
+                try:
+                    request = connection.recv()
+                except (EOFError, OSError):
+                    return
+                connection.send(self.handle(request))
+
+    def _worker_config(self) -> PipelineConfig:
+        return dataclasses.replace(self.config, distributed=None, distributed_address=None, local_workers=0)
+
+    def _lease(self, worker: str) -> tuple:
+        for task in self.tasks:
+            if task.state == 'pending':
+                task.state, task.worker = 'leased', worker
+                task.attempts += 1
+                task.deadline = time.monotonic() + self.config.lease_seconds
+                return 'task', task.task_id, task.start, task.end, task.attempts, self.config.lease_seconds
+        return ('done',) if self._finished() else ('wait', WAIT_SECONDS)
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        for task in self.tasks:
+            if task.state == 'leased' and task.deadline < now:
+                self._release(task, f'lease of {task.worker} expired')
+
+    def _release(self, task: Task, reason: str) -> None:
+        if task.attempts >= self.config.max_attempts:
+            task.state = 'failed'
+            self.logger.error('Task %d %s, giving up after %d attempts', task.task_id, reason, task.attempts)
+            self._condition.notify_all()
+        else:
+            task.state = 'pending'
+            self.logger.warning('Task %d %s, retrying', task.task_id, reason)
+
+    def _finished(self) -> bool:
+        return all(task.state in ('done', 'failed') for task in self.tasks)
+
+    def _manifest(self, seconds: float) -> dict:
+        fingerprints = []
+        for _, port in self._partitions:
+            with Client((self._host, port), authkey=authkey()) as connection:
+                connection.send(('stats',))
+                fingerprints.append(connection.recv()['fingerprints'])
+        omit_reasons = Counter()
+        for task in self.tasks:
+            omit_reasons.update((task.result or {}).get('omit_reasons', {}))
+        return {
+            'input_path': str(self.config.input_path),
+            'input_bytes': self.input_bytes,
+            'seconds': seconds,
+            'records': sum((task.result or {}).get('records', 0) for task in self.tasks),
+            'kept': sum((task.result or {}).get('kept', 0) for task in self.tasks),
+            'omit_reasons': dict(omit_reasons),
+            'retried_tasks': sum(task.attempts > 1 for task in self.tasks),
+            'failed_tasks': [task.task_id for task in self.tasks if task.state == 'failed'],
+            'workers': dict(self.completed),
+            'dedup': {'partitions': len(fingerprints), 'fingerprints': fingerprints},
+            'tasks': [
+                {
+                    'task': task.task_id,
+                    'start': task.start,
+                    'end': task.end,
+                    'state': task.state,
+                    'attempts': task.attempts,
+                    'worker': task.worker if task.state == 'done' else None,
+                    'directory': str(task_directory(Path(), task.task_id, task.attempts)) if task.state == 'done' else None,
+                    'errors': task.errors,
+                    **(task.result or {}),
+                }
+                for task in self.tasks
+            ],
+        }
+
+    def _remove_stale_attempts(self) -> None:
+        """Remove the directories of the attempts that were not accepted, where they are reachable."""
+        committed = {task_directory(self.config.output_dir, task.task_id, task.attempts) for task in self.tasks if task.state == 'done'}
+        tasks_dir = Path(self.config.output_dir) / TASKS_DIR
+        if tasks_dir.is_dir():
+            for directory in tasks_dir.iterdir():
+                if directory not in committed:
+                    shutil.rmtree(directory, ignore_errors=True)
+
+
+class LeaseClient:
+    """The connection of a worker to the coordinator, shared by its processing and renewal threads."""
+
+    def __init__(self, address: str):
+        self.address = parse_address(address)
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        self._connection = Client(self.address, authkey=authkey())
+        self._lock = threading.Lock()
+
+    def request(self, *request):
+        with self._lock:
+            self._connection.send(request)
+            return self._connection.recv()
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+class LeaseRenewal:
+    """Renews the lease of a task every third of the lease time on a background thread, until stopped."""
+
+    def __init__(self, client: LeaseClient, task_id: int, attempt: int, lease_seconds: float):
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(client, task_id, attempt, lease_seconds / 3), name='pipelib-lease', daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self, client: LeaseClient, task_id: int, attempt: int, interval: float) -> None:
+        while not self._stopped.wait(interval):
+            try:
+                if not client.request('renew', client.worker_id, task_id, attempt):
+                    return
+            except (EOFError, OSError):
+                return
+
+
+def run_worker(
+        address: str,
+        config: PipelineConfig,
+        make_pipeline: Callable[[PipelineConfig], Pipeline],
+        process: Callable[[Pipeline, PipelineConfig, JsonlReader], None],
+) -> int:
+    """
+    Run the tasks leased from the coordinator at address until none are left. Every attempt at a
+    task runs a fresh pipeline from make_pipeline over the byte range of the task, and process()
+    writes its outputs to the directory of the attempt under the output directory of the worker.
+    Record ids are numbered from the start of the byte range, so they are unique across tasks.
+    A worker that lost its lease still finishes the task, but its completion is rejected and its
+    outputs removed. Returns the number of tasks completed.
+    """
+    logger = logging.getLogger(__name__)
+    client = LeaseClient(address)
+    shared, ports, input_bytes = client.request('hello', client.worker_id)
+    config = dataclasses.replace(
+        shared,
+        dedup_servers=tuple(f'{client.address[0]}:{port}' for port in ports),
+        **{name: getattr(config, name) for name in WORKER_FIELDS},
+    )
+    if Path(config.input_path).stat().st_size != input_bytes:
+        raise ValueError(f'{config.input_path} is not the input of the coordinator, its size differs')
+    completed = 0
+    try:
+        while True:
+            try:
+                reply = client.request('lease', client.worker_id)
+            except (EOFError, OSError):
+                break  # The coordinator has shut down
+            if reply[0] == 'done':
+                break
+            if reply[0] == 'wait':
+                time.sleep(reply[1])
+                continue
+            _, task_id, start, end, attempt, lease_seconds = reply
+            task_config = dataclasses.replace(config, output_dir=task_directory(config.output_dir, task_id, attempt))
+            logger.info('Running task %d, bytes %d-%d, attempt %d', task_id, start, end, attempt)
+            renewal = LeaseRenewal(client, task_id, attempt, lease_seconds)
+            started = time.perf_counter()
+            try:
+                # Every record takes at least a byte of the range, so ids numbered from the start of
+                # the range stay within it and are unique across the tasks, like their offsets
+                Record.number_from(start + 1)
+                pipeline = make_pipeline(task_config)
+                records = JsonlReader(config.input_path, workers=config.workers, decoder=config.json_decoder, byte_range=(start, end))
+                process(pipeline, task_config, records)
+            except Exception as e:
+                logger.exception('Task %d failed', task_id)
+                renewal.stop()
+                client.request('fail', client.worker_id, task_id, attempt, f'{type(e).__name__}: {e}')
+                shutil.rmtree(task_config.output_dir, ignore_errors=True)
+                continue
+            renewal.stop()
+            omitted = sum(pipeline.omit_reasons.values())
+            result = {
+                'records': pipeline.records_seen,
+                'kept': pipeline.records_seen - omitted,
+                'omit_reasons': dict(pipeline.omit_reasons),
+                'seconds': time.perf_counter() - started,
+            }
+            if client.request('complete', client.worker_id, task_id, attempt, result):
+                completed += 1
+            else:
+                logger.warning('Task %d was completed by another worker, discarding attempt %d', task_id, attempt)
+                shutil.rmtree(task_config.output_dir, ignore_errors=True)
+    finally:
+        client.close()
+    return completed
+
+
+def spawn_workers(
+        count: int,
+        address: str,
+        config: PipelineConfig,
+        make_pipeline: Callable[[PipelineConfig], Pipeline],
+        process: Callable[[Pipeline, PipelineConfig, JsonlReader], None],
+) -> list[multiprocessing.Process]:
+    """
+    Start count worker processes on this host, which inherit PIPELIB_AUTHKEY from the coordinator
+    started in this process. make_pipeline and process have to be importable.
+    """
+    context = multiprocessing.get_context('spawn')
+    config = dataclasses.replace(config, metrics_port=0)
+    processes = [
+        context.Process(target=run_worker, args=(address, config, make_pipeline, process), name=f'pipelib-worker-{idx}')
+        for idx in range(count)
+    ]
+    for process in processes:
+        process.start()
+    return processes
@@ -0,0 +1,135 @@
+import dataclasses
+import math
+
+import numpy as np
+from numpy.typing import NDArray
+
+from pipelib.components.core.pipeline import Pipeline
+from pipelib.components.core.record import Record
+from pipelib.components.core.settings import PipelineConfig
+from pipelib.io.reader import JsonlReader
+
+# Normal quantile of the two-sided 95% confidence intervals
+Z_95 = 1.96
+
+
+def estimate_config(config: PipelineConfig) -> PipelineConfig:
+    """
+    The config to run the sample with: serially and record by record, so the step timings of each
+    record can be told apart, and without the cache, whose hits would hide the cost of a full run.
+    """
+    return dataclasses.replace(config, workers=1, process_workers=0, batch_size=1, cache_dir=None, debug_info=True)
+
+
+def interval(values: NDArray, scale: float = 1.0) -> dict:
+    """Mean of the non-negative per-sample estimates, times scale, with its 95% confidence interval."""
+    n = len(values)
+    mean = float(values.mean()) if n else 0.0
+    half_width = Z_95 * float(values.std(ddof=1)) / math.sqrt(n) if n > 1 else 0.0
+    return {'estimate': mean * scale, 'low': max(mean - half_width, 0.0) * scale, 'high': (mean + half_width) * scale}
+
+
+def ratio_interval(numerators: NDArray, denominators: NDArray) -> dict:
+    """Ratio of two estimated totals with its 95% confidence interval, by linearization."""
+    n = len(numerators)
+    if not n or not denominators.sum():
+        return {'estimate': 0.0, 'low': 0.0, 'high': 0.0}
+    ratio = float(numerators.sum() / denominators.sum())
+    residuals = numerators - ratio * denominators
+    half_width = Z_95 * float(residuals.std(ddof=1)) / math.sqrt(n) / float(denominators.mean()) if n > 1 else 0.0
+    return {'estimate': ratio, 'low': max(ratio - half_width, 0.0), 'high': min(ratio + half_width, 1.0)}
+
+
+def estimate(pipeline: Pipeline, reader: JsonlReader, samples: int, seed: int = 0) -> dict:
+    """
+    Estimate the runtime, retention and output size of a full run from a stratified sample of the
+    input by byte offset, without scanning it. The pipeline has to run with estimate_config().
+
+    A line is sampled with probability proportional to its length L, so every sample estimates a
+    total as x * input bytes / L for its own value x, e.g. 1 for the record count or the seconds
+    it spent in a step, and the estimate is the mean over the samples. Duplicates are rare in a
+    sample, so the duplicate rate, and the work the dedup filter saves the later steps, are
+    underestimated. Runtimes are serial step seconds, model loading and startup come on top.
+    """
+    drawn = reader.sample(samples, seed)
+    n_steps = len(pipeline.steps)
+    outcomes: dict[int, tuple[NDArray, NDArray, Record]] = {}  # input offset -> step seconds, step calls, record
+    seen = np.zeros((n_steps, 2))
+
+    def collect(record: Record) -> None:
+        current = pipeline.step_call_insights[:, :2].astype(float)
+        delta = current - seen
+        seen[:] = current
+        outcomes[record.source_offset] = (delta[:, 0], delta[:, 1], record)
+
+    pipeline.register_record_write_callback(collect)
+    pipeline.register_omit_callback(collect)
+    unique = list({id(record): record for record, _ in drawn if record is not None}.values())
+    pipeline.process(unique)
+
+    reasons = sorted(pipeline.omit_reasons)
+    weights = np.array([1.0 / length for _, length in drawn])
+    valid = np.zeros(len(drawn))
+    kept = np.zeros(len(drawn))
+    omitted = {reason: np.zeros(len(drawn)) for reason in reasons}
+    seconds = np.zeros((len(drawn), n_steps))
+    calls = np.zeros((len(drawn), n_steps))
+    output_bytes = np.zeros(len(drawn))
+    omit_log_bytes = np.zeros(len(drawn))
+    compact = pipeline.config.omit_log == 'compact'
+    for idx, (sampled, _) in enumerate(drawn):
+        if sampled is None:
+            continue
+        seconds[idx], calls[idx], record = outcomes[sampled.source_offset]
+        valid[idx] = 1.0
+        if record.omit:
+            omitted[record.omit_reason][idx] = 1.0
+            line = record.to_compact_failed_jsonl() if compact else record.to_failed_jsonl()
+            omit_log_bytes[idx] = len(line.encode('utf-8'))
+        else:
+            kept[idx] = 1.0
+            output_bytes[idx] = len(record.to_successful_jsonl().encode('utf-8'))
+
+    size = reader.bytes_total
+    sample_insights = pipeline.generate_insights()
+    insights = {
+        'input_bytes': size,
+        'samples': len(drawn),
+        'sampled_records': len(unique),
+        'records': interval(valid * weights, size),
+        'kept': interval(kept * weights, size),
+        'retention_rate': ratio_interval(kept * weights, valid * weights),
+        'omit_reasons': {reason: interval(omitted[reason] * weights, size) for reason in reasons},
+        'total_time_seconds': interval(seconds.sum(axis=1) * weights, size),
+        'output_bytes': interval(output_bytes * weights, size),
+        'omit_log_bytes': interval(omit_log_bytes * weights, size),
+        'startup_seconds': pipeline.startup_seconds,
+        'model_load_seconds': sample_insights['model_load_seconds'],
+        'steps': {},
+        'sample_insights': sample_insights,
+    }
+    for step_idx, step in enumerate(pipeline.steps):
+        insights['steps'][step.__class__.__name__] = {
+            'total_time_seconds': interval(seconds[:, step_idx] * weights, size),
+            'number_of_calls': interval(calls[:, step_idx] * weights, size),
+            'omit_percentage': sample_insights['steps'][step.__class__.__name__]['omit_percentage'],
+        }
+    return insights
+
+
+def format_estimate(insights: dict) -> str:
+    def span(value: dict, fmt: str = '{:,.0f}') -> str:
+        return f'{fmt.format(value["estimate"])} [{fmt.format(value["low"])}, {fmt.format(value["high"])}]'
+
+    lines = [
+        f'records: {span(insights["records"])}',
+        f'kept: {span(insights["kept"])}',
+        f'retention: {span(insights["retention_rate"], "{:.1%}")}',
+        f'step seconds: {span(insights["total_time_seconds"], "{:,.1f}")}',
+        f'output bytes: {span(insights["output_bytes"])}',
+    ]
+    lines.extend(f'omitted as {reason}: {span(value)}' for reason, value in insights['omit_reasons'].items())
+    lines.extend(
+        f'{name} seconds: {span(step["total_time_seconds"], "{:,.1f}")}' for name, step in insights['steps'].items()
+    )
+    return '\n'.join(lines)
@@ -0,0 +1,2 @@
+from .reader import JsonlReader
+from .writer import RecordWriter
@@ -0,0 +1,193 @@
+import gzip
+import queue
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional, only needed for .zst files
+    zstandard = None
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+CODEC_SUFFIXES = {
+    'none': '',
+    'gzip': '.gz',
+    'zstd': '.zst',
+}
+
+# Uncompressed bytes collected before a block is handed to the compression thread
+WRITE_BLOCK_SIZE = 1024 * 1024
+
+
+@dataclass
+class CompressionStats:
+    bytes_in: int = 0
+    bytes_out: int = 0
+    compress_seconds: float = 0.0
+
+    def add(self, other: 'CompressionStats') -> None:
+        self.bytes_in += other.bytes_in
+        self.bytes_out += other.bytes_out
+        self.compress_seconds += other.compress_seconds
+
+    def to_dict(self) -> dict:
+        return {
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'compression_ratio': self.bytes_in / self.bytes_out if self.bytes_out else 0.0,
+            'compress_time_seconds': self.compress_seconds,
+        }
+
+
+def _require_zstandard():
+    if zstandard is None:
+        raise ImportError('zstandard is required for zstd compressed files')
+
+
+def detect_codec(path: Path) -> str:
+    """Detect the compression of a file from its magic bytes, falling back to its extension."""
+    with open(path, 'rb') as handle:
+        magic = handle.read(4)
+    if magic.startswith(GZIP_MAGIC):
+        return 'gzip'
+    if magic.startswith(ZSTD_MAGIC):
+        return 'zstd'
+    suffix = Path(path).suffix
+    for codec, codec_suffix in CODEC_SUFFIXES.items():
+        if codec_suffix and suffix == codec_suffix:
+            return codec
+    return 'none'
+
+
+def open_decompressed(raw: BinaryIO, codec: str) -> BinaryIO:
+    """Wrap a binary file object in a streaming decompressor."""
+    if codec == 'gzip':
+        return gzip.GzipFile(fileobj=raw, mode='rb')
+    if codec == 'zstd':
+        _require_zstandard()
+        return zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True)
+    raise ValueError(f'Unknown compression codec: {codec}')
+
+
+def _make_compressor(codec: str):
+    if codec == 'gzip':
+        return zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # gzip container
+    if codec == 'zstd':
+        _require_zstandard()
+        return zstandard.ZstdCompressor(level=3).compressobj()
+    raise ValueError(f'Unknown compression codec: {codec}')
+
+
+def output_path(path: Path, compression: str) -> Path:
+    """Append the codec suffix, e.g. cleaned.jsonl -> cleaned.jsonl.gz"""
+    return Path(str(path) + CODEC_SUFFIXES[compression])
+
+
+def compress_file(path: Path, codec: str, stats: CompressionStats | None = None) -> Path:
+    """Compress a finished file next to itself, e.g. shard_0.jsonl -> shard_0.jsonl.zst, and remove the original."""
+    path = Path(path)
+    target = output_path(path, codec)
+    compressor = _make_compressor(codec)
+    local_stats = CompressionStats()
+    with open(path, 'rb') as src, open(target, 'wb') as dst:
+        while True:
+            block = src.read(WRITE_BLOCK_SIZE)
+            start = time.perf_counter()
+            compressed = compressor.compress(block) if block else compressor.flush()
+            local_stats.compress_seconds += time.perf_counter() - start
+            local_stats.bytes_in += len(block)
+            local_stats.bytes_out += len(compressed)
+            dst.write(compressed)
+            if not block:
+                break
+    path.unlink()
+    if stats is not None:
+        stats.add(local_stats)
+    return target
+
+
+class BackgroundCompressedWriter:
+    """
+    Text file-like writer that compresses on a background thread.
+    Writes are buffered into blocks of WRITE_BLOCK_SIZE bytes and queued to the thread, which
+    compresses and writes them to disk. The queue is bounded, so a writer that falls behind
+    applies backpressure instead of growing without limit.
+    """
+
+    def __init__(self, path: Path, codec: str, stats: CompressionStats | None = None, max_pending_blocks: int = 8):
+        self.path = Path(path)
+        self.stats = CompressionStats()
+        self._shared_stats = stats
+        self._compressor = _make_compressor(codec)
+        self._handle = open(self.path, 'wb')
+        self._buffer: list[bytes] = []
+        self._buffered = 0
+        self._queue: queue.Queue[bytes | None] = queue.Queue(maxsize=max_pending_blocks)
+        self._error: BaseException | None = None
+        self._thread = threading.Thread(target=self._run, name=f'compress-{self.path.name}', daemon=True)
+        self._thread.start()
+
+    def write(self, text: str) -> int:
+        data = text.encode('utf-8')
+        self._buffer.append(data)
+        self._buffered += len(data)
+        if self._buffered >= WRITE_BLOCK_SIZE:
+            self._submit()
+        return len(text)
+
+    def close(self) -> None:
+        if self._handle.closed:
+            return
+        try:
+            self._submit()
+        finally:
+            # The thread and the file are released even when the last block cannot be queued
+            self._queue.put(None)
+            self._thread.join()
+            self._handle.close()
+            if self._shared_stats is not None:
+                self._shared_stats.add(self.stats)
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _submit(self) -> None:
+        if self._error is not None:
+            raise self._error
+        if self._buffer:
+            self._queue.put(b''.join(self._buffer))
+            self._buffer = []
+            self._buffered = 0
+
+    def _run(self) -> None:
+        while True:
+            block = self._queue.get()
+            try:
+                start = time.perf_counter()
+                compressed = self._compressor.compress(block) if block is not None else self._compressor.flush()
+                self.stats.compress_seconds += time.perf_counter() - start
+                self.stats.bytes_in += len(block) if block is not None else 0
+                self.stats.bytes_out += len(compressed)
+                self._handle.write(compressed)
+            except BaseException as e:  # surfaced to the producer on the next write or close
+                self._error = e
+            if block is None:
+                return
+
+
+def open_output(path: Path, compression: str = 'none', stats: CompressionStats | None = None):
+    """Open a text output file, compressed in the background unless compression is 'none'."""
+    if compression == 'none':
+        return open(path, 'w', encoding='utf-8')
+    return BackgroundCompressedWriter(output_path(path, compression), compression, stats)
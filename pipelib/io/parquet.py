@@ -0,0 +1,78 @@
+from pathlib import Path
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional, only needed for --format parquet
+    pa = None
+    pq = None
+
+from pipelib.components.core.record import Record
+
+# Rows buffered in memory before they are written out as one row group
+ROW_GROUP_SIZE = 5000
+
+# Parquet has its own column compression, so the output codec maps onto it instead of wrapping the file
+PARQUET_COMPRESSION = {
+    'none': 'none',
+    'gzip': 'gzip',
+    'zstd': 'zstd',
+}
+
+COLUMNS = ('id', 'cleaned', 'anonymized', 'html_extracted', 'lang', 'char_count', 'token_count')
+
+
+def parquet_schema() -> 'pa.Schema':
+    return pa.schema([
+        ('id', pa.int64()),
+        ('cleaned', pa.string()),
+        ('anonymized', pa.bool_()),
+        ('html_extracted', pa.bool_()),
+        ('lang', pa.string()),
+        ('char_count', pa.int64()),
+        ('token_count', pa.int64()),
+    ])
+
+
+class ParquetShardWriter:
+    """
+    Writes kept records to a Parquet file, buffering at most row_group_size rows
+    in memory and flushing each full buffer as one row group.
+    """
+
+    def __init__(self, path: Path, compression: str = 'none', row_group_size: int = ROW_GROUP_SIZE):
+        if pq is None:
+            raise ImportError('pyarrow is required for parquet output')
+        self.path = Path(path)
+        self.row_group_size = max(row_group_size, 1)
+        self.rows_written = 0
+        self._schema = parquet_schema()
+        self._writer = pq.ParquetWriter(str(self.path), self._schema, compression=PARQUET_COMPRESSION[compression])
+        self._columns: dict[str, list] = {column: [] for column in COLUMNS}
+        self._buffered = 0
+
+    def write_record(self, record: Record) -> None:
+        columns = self._columns
+        columns['id'].append(record.id)
+        columns['cleaned'].append(record.cleaned)
+        columns['anonymized'].append(record.anonymized)
+        columns['html_extracted'].append(record.html_extracted)
+        columns['lang'].append(record.lang)
+        columns['char_count'].append(record.char_count)
+        columns['token_count'].append(record.token_count)
+        self._buffered += 1
+        if self._buffered >= self.row_group_size:
+            self._flush()
+
+    def close(self) -> None:
+        self._flush()
+        self._writer.close()
+
+    def _flush(self) -> None:
+        if not self._buffered:
+            return
+        batch = pa.RecordBatch.from_pydict(self._columns, schema=self._schema)
+        self._writer.write_batch(batch, row_group_size=self.row_group_size)
+        self.rows_written += self._buffered
+        self._columns = {column: [] for column in COLUMNS}
+        self._buffered = 0
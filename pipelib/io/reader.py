@@ -0,0 +1,256 @@
+import json
+import mmap
+import random
+from functools import partial
+from pathlib import Path
+from typing import BinaryIO, Callable, Iterator
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to the stdlib decoder
+    orjson = None
+
+from pipelib.components.core.record import Record, RecordSource
+from pipelib.io.compression import detect_codec, open_decompressed
+from pipelib.utils import bounded_map
+
+# Target size of the newline-aligned byte ranges handed to decoding workers
+RANGE_SIZE = 4 * 1024 * 1024
+
+
+def resolve_json_decoder(decoder: str) -> Callable[[bytes], object]:
+    """Map a decoder name to a loads function. 'auto' prefers orjson when it is installed."""
+    if decoder == 'auto':
+        decoder = 'orjson' if orjson is not None else 'json'
+    if decoder == 'orjson':
+        if orjson is None:
+            raise ImportError('orjson is required for the orjson decoder')
+        return _orjson_loads
+    if decoder == 'json':
+        return json.loads
+    raise ValueError(f'Unknown JSON decoder: {decoder}')
+
+
+def _orjson_loads(line: bytes) -> object:
+    try:
+        return orjson.loads(line)
+    except orjson.JSONDecodeError:
+        # orjson rejects lone surrogate escapes, which json keeps, as web text has them
+        return json.loads(line)
+
+
+def split_byte_ranges(
+        buffer: mmap.mmap | bytes,
+        range_size: int = RANGE_SIZE,
+        start: int = 0,
+        size: int | None = None,
+) -> Iterator[tuple[int, int]]:
+    """
+    Yield (start, end) ranges of roughly range_size bytes that always end just after a newline or at
+    EOF, covering buffer[start:size]. start has to be the start of a line.
+    """
+    size = len(buffer) if size is None else size
+    while start < size:
+        end = min(start + max(range_size, 1), size)
+        if end < size:
+            newline = buffer.find(b'\n', end - 1)
+            end = size if newline == -1 else newline + 1
+        yield start, end
+        start = end
+
+
+def split_stream_blocks(stream: BinaryIO, raw: BinaryIO, block_size: int = RANGE_SIZE) -> Iterator[tuple[bytes, int, int]]:
+    """
+    Yield newline-aligned (block, offset of the block in the stream, position in the raw file) from a
+    decompressed stream. The raw position tracks progress through the compressed file.
+    """
+    pending = b''
+    offset = 0
+    while True:
+        data = stream.read(max(block_size, 1))
+        if not data:
+            break
+        data = pending + data
+        cut = data.rfind(b'\n') + 1
+        if cut == 0:
+            pending = data
+            continue
+        block, pending = data[:cut], data[cut:]
+        yield block, offset, raw.tell()
+        offset += len(block)
+    if pending:
+        yield pending, offset, raw.tell()
+
+
+class JsonlReader:
+    """
+    Reads records from a JSONL file with 'text' and optional 'url' fields.
+    Plain files are memory-mapped and split into newline-aligned byte ranges which worker threads
+    decode concurrently. gzip/zstd files are decompressed as a stream and cut into newline-aligned
+    blocks for the same workers. Records are created in file order, so record ids stay sequential.
+    Progress is tracked by (compressed) bytes consumed, so the file is never pre-scanned.
+    Records from plain files do not keep their original text, they read it back from the map on demand.
+    byte_range limits a plain input to the lines of [start, end), start and end at line starts.
+    limit caps the input lines read, blank and invalid lines included, not the records yielded.
+    """
+
+    def __init__(
+            self,
+            path: Path,
+            workers: int = 1,
+            limit: int = 0,
+            decoder: str = 'auto',
+            range_size: int = RANGE_SIZE,
+            codec: str = 'auto',
+            byte_range: tuple[int, int] | None = None,
+    ):
+        self.path = Path(path)
+        self.workers = max(workers, 1)
+        self.limit = limit
+        self.loads = resolve_json_decoder(decoder)
+        self.range_size = range_size
+        self.codec = detect_codec(self.path) if codec == 'auto' else codec
+        if byte_range is not None and self.codec != 'none':
+            raise ValueError(f'Byte ranges need random access, decompress {self.path} first')
+        self.start, self.end = byte_range if byte_range is not None else (0, self.path.stat().st_size)
+        self.bytes_total = self.end - self.start
+        self.bytes_read = 0
+        self.decompressed_bytes_read = 0
+        self.records_read = 0
+        self.lines_read = 0
+
+    def progress(self) -> float:
+        """Fraction of the input consumed so far."""
+        byte_progress = self.bytes_read / self.bytes_total if self.bytes_total else 1.0
+        if self.limit > 0:
+            return min(max(self.lines_read / self.limit, byte_progress), 1.0)
+        return byte_progress
+
+    def stats(self) -> dict:
+        return {
+            'codec': self.codec,
+            'bytes_read': self.bytes_read,
+            'decompressed_bytes_read': self.decompressed_bytes_read,
+            'records_read': self.records_read,
+        }
+
+    def __iter__(self) -> Iterator[Record]:
+        if self.bytes_total == 0:
+            return
+        if self.codec == 'none':
+            with open(self.path, 'rb') as handle:
+                # Not closed here: records still in the pipeline read from the map, which is
+                # unmapped once the last of them is gone
+                buffer = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            source = RecordSource(buffer, self.loads)
+            ranges = split_byte_ranges(buffer, self.range_size, self.start, self.end)
+            yield from self._read_tasks(partial(self._decode_range, buffer), ranges, source)
+        else:
+            with open(self.path, 'rb') as raw, open_decompressed(raw, self.codec) as stream:
+                yield from self._read_tasks(self._decode_block, split_stream_blocks(stream, raw, self.range_size))
+
+    def sample(self, n: int, seed: int = 0) -> list[tuple[Record | None, int]]:
+        """
+        Stratified sample of a plain input without scanning it: the file is cut into n equal byte
+        strata, and the line containing a uniformly drawn offset of each stratum is read. Returns
+        (record, line length in bytes) per stratum, None for lines that yield no record. A line is
+        drawn with probability proportional to its length, so estimates weight it by 1 / length.
+        A line drawn twice gives the same record.
+        """
+        if self.codec != 'none':
+            raise ValueError(f'Sampling needs random access, decompress {self.path} first')
+        if self.bytes_total == 0 or n <= 0:
+            return []
+        rng = random.Random(seed)
+        with open(self.path, 'rb') as handle:
+            buffer = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        source = RecordSource(buffer, self.loads)
+        lines: dict[int, tuple[Record | None, int]] = {}
+        samples = []
+        for stratum in range(n):
+            lo = self.start + stratum * self.bytes_total // n
+            hi = max(self.start + (stratum + 1) * self.bytes_total // n, lo + 1)
+            offset = rng.randrange(lo, hi)
+            start = buffer.rfind(b'\n', 0, offset) + 1
+            if start not in lines:
+                newline = buffer.find(b'\n', offset)
+                end = len(buffer) if newline == -1 else newline + 1
+                rows, _ = self._decode_lines(buffer[start:end], start)
+                record = Record.from_source(rows[0][0], rows[0][1], source, start, end - start) if rows else None
+                lines[start] = (record, end - start)
+            samples.append(lines[start])
+        self.records_read = len(lines)
+        return samples
+
+    def _read_tasks(self, decode: Callable, tasks: Iterator, source: RecordSource | None = None) -> Iterator[Record]:
+        if self.workers > 1:
+            from concurrent.futures import ThreadPoolExecutor
+
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                yield from self._make_records(bounded_map(executor, decode, tasks, window=2 * self.workers), source)
+        else:
+            yield from self._make_records(map(decode, tasks), source)
+
+    def _make_records(
+            self,
+            decoded: Iterator[tuple[list[tuple[str, str, int, int, int]], int, int, int]],
+            source: RecordSource | None,
+    ) -> Iterator[Record]:
+        for rows, lines, block_end, raw_position in decoded:
+            for text, url, line_start, line_end, line_idx in rows:
+                if 0 < self.limit <= self.lines_read + line_idx:
+                    self.lines_read = self.limit
+                    return
+                self.decompressed_bytes_read = line_end
+                if self.codec == 'none':
+                    self.bytes_read = line_end - self.start
+                self.records_read += 1
+                if source is not None:
+                    yield Record.from_source(text, url, source, line_start, line_end - line_start)
+                else:
+                    record = Record(text, url)
+                    record.source_offset = line_start
+                    record.source_length = line_end - line_start
+                    yield record
+            self.lines_read += lines
+            self.decompressed_bytes_read = block_end
+            self.bytes_read = raw_position - self.start
+            if 0 < self.limit <= self.lines_read:
+                self.lines_read = self.limit
+                return
+
+    def _decode_range(self, buffer: mmap.mmap, byte_range: tuple[int, int]) -> tuple[list[tuple[str, str, int, int, int]], int, int, int]:
+        start, end = byte_range
+        return *self._decode_lines(buffer[start:end], start), end, end
+
+    def _decode_block(self, task: tuple[bytes, int, int]) -> tuple[list[tuple[str, str, int, int, int]], int, int, int]:
+        block, offset, raw_position = task
+        return *self._decode_lines(block, offset), offset + len(block), raw_position
+
+    def _decode_lines(self, data: bytes, offset: int) -> tuple[list[tuple[str, str, int, int, int]], int]:
+        """
+        Decode newline-separated JSON into (text, url, start offset, end offset, line index) rows,
+        skipping invalid lines, and count the lines of data. Offsets are positions in the
+        (decompressed) input, the end includes the newline.
+        """
+        end = offset + len(data)
+        rows = []
+        line_end = offset
+        lines = data.split(b'\n')
+        if lines[-1] == b'':
+            lines.pop()  # after the last newline
+        for line_idx, line in enumerate(lines):
+            line_start = line_end
+            line_end = min(line_end + len(line) + 1, end)
+            if not line.strip():
+                continue
+            try:
+                obj = self.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(obj, dict):
+                continue
+            text = obj.get('text')
+            if text:
+                rows.append((text, obj.get('url'), line_start, line_end, line_idx))
+        return rows, len(lines)
@@ -0,0 +1,100 @@
+import argparse
+import json
+import mmap
+import sys
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from pipelib.io.compression import detect_codec, open_decompressed
+from pipelib.io.reader import resolve_json_decoder, split_stream_blocks
+
+
+def iter_jsonl(path: Path) -> Iterator[dict]:
+    """Iterate the rows of a plain, gzip or zstd JSONL file."""
+    codec = detect_codec(path)
+    if codec == 'none':
+        with open(path, 'rb') as handle:
+            for line in handle:
+                if line.strip():
+                    yield json.loads(line)
+        return
+    with open(path, 'rb') as raw, open_decompressed(raw, codec) as stream:
+        for block, _, _ in split_stream_blocks(stream, raw):
+            for line in block.split(b'\n'):
+                if line.strip():
+                    yield json.loads(line)
+
+
+def load_omit_log(path: Path, ids: Iterable[int] | None = None) -> list[dict]:
+    """Read the entries of a compact omit log, optionally only those with the given ids."""
+    wanted = set(ids) if ids is not None else None
+    entries = []
+    for entry in iter_jsonl(path):
+        if 'offset' not in entry:
+            raise ValueError(f'{path} is not a compact omit log')
+        if wanted is None or entry['id'] in wanted:
+            entries.append(entry)
+    return entries
+
+
+def rehydrate(source_path: Path, entries: Iterable[dict], decoder: str = 'auto') -> Iterator[dict]:
+    """
+    Restore the original text of compact omit log entries from the pipeline input.
+    Yields rows in the format of the full omit log, in input order. Offsets refer to the
+    decompressed input, so compressed inputs are streamed once up to the last requested offset.
+    """
+    loads = resolve_json_decoder(decoder)
+    entries = sorted(entries, key=lambda entry: entry['offset'])
+    if not entries:
+        return
+
+    def to_row(entry: dict, line: bytes) -> dict:
+        return {
+            'id': entry['id'],
+            'reason': entry['reason'],
+            'lang': entry['lang'],
+            'original': loads(line)['text'],
+        }
+
+    codec = detect_codec(source_path)
+    if codec == 'none':
+        with open(source_path, 'rb') as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            for entry in entries:
+                yield to_row(entry, buffer[entry['offset']:entry['offset'] + entry['length']])
+        return
+
+    pending = iter(entries)
+    entry = next(pending)
+    with open(source_path, 'rb') as raw, open_decompressed(raw, codec) as stream:
+        for block, offset, _ in split_stream_blocks(stream, raw):
+            # Blocks are newline-aligned, so a line never spans two blocks
+            while entry is not None and entry['offset'] < offset + len(block):
+                start = entry['offset'] - offset
+                yield to_row(entry, block[start:start + entry['length']])
+                entry = next(pending, None)
+            if entry is None:
+                return
+    raise ValueError(f'Offset {entry["offset"]} of record {entry["id"]} is past the end of {source_path}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Restore the original text of records in a compact omit log")
+    parser.add_argument("--input", dest="input_path", required=True, help="Pipeline input the omit log was written from")
+    parser.add_argument("--omit-log", dest="omit_log_path", default="outputs/omit_data.jsonl", help="Path to the compact omit log")
+    parser.add_argument("--ids", default=None, help="Comma separated record ids to restore, all records when omitted")
+    parser.add_argument("--output", dest="output_path", default=None, help="Output JSONL, stdout when omitted")
+    args = parser.parse_args()
+
+    ids = [int(i) for i in args.ids.split(',')] if args.ids else None
+    entries = load_omit_log(Path(args.omit_log_path), ids)
+    handle = open(args.output_path, 'w', encoding='utf-8') if args.output_path else sys.stdout
+    try:
+        for row in rehydrate(Path(args.input_path), entries):
+            handle.write(json.dumps(row) + '\n')
+    finally:
+        if handle is not sys.stdout:
+            handle.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+import dataclasses
+import json
+from pathlib import Path
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional, only needed for the score file
+    pa = None
+    pq = None
+
+from pipelib.components.core.record import Record
+from pipelib.io.parquet import ROW_GROUP_SIZE
+
+SCORES_FILE_NAME = 'scores.parquet'
+METADATA_KEY = b'pipelib'
+SCORES_VERSION = 1
+
+COLUMNS = (
+    'id', 'omit_reason', 'source_offset', 'source_length', 'char_count', 'token_count',
+    'ascii_ratio', 'symbol_ratio', 'lang', 'lang_score', 'toxicity',
+)
+
+
+def scores_schema(metadata: dict | None = None) -> 'pa.Schema':
+    schema = pa.schema([
+        ('id', pa.int64()),
+        ('omit_reason', pa.string()),
+        ('source_offset', pa.int64()),
+        ('source_length', pa.int64()),
+        ('char_count', pa.int64()),
+        ('token_count', pa.int64()),
+        ('ascii_ratio', pa.float64()),
+        ('symbol_ratio', pa.float64()),
+        ('lang', pa.string()),
+        ('lang_score', pa.float64()),
+        ('toxicity', pa.float64()),
+    ])
+    if metadata is not None:
+        schema = schema.with_metadata({METADATA_KEY: json.dumps(metadata)})
+    return schema
+
+
+def score_metadata(steps: list, config) -> dict:
+    """The step order and config of a run, stored with its scores so refilter can replay the filters."""
+    return {
+        'version': SCORES_VERSION,
+        'steps': [f'{type(step).__module__}.{type(step).__qualname__}' for step in steps],
+        'config': config_values(config),
+    }
+
+
+def config_values(config) -> dict:
+    values = {}
+    for field in dataclasses.fields(config):
+        value = getattr(config, field.name)
+        values[field.name] = str(value) if isinstance(value, Path) else value
+    return values
+
+
+class ScoreWriter:
+    """
+    Writes the raw scores and attributes the filters decided on, one row per record, kept or
+    omitted, to a zstd-compressed Parquet file. Scores a record never got, because an earlier
+    step omitted it, are null.
+    """
+
+    def __init__(self, path: Path, metadata: dict, row_group_size: int = ROW_GROUP_SIZE):
+        if pq is None:
+            raise ImportError('pyarrow is required to write scores')
+        self.path = Path(path)
+        self.row_group_size = max(row_group_size, 1)
+        self.rows_written = 0
+        self._schema = scores_schema(metadata)
+        self._writer = pq.ParquetWriter(str(self.path), self._schema, compression='zstd')
+        self._columns: dict[str, list] = {column: [] for column in COLUMNS}
+        self._buffered = 0
+
+    def write_record(self, record: Record) -> None:
+        for column in COLUMNS:
+            self._columns[column].append(getattr(record, column))
+        self._buffered += 1
+        if self._buffered >= self.row_group_size:
+            self._flush()
+
+    def close(self) -> None:
+        self._flush()
+        self._writer.close()
+
+    def _flush(self) -> None:
+        if not self._buffered:
+            return
+        batch = pa.RecordBatch.from_pydict(self._columns, schema=self._schema)
+        self._writer.write_batch(batch, row_group_size=self.row_group_size)
+        self.rows_written += self._buffered
+        self._columns = {column: [] for column in COLUMNS}
+        self._buffered = 0
+
+
+def load_scores(path: Path) -> tuple['pa.Table', dict]:
+    """The score table and the metadata of the run that wrote it."""
+    if pq is None:
+        raise ImportError('pyarrow is required to read scores')
+    table = pq.read_table(str(path))
+    metadata = table.schema.metadata or {}
+    if METADATA_KEY not in metadata:
+        raise ValueError(f'{path} is not a score file')
+    return table, json.loads(metadata[METADATA_KEY])
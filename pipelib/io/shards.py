@@ -0,0 +1,127 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+from pipelib.io.compression import CompressionStats, compress_file
+
+# Closed shards finalized in parallel while the writer thread fills the next one
+FINALIZE_WORKERS = 2
+MANIFEST_VERSION = 1
+CHECKSUM_BLOCK_SIZE = 1024 * 1024
+
+
+def file_checksum(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        while block := handle.read(CHECKSUM_BLOCK_SIZE):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def fsync_path(path: Path) -> None:
+    """Flush a file, or the entries of a directory, to stable storage."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass  # some platforms cannot fsync directories
+    finally:
+        os.close(fd)
+
+
+class ShardFinalizer:
+    """
+    Finalizes closed shards on a background pool: optional compression, fsync and checksum.
+    Once every shard is finalized, close() writes manifest.json listing the path, record count,
+    byte size, token count and checksum of every shard, so consumers can plan reads without
+    opening the shards.
+    """
+
+    def __init__(self, output_dir: Path, workers: int = FINALIZE_WORKERS):
+        self.output_dir = Path(output_dir)
+        self.manifest_path = self.output_dir / 'manifest.json'
+        self.compression_stats = CompressionStats()
+        self.finalize_seconds = 0.0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix='shard-finalize')
+        self._futures: list[Future] = []
+
+    def submit(
+            self,
+            index: int,
+            path: Path,
+            records: int,
+            uncompressed_bytes: int,
+            tokens: int,
+            compression: str = 'none',
+            token_paths: tuple[Path, ...] = (),
+            bpe_tokens: int | None = None,
+    ) -> None:
+        self._futures.append(self._executor.submit(
+            self._finalize, index, Path(path), records, uncompressed_bytes, tokens, compression, token_paths, bpe_tokens,
+        ))
+
+    def close(self, **manifest_fields) -> list[dict]:
+        """Wait for the pending shards and write the manifest. Returns the shard entries."""
+        try:
+            shards = [future.result() for future in self._futures]
+        finally:
+            self._executor.shutdown()
+        manifest = {
+            'version': MANIFEST_VERSION,
+            **manifest_fields,
+            'total_records': sum(shard['records'] for shard in shards),
+            'total_bytes': sum(shard['bytes'] for shard in shards),
+            'total_tokens': sum(shard['tokens'] for shard in shards),
+            'shards': shards,
+        }
+        tmp_path = self.manifest_path.with_name(self.manifest_path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as handle:
+            json.dump(manifest, handle, indent=4)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp_path, self.manifest_path)
+        fsync_path(self.output_dir)
+        return shards
+
+    def _finalize(
+            self,
+            index: int,
+            path: Path,
+            records: int,
+            uncompressed_bytes: int,
+            tokens: int,
+            compression: str,
+            token_paths: tuple[Path, ...],
+            bpe_tokens: int | None,
+    ) -> dict:
+        start = time.perf_counter()
+        stats = CompressionStats()
+        if compression != 'none':
+            path = compress_file(path, compression, stats)
+        entry = {
+            'index': index,
+            **self._file_entry(path),
+            'records': records,
+            'uncompressed_bytes': uncompressed_bytes,
+            'tokens': tokens,
+        }
+        if token_paths:
+            entry['bpe_tokens'] = bpe_tokens
+            entry['token_files'] = [self._file_entry(token_path) for token_path in token_paths]
+        with self._lock:
+            self.compression_stats.add(stats)
+            self.finalize_seconds += time.perf_counter() - start
+        return entry
+
+    def _file_entry(self, path: Path) -> dict:
+        fsync_path(path)
+        return {
+            'path': path.relative_to(self.output_dir).as_posix(),
+            'bytes': path.stat().st_size,
+            'sha256': file_checksum(path),
+        }
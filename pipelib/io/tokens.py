@@ -0,0 +1,145 @@
+import json
+import random
+import struct
+import time
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import numpy as np
+
+try:
+    from tokenizers import Tokenizer, decoders, models, pre_tokenizers, trainers
+except ImportError:  # tokenizers is optional, only needed for token shards
+    Tokenizer = None
+
+# Texts encoded per call to the tokenizer, encode_batch spreads a batch over all cores
+TOKENIZE_BATCH = 1024
+
+# .idx layout: magic, version, token itemsize, document count, then count + 1 uint64 token offsets
+IDX_MAGIC = b'PIPETOK\x00'
+IDX_VERSION = 1
+IDX_HEADER = struct.Struct('<8sIIQ')
+
+DEFAULT_VOCAB_SIZE = 32_000
+SPECIAL_TOKENS = ['<|endoftext|>']
+
+
+def _require_tokenizers():
+    if Tokenizer is None:
+        raise ImportError('tokenizers is required for token shards')
+
+
+def token_dtype(vocab_size: int) -> np.dtype:
+    """Smallest unsigned dtype that holds every token id of the vocabulary."""
+    return np.dtype(np.uint16) if vocab_size <= 1 << 16 else np.dtype(np.uint32)
+
+
+def train_tokenizer(texts: Iterable[str], vocab_size: int = DEFAULT_VOCAB_SIZE) -> 'Tokenizer':
+    """Train a byte-level BPE tokenizer, so any text round-trips through encode and decode."""
+    _require_tokenizers()
+    tokenizer = Tokenizer(models.BPE())
+    tokenizer.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    tokenizer.decoder = decoders.ByteLevel()
+    trainer = trainers.BpeTrainer(
+        vocab_size=vocab_size,
+        special_tokens=SPECIAL_TOKENS,
+        initial_alphabet=pre_tokenizers.ByteLevel.alphabet(),
+        show_progress=False,
+    )
+    tokenizer.train_from_iterator(texts, trainer=trainer)
+    return tokenizer
+
+
+def load_tokenizer(path: Path) -> 'Tokenizer':
+    _require_tokenizers()
+    return Tokenizer.from_file(str(path))
+
+
+def sample_cleaned_texts(path: Path, sample_size: int, seed: int = 0) -> list[str]:
+    """Reservoir sample of the cleaned texts in a cleaned.jsonl (or shard) file."""
+    rng = random.Random(seed)
+    sample = []
+    with open(path, 'r', encoding='utf-8') as handle:
+        for i, line in enumerate(handle):
+            if len(sample) < sample_size:
+                sample.append(json.loads(line)['cleaned'])
+            else:
+                j = rng.randrange(i + 1)
+                if j < sample_size:
+                    sample[j] = json.loads(line)['cleaned']
+    return sample
+
+
+class TokenShardWriter:
+    """
+    Tokenizes texts in batches and writes them as a memory-mappable pair of files:
+    <prefix>.bin holds the token ids of all documents back to back, and <prefix>.idx
+    holds the token offset of every document, so document i is tokens[offsets[i]:offsets[i + 1]].
+    """
+
+    def __init__(self, prefix: Path, tokenizer: 'Tokenizer', batch_size: int = TOKENIZE_BATCH):
+        self.prefix = Path(prefix)
+        self.bin_path = self.prefix.with_name(self.prefix.name + '.bin')
+        self.idx_path = self.prefix.with_name(self.prefix.name + '.idx')
+        self.tokenizer = tokenizer
+        self.batch_size = max(batch_size, 1)
+        self.dtype = token_dtype(tokenizer.get_vocab_size(with_added_tokens=True))
+        self.tokens_written = 0
+        self.tokenize_seconds = 0.0
+        self._offsets = [0]
+        self._pending: list[str] = []
+        self._handle = open(self.bin_path, 'wb')
+
+    def write_text(self, text: str) -> None:
+        self._pending.append(text)
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+
+    def close(self) -> None:
+        if self._handle.closed:
+            return
+        self._flush()
+        self._handle.close()
+        offsets = np.asarray(self._offsets, dtype=np.uint64)
+        with open(self.idx_path, 'wb') as handle:
+            handle.write(IDX_HEADER.pack(IDX_MAGIC, IDX_VERSION, self.dtype.itemsize, len(offsets) - 1))
+            handle.write(offsets.tobytes())
+
+    def _flush(self) -> None:
+        if not self._pending:
+            return
+        start = time.perf_counter()
+        encodings = self.tokenizer.encode_batch(self._pending, add_special_tokens=False)
+        self.tokenize_seconds += time.perf_counter() - start
+        self._pending = []
+
+        ids = [encoding.ids for encoding in encodings]
+        lengths = np.fromiter((len(doc) for doc in ids), dtype=np.uint64, count=len(ids))
+        self._offsets.extend((np.cumsum(lengths) + np.uint64(self.tokens_written)).tolist())
+        tokens = np.fromiter((token for doc in ids for token in doc), dtype=self.dtype, count=int(lengths.sum()))
+        self._handle.write(tokens.tobytes())
+        self.tokens_written += len(tokens)
+
+
+def load_token_shard(prefix: Path) -> tuple[np.ndarray, np.ndarray]:
+    """Memory-map a token shard, returning (tokens, offsets)."""
+    prefix = Path(prefix)
+    idx_path = prefix.with_name(prefix.name + '.idx')
+    with open(idx_path, 'rb') as handle:
+        magic, version, itemsize, count = IDX_HEADER.unpack(handle.read(IDX_HEADER.size))
+    if magic != IDX_MAGIC or version != IDX_VERSION:
+        raise ValueError(f'Not a token shard index: {idx_path}')
+    offsets = np.memmap(idx_path, dtype=np.uint64, mode='r', offset=IDX_HEADER.size, shape=(count + 1,))
+    dtype = np.uint16 if itemsize == 2 else np.uint32
+    bin_path = prefix.with_name(prefix.name + '.bin')
+    if int(offsets[-1]) == 0:
+        return np.zeros(0, dtype=dtype), offsets  # np.memmap cannot map an empty file
+    tokens = np.memmap(bin_path, dtype=dtype, mode='r', shape=(int(offsets[-1]),))
+    return tokens, offsets
+
+
+def iter_token_shard(prefix: Path) -> Iterator[np.ndarray]:
+    tokens, offsets = load_token_shard(prefix)
+    for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist()):
+        yield tokens[start:end]
+
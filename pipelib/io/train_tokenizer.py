@@ -0,0 +1,22 @@
+import argparse
+from pathlib import Path
+
+from pipelib.io.tokens import DEFAULT_VOCAB_SIZE, sample_cleaned_texts, train_tokenizer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train a byte-level BPE tokenizer on a sample of the pipeline output")
+    parser.add_argument("--input", dest="input_path", default="outputs/cleaned.jsonl", help="Path to cleaned JSONL")
+    parser.add_argument("--output", dest="output_path", default="tokenizer.json", help="Path to store the tokenizer")
+    parser.add_argument("--vocab-size", type=int, default=DEFAULT_VOCAB_SIZE, help="Vocabulary size of the tokenizer")
+    parser.add_argument("--sample-size", type=int, default=100_000, help="Number of cleaned records to train on")
+    args = parser.parse_args()
+
+    texts = sample_cleaned_texts(Path(args.input_path), args.sample_size)
+    tokenizer = train_tokenizer(texts, args.vocab_size)
+    tokenizer.save(args.output_path)
+    print(f'Trained tokenizer with {tokenizer.get_vocab_size()} tokens on {len(texts)} records -> {args.output_path}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,306 @@
+import queue
+import random
+import threading
+import time
+from pathlib import Path
+
+from pipelib.components.core.record import Record
+from pipelib.io.compression import CompressionStats, open_output
+from pipelib.io.parquet import ParquetShardWriter, ROW_GROUP_SIZE
+from pipelib.io.scores import SCORES_FILE_NAME, ScoreWriter
+from pipelib.io.shards import FINALIZE_WORKERS, ShardFinalizer
+from pipelib.io.tokens import TokenShardWriter
+from pipelib.utils import ensure_dir
+
+# Records waiting for the writer thread before write_record/write_omit block
+QUEUE_SIZE = 4096
+# Queue items written per wake-up of the writer thread
+DRAIN_BATCH = 1024
+
+_KEPT = 0
+_OMITTED = 1
+
+
+class RecordWriter:
+    """
+    Writes kept records to cleaned.jsonl and the current shard, and omitted records to omit_data.jsonl.
+    Records are serialized exactly once, on a dedicated writer thread that drains a bounded queue
+    and writes in large batches, so the thread draining the pipeline never touches the disk.
+    Shards are JSONL by default, or Parquet files with one row group per filled buffer.
+    With a tokenizer, every shard also gets a shard_N.bin/shard_N.idx pair of BPE token ids.
+
+    With omit_log='compact', omitted records are logged by id, reason, language and input byte
+    range instead of their full text, and an omit_sample_rate fraction of them is also written
+    in full to omit_sample.jsonl. pipelib.io.rehydrate restores the text from the input.
+
+    Shards rotate every shard_size records, or at shard_bytes of serialized records or
+    shard_tokens tokens when either is set. Closed shards are compressed, fsynced and
+    checksummed on a background pool and listed in manifest.json.
+
+    With score_metadata, the scores of every record, kept or omitted, are also written to
+    scores.parquet, from which pipelib.refilter re-applies changed thresholds.
+    """
+
+    def __init__(
+            self,
+            output_dir: Path,
+            shard_size: int,
+            compression: str = 'none',
+            output_format: str = 'jsonl',
+            tokenizer=None,
+            shard_bytes: int = 0,
+            shard_tokens: int = 0,
+            finalize_workers: int = FINALIZE_WORKERS,
+            omit_log: str = 'full',
+            omit_sample_rate: float = 0.0,
+            score_metadata: dict | None = None,
+            queue_size: int = QUEUE_SIZE,
+    ):
+        if output_format not in ('jsonl', 'parquet'):
+            raise ValueError(f'Unknown output format: {output_format}')
+        if omit_log not in ('full', 'compact'):
+            raise ValueError(f'Unknown omit log mode: {omit_log}')
+        self.output_dir = ensure_dir(output_dir)
+        self.shard_dir = ensure_dir(self.output_dir / 'shards')
+        self.shard_size = shard_size
+        self.shard_bytes = shard_bytes
+        self.shard_tokens = shard_tokens
+        self.compression = compression
+        self.output_format = output_format
+        self.tokenizer = tokenizer
+        self.omit_log = omit_log
+        self.omit_sample_rate = omit_sample_rate
+        self.compression_stats = CompressionStats()
+
+        self.records_written = 0
+        self.omits_written = 0
+        self.omit_samples_written = 0
+        self.bytes_written = 0
+        self.write_seconds = 0.0
+        self.producer_wait_seconds = 0.0
+        self.max_queue_depth = 0
+        self.tokens_written = 0
+        self.tokenize_seconds = 0.0
+        self.shards: list[dict] = []
+
+        self._queue: queue.Queue[tuple[int, Record] | None] = queue.Queue(maxsize=queue_size)
+        self._error: BaseException | None = None
+        self._start = time.perf_counter()
+        self._elapsed: float | None = None
+        self._shard_index = 0
+        self._shard_written = 0
+        self._shard_bytes_written = 0
+        self._shard_tokens_written = 0
+        self._finalizer = ShardFinalizer(self.output_dir, finalize_workers)
+        self._cleaned_handle = open_output(self.output_dir / 'cleaned.jsonl', compression, self.compression_stats)
+        self._omit_handle = open_output(self.output_dir / 'omit_data.jsonl', compression, self.compression_stats)
+        self._omit_sample_handle = None
+        if omit_log == 'compact' and omit_sample_rate > 0:
+            self._omit_sample_handle = open_output(self.output_dir / 'omit_sample.jsonl', compression, self.compression_stats)
+        self._omit_sample_rng = random.Random(0)
+        self._shard_handle = self._open_shard()
+        self._token_handle = self._open_token_shard()
+        self._score_handle = ScoreWriter(self.output_dir / SCORES_FILE_NAME, score_metadata) \
+            if score_metadata is not None else None
+        self._thread = threading.Thread(target=self._run, name='record-writer', daemon=True)
+        self._thread.start()
+
+    def write_record(self, record: Record) -> None:
+        self._put((_KEPT, record))
+
+    def write_omit(self, record: Record) -> None:
+        self._put((_OMITTED, record))
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def close(self) -> None:
+        if self._elapsed is not None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._elapsed = time.perf_counter() - self._start
+        if self._error is not None:
+            raise self._error
+
+    def stats(self) -> dict:
+        elapsed = self._elapsed if self._elapsed is not None else time.perf_counter() - self._start
+        return {
+            'records_written': self.records_written,
+            'omits_written': self.omits_written,
+            'omit_samples_written': self.omit_samples_written,
+            'scores_written': self._score_handle.rows_written if self._score_handle is not None else 0,
+            'bytes_written': self.bytes_written,
+            'bytes_per_second': self.bytes_written / elapsed if elapsed else 0.0,
+            'write_seconds': self.write_seconds,
+            'queue_depth': self.queue_depth(),
+            'max_queue_depth': self.max_queue_depth,
+            'queue_capacity': self._queue.maxsize,
+            # Time the pipeline spent blocked on a full queue, non-zero when output is the bottleneck
+            'producer_wait_seconds': self.producer_wait_seconds,
+            'compression': {'codec': self.compression, **self.compression_stats.to_dict()},
+            'tokens_written': self.tokens_written,
+            'tokenize_seconds': self.tokenize_seconds,
+            'shards': len(self.shards),
+            'shard_finalize_seconds': self._finalizer.finalize_seconds,
+        }
+
+    def _put(self, item: tuple[int, Record]) -> None:
+        if self._error is not None:
+            raise self._error
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            start = time.perf_counter()
+            self._queue.put(item)
+            self.producer_wait_seconds += time.perf_counter() - start
+        self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+
+    def _shard_path(self) -> Path:
+        return self.shard_dir / f'shard_{self._shard_index}.{self.output_format}'
+
+    def _open_shard(self):
+        if self.output_format == 'parquet':
+            return ParquetShardWriter(
+                self._shard_path(),
+                self.compression,
+                row_group_size=min(self.shard_size, ROW_GROUP_SIZE),
+            )
+        # Compressed after the shard is closed, on the finalizer pool
+        return open(self._shard_path(), 'w', encoding='utf-8')
+
+    def _open_token_shard(self) -> TokenShardWriter | None:
+        if self.tokenizer is None:
+            return None
+        return TokenShardWriter(self.shard_dir / f'shard_{self._shard_index}', self.tokenizer)
+
+    def _shard_full(self) -> bool:
+        if self.shard_bytes > 0:
+            return self._shard_bytes_written >= self.shard_bytes
+        if self.shard_tokens > 0:
+            return self._shard_tokens_written >= self.shard_tokens
+        return self._shard_written >= self.shard_size
+
+    def _close_shard(self) -> None:
+        self._shard_handle.close()
+        token_paths = ()
+        bpe_tokens = None
+        if self._token_handle is not None:
+            self._token_handle.close()
+            self.tokens_written += self._token_handle.tokens_written
+            self.tokenize_seconds += self._token_handle.tokenize_seconds
+            token_paths = (self._token_handle.bin_path, self._token_handle.idx_path)
+            bpe_tokens = self._token_handle.tokens_written
+
+        if self._shard_written == 0:
+            # Only the last shard can be empty, when the records ran out right after a rotation
+            for path in (self._shard_path(), *token_paths):
+                path.unlink()
+            return
+        self._finalizer.submit(
+            self._shard_index,
+            self._shard_path(),
+            records=self._shard_written,
+            uncompressed_bytes=self._shard_bytes_written,
+            tokens=self._shard_tokens_written,
+            # Parquet compresses its columns internally
+            compression=self.compression if self.output_format == 'jsonl' else 'none',
+            token_paths=token_paths,
+            bpe_tokens=bpe_tokens,
+        )
+
+    def _shard_by(self) -> dict:
+        if self.shard_bytes > 0:
+            return {'unit': 'bytes', 'target': self.shard_bytes}
+        if self.shard_tokens > 0:
+            return {'unit': 'tokens', 'target': self.shard_tokens}
+        return {'unit': 'records', 'target': self.shard_size}
+
+    def _run(self) -> None:
+        done = False
+        while not done:
+            items = [self._queue.get()]
+            while len(items) < DRAIN_BATCH:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if items[-1] is None:
+                items.pop()
+                done = True
+            if self._error is not None:
+                continue  # keep draining so that producers never block on a failed writer
+            try:
+                start = time.perf_counter()
+                self._write_items(items)
+                if done:
+                    self._close_shard()
+                    self._cleaned_handle.close()
+                    self._omit_handle.close()
+                    if self._omit_sample_handle is not None:
+                        self._omit_sample_handle.close()
+                    if self._score_handle is not None:
+                        self._score_handle.close()
+                    self.shards = self._finalizer.close(
+                        format=self.output_format,
+                        compression=self.compression,
+                        shard_by=self._shard_by(),
+                    )
+                    self.compression_stats.add(self._finalizer.compression_stats)
+                self.write_seconds += time.perf_counter() - start
+            except BaseException as e:
+                self._error = e
+
+    def _write_items(self, items: list[tuple[int, Record]]) -> None:
+        cleaned_lines = []
+        shard_lines = []
+        omit_lines = []
+        omit_sample_lines = []
+        for kind, record in items:
+            if self._score_handle is not None:
+                self._score_handle.write_record(record)
+            if kind == _OMITTED:
+                if self.omit_log == 'full':
+                    omit_lines.append(record.to_failed_jsonl())
+                else:
+                    omit_lines.append(record.to_compact_failed_jsonl())
+                    if self._omit_sample_handle is not None and self._omit_sample_rng.random() < self.omit_sample_rate:
+                        omit_sample_lines.append(record.to_failed_jsonl())
+                        self.omit_samples_written += 1
+                self.omits_written += 1
+                continue
+
+            line = record.to_successful_jsonl()
+            cleaned_lines.append(line)
+            if self.output_format == 'parquet':
+                self._shard_handle.write_record(record)
+            else:
+                shard_lines.append(line)
+            if self._token_handle is not None:
+                self._token_handle.write_text(record.cleaned)
+            self.records_written += 1
+            self._shard_written += 1
+            self._shard_bytes_written += len(line)
+            self._shard_tokens_written += record.token_count or 0
+            if self._shard_full():
+                self._write(self._shard_handle, shard_lines)
+                shard_lines = []
+                self._close_shard()
+                self._shard_index += 1
+                self._shard_written = 0
+                self._shard_bytes_written = 0
+                self._shard_tokens_written = 0
+                self._shard_handle = self._open_shard()
+                self._token_handle = self._open_token_shard()
+
+        self._write(self._cleaned_handle, cleaned_lines)
+        self._write(self._shard_handle, shard_lines)
+        self._write(self._omit_handle, omit_lines)
+        if self._omit_sample_handle is not None:
+            self._write(self._omit_sample_handle, omit_sample_lines)
+
+    def _write(self, handle, lines: list[str]) -> None:
+        if lines:
+            data = ''.join(lines)
+            handle.write(data)
+            self.bytes_written += len(data)  # json.dumps escapes non-ASCII, so characters are bytes
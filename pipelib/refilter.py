@@ -0,0 +1,217 @@
+import argparse
+import dataclasses
+import importlib
+import json
+import logging
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Iterator
+
+from pipelib.components.core import Filter
+from pipelib.components.core.filter import FilterResult, FilterStatus
+from pipelib.components.core.record import Record
+from pipelib.components.core.settings import PipelineConfig
+from pipelib.io.rehydrate import iter_jsonl
+from pipelib.io.scores import METADATA_KEY, SCORES_FILE_NAME, config_values, load_scores, pa, pq
+from pipelib.io.tokens import load_tokenizer
+from pipelib.io.writer import RecordWriter
+
+REPROCESS_FILE_NAME = 'reprocess.jsonl'
+# Config fields read by the filters with thresholds, the ones a refilter can change
+THRESHOLD_FIELDS = (
+    'min_char_len', 'max_char_len', 'min_ascii_ratio', 'max_symbol_ratio', 'require_english', 'toxicity_threshold',
+)
+
+logger = logging.getLogger(__name__)
+
+
+def load_config(metadata: dict, output_dir: Path, **thresholds) -> PipelineConfig:
+    """The config of the run that wrote the scores, writing to output_dir with the given thresholds."""
+    values = {}
+    for field in dataclasses.fields(PipelineConfig):
+        if field.name in metadata['config']:
+            value = metadata['config'][field.name]
+            values[field.name] = Path(value) if value is not None and field.type in (Path, Path | None) else value
+    values['output_dir'] = Path(output_dir)
+    values.update({name: value for name, value in thresholds.items() if value is not None})
+    return PipelineConfig(**values)
+
+
+def load_filters(metadata: dict, config: PipelineConfig) -> list[Filter | None]:
+    """The filters of the run in step order, None in place of the steps that are not filters."""
+    filters = []
+    for path in metadata['steps']:
+        module_name, _, class_name = path.rpartition('.')
+        step_class = getattr(importlib.import_module(module_name), class_name)
+        # Filters load their models lazily, constructing them loads none
+        filters.append(step_class(config) if issubclass(step_class, Filter) else None)
+    return filters
+
+
+def decide(filters: list[Filter | None], scores: dict) -> FilterResult | None:
+    """
+    Replay the filters over the persisted scores of a record. Returns None when the record has
+    to go through the pipeline again: it now passes the filter that omitted it, so the steps
+    after that filter never ran on it, or a score the new config needs was never computed.
+    """
+    return replay(filters, scores)[0]
+
+
+def replay(filters: list[Filter | None], scores: dict) -> tuple[FilterResult | None, int]:
+    """The decision of decide() and the number of steps the record passes through under it."""
+    reason = scores['omit_reason']
+    omitted_at = len(filters)
+    if reason is not None:
+        omitted_at = next(
+            (idx for idx, step in enumerate(filters) if step is not None and reason in step.omit_reasons), None
+        )
+        if omitted_at is None:
+            return FilterResult.omit(reason), len(filters)  # not given by any filter of the run, kept as is
+    for idx, step in enumerate(filters[:omitted_at + 1]):
+        if step is None:
+            continue
+        result = step.refilter(scores)
+        if result is None or result.status is FilterStatus.OMIT:
+            return result, idx + 1
+    return FilterResult.keep() if reason is None else None, len(filters)
+
+
+def iter_shard_rows(source_dir: Path) -> Iterator[dict]:
+    """The rows of the shards listed in the manifest of a run, in order."""
+    with open(source_dir / 'manifest.json', 'r', encoding='utf-8') as handle:
+        manifest = json.load(handle)
+    for shard in manifest['shards']:
+        path = source_dir / shard['path']
+        if manifest['format'] == 'parquet':
+            for batch in pq.ParquetFile(str(path)).iter_batches():
+                yield from batch.to_pylist()
+        else:
+            yield from iter_jsonl(path)
+
+
+def _record(scores: dict, row: dict | None = None) -> Record:
+    record = Record(row['cleaned'] if row is not None else None, url=None)
+    record.original = None
+    for name, value in scores.items():
+        setattr(record, name, value)
+    if row is not None:
+        record.anonymized = row['anonymized']
+        record.html_extracted = row['html_extracted']
+    return record
+
+
+def refilter(source_dir: Path, output_dir: Path, **thresholds) -> dict:
+    """
+    Re-apply changed thresholds to the outputs of a run from its scores.parquet, without loading
+    any model. Kept records are copied from the shards of the run, omitted records are logged in
+    compact form, and records that need the pipeline again are listed in reprocess.jsonl, in the
+    compact omit log format accepted by pipelib.io.rehydrate.
+
+    DedupFilter keeps the decisions of the run: the fingerprints are not part of the scores, and
+    the text a record was fingerprinted on may have been changed by later steps. A duplicate of a
+    record that a stricter threshold now omits before the dedup step therefore stays omitted,
+    where a full re-run would keep the duplicate in its place.
+    """
+    start = time.perf_counter()
+    source_dir = Path(source_dir)
+    if not (source_dir / SCORES_FILE_NAME).exists():
+        raise FileNotFoundError(f'{source_dir / SCORES_FILE_NAME} does not exist, run the pipeline with --scores')
+    table, metadata = load_scores(source_dir / SCORES_FILE_NAME)
+    config = load_config(metadata, output_dir, **thresholds)
+    filters = load_filters(metadata, config)
+    writer = RecordWriter(
+        config.output_dir,
+        shard_size=config.shard_size,
+        compression=config.compression,
+        output_format=config.output_format,
+        tokenizer=load_tokenizer(config.tokenizer_path) if config.tokenizer_path else None,
+        shard_bytes=config.shard_bytes,
+        shard_tokens=config.shard_tokens,
+        omit_log='compact',  # the original texts are not part of the outputs
+    )
+
+    kept: dict[int, dict] = {}
+    reasons: list[str | None] = []
+    omit_reasons: Counter[str] = Counter()
+    n_reprocess = 0
+    try:
+        with open(config.output_dir / REPROCESS_FILE_NAME, 'w', encoding='utf-8') as reprocess_handle:
+            for batch in table.to_batches():
+                for scores in batch.to_pylist():
+                    result = decide(filters, scores)
+                    if result is None:
+                        reasons.append(scores['omit_reason'])
+                        reprocess_handle.write(_record(scores).to_compact_failed_jsonl())
+                        n_reprocess += 1
+                    elif result.status is FilterStatus.OMIT:
+                        reasons.append(result.reason)
+                        record = _record(scores)
+                        record.omit = True
+                        record.omit_reason = result.reason
+                        writer.write_omit(record)
+                        omit_reasons[result.reason] += 1
+                    else:
+                        reasons.append(None)
+                        kept[scores['id']] = scores
+        for row in iter_shard_rows(source_dir):
+            scores = kept.get(row['id'])
+            if scores is not None:
+                writer.write_record(_record(scores, row))
+    finally:
+        writer.close()
+
+    # Records left for reprocessing keep their old decision, so a later refilter sees them again
+    metadata = {**metadata, 'config': config_values(config)}
+    table = table.set_column(table.schema.get_field_index('omit_reason'), 'omit_reason', pa.array(reasons, pa.string()))
+    table = table.replace_schema_metadata({**table.schema.metadata, METADATA_KEY: json.dumps(metadata)})
+    pq.write_table(table, str(config.output_dir / SCORES_FILE_NAME), compression='zstd')
+
+    insights = {
+        'thresholds': {name: getattr(config, name) for name in THRESHOLD_FIELDS},
+        'records': table.num_rows,
+        'kept': len(kept),
+        'omitted': sum(omit_reasons.values()),
+        'reprocess': n_reprocess,
+        'omit_reasons': dict(omit_reasons),
+        'seconds': time.perf_counter() - start,
+        'io': {'writer': writer.stats()},
+    }
+    with open(config.output_dir / 'refilter_insights.json', 'w', encoding='utf-8') as handle:
+        json.dump(insights, handle, indent=4)
+    return insights
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Re-apply filter thresholds to the outputs of a pipeline run without loading any model",
+        epilog=(
+            "Filters without thresholds, such as the dedup filter, keep the decisions of the run. A duplicate stays "
+            "omitted even when a stricter threshold now omits the copy that was kept before it, where a full re-run "
+            "would keep the duplicate instead."
+        ),
+    )
+    parser.add_argument("--source", dest="source_dir", default="outputs", help="Output directory of the run, with its scores.parquet")
+    parser.add_argument("--output", dest="output_dir", required=True, help="Directory to store the refiltered outputs")
+    parser.add_argument("--min-char-len", type=int, default=None, help="Minimum characters to keep a sample")
+    parser.add_argument("--max-char-len", type=int, default=None, help="Maximum characters to keep a sample")
+    parser.add_argument("--min-ascii-ratio", type=float, default=None, help="Minimum fraction of ASCII characters")
+    parser.add_argument("--max-symbol-ratio", type=float, default=None, help="Maximum fraction of symbol characters")
+    parser.add_argument("--toxicity-threshold", type=float, default=None, help="Toxicity threshold")
+    parser.add_argument("--require-english", action=argparse.BooleanOptionalAction, default=None, help="Omit non-English rows")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    insights = refilter(
+        Path(args.source_dir),
+        Path(args.output_dir),
+        **{name: getattr(args, name) for name in THRESHOLD_FIELDS},
+    )
+    logger.info(
+        'Kept %d, omitted %d and left %d to reprocess in %.1fs',
+        insights['kept'], insights['omitted'], insights['reprocess'], insights['seconds'],
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+import dataclasses
+import itertools
+from collections import Counter
+from pathlib import Path
+
+from pipelib.components.core.filter import FilterStatus
+from pipelib.components.core.settings import PipelineConfig
+from pipelib.io.scores import SCORES_FILE_NAME, load_scores
+from pipelib.refilter import THRESHOLD_FIELDS, load_config, load_filters, replay
+
+# The value of each threshold that keeps the most records, so that the scores of every record
+# that any variant could keep are computed
+LOOSEST = {
+    'min_char_len': min,
+    'max_char_len': max,
+    'min_ascii_ratio': min,
+    'max_symbol_ratio': max,
+    'require_english': min,
+    'toxicity_threshold': max,
+}
+
+
+def parse_grid(specs: list[str]) -> dict[str, list]:
+    """Parse FIELD=V1,V2,... specs into candidate values per threshold field."""
+    types = {field.name: field.type for field in dataclasses.fields(PipelineConfig)}
+    grid = {}
+    for spec in specs:
+        name, _, values = spec.partition('=')
+        name = name.strip().replace('-', '_')
+        if name not in THRESHOLD_FIELDS:
+            raise ValueError(f'Cannot sweep {name}, only {", ".join(THRESHOLD_FIELDS)}')
+        if types[name] is bool:
+            grid[name] = [value.strip().lower() in ('1', 'true', 'yes') for value in values.split(',')]
+        else:
+            grid[name] = [types[name](value) for value in values.split(',')]
+    return grid
+
+
+def sweep_variants(grid: dict[str, list]) -> list[dict]:
+    """Every combination of the candidate values, as threshold overrides."""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def loosest_config(config: PipelineConfig, variants: list[dict]) -> PipelineConfig:
+    overrides = {
+        name: LOOSEST[name](variant[name] for variant in variants)
+        for name in THRESHOLD_FIELDS if any(name in variant for variant in variants)
+    }
+    # Keeping non-English records skips detection, which the variants that require English decide on
+    if any(variant.get('require_english') for variant in variants):
+        overrides['detect_language'] = True
+    return dataclasses.replace(config, **overrides)
+
+
+def select_variant(variants: list[dict], index: int) -> dict:
+    if not 0 <= index < len(variants):
+        raise IndexError(f'Sweep variant {index} does not exist, the grid has {len(variants)} variants')
+    return variants[index]
+
+
+def evaluate_sweep(base_dir: Path, variants: list[dict], step_seconds: list[float] | None = None) -> list[dict]:
+    """
+    Decide every record under every variant from the scores of a run with the loosest thresholds,
+    in one pass over the scores. The runtime of a variant is estimated from the average time per
+    call of each step in that run, times the records that would reach the step under the variant.
+    Records whose decision needs a score the run never computed, e.g. the language of records
+    from a run that neither required nor detected it, are counted as undetermined.
+    """
+    table, metadata = load_scores(Path(base_dir) / SCORES_FILE_NAME)
+    configs = [load_config(metadata, base_dir, **variant) for variant in variants]
+    filters = [load_filters(metadata, config) for config in configs]
+    n_steps = len(metadata['steps'])
+    kept = [0] * len(variants)
+    undetermined = [0] * len(variants)
+    omit_reasons = [Counter() for _ in variants]
+    reached = [[0] * (n_steps + 1) for _ in variants]  # records passing through exactly n steps
+    for batch in table.to_batches():
+        for scores in batch.to_pylist():
+            for idx, variant_filters in enumerate(filters):
+                result, n = replay(variant_filters, scores)
+                if result is None:
+                    undetermined[idx] += 1
+                    continue
+                reached[idx][n] += 1
+                if result.status is FilterStatus.OMIT:
+                    omit_reasons[idx][result.reason] += 1
+                else:
+                    kept[idx] += 1
+
+    results = []
+    for idx, variant in enumerate(variants):
+        estimate = None
+        if step_seconds is not None:
+            # Records passing through n steps run steps 0..n-1
+            remaining = len(table) - undetermined[idx]
+            estimate = 0.0
+            for step_idx, seconds in enumerate(step_seconds):
+                estimate += seconds * remaining
+                remaining -= reached[idx][step_idx + 1]
+        results.append({
+            'variant': variant,
+            'records': table.num_rows,
+            'kept': kept[idx],
+            'retention_rate': kept[idx] / table.num_rows if table.num_rows else 0.0,
+            'omit_reasons': dict(omit_reasons[idx].most_common()),
+            'undetermined': undetermined[idx],
+            'estimated_step_seconds': estimate,
+        })
+    return results
+
+
+def format_sweep(results: list[dict]) -> str:
+    reasons = sorted({reason for result in results for reason in result['omit_reasons']})
+    header = ['#', 'variant', 'kept', 'retention', *reasons, 'undetermined', 'est. seconds']
+    rows = [header]
+    for idx, result in enumerate(results):
+        estimate = result['estimated_step_seconds']
+        rows.append([
+            str(idx),
+            ' '.join(f'{name}={value}' for name, value in result['variant'].items()),
+            str(result['kept']),
+            f'{result["retention_rate"]:.1%}',
+            *(str(result['omit_reasons'].get(reason, 0)) for reason in reasons),
+            str(result['undetermined']),
+            f'{estimate:.1f}' if estimate is not None else '-',
+        ])
+    widths = [max(len(row[col]) for row in rows) for col in range(len(header))]
+    return '\n'.join('  '.join(cell.ljust(width) for cell, width in zip(row, widths)) for row in rows)
@@ -1,7 +1,19 @@
 import os
 import time
+from collections import deque
+from concurrent.futures import Executor
 from pathlib import Path
 from functools import wraps
+from itertools import islice
+from typing import Callable, Iterable, Iterator, TypeVar
+
+try:
+    import psutil
+except ImportError:  # psutil is optional, /proc is read directly on Linux without it
+    psutil = None
+
+T = TypeVar('T')
+R = TypeVar('R')
 
 
 def ensure_dir(path: str|Path) -> Path:
@@ -22,6 +34,50 @@ def count_file_lines(path: Path):
     return sum(buf.count(b'\n') for buf in f_gen)
 
 
+def batched(iterable: Iterable[T], n: int) -> Iterator[list[T]]:
+    iterator = iter(iterable)
+    batch = list(islice(iterator, n))
+    while batch:
+        yield batch
+        batch = list(islice(iterator, n))
+
+
+def bounded_map(executor: Executor, func: Callable[[T], R], iterable: Iterable[T], window: int) -> Iterator[R]:
+    """
+    Like executor.map, but keeps at most `window` tasks in flight instead of
+    consuming the whole input up front. Results are yielded in input order.
+    """
+    pending = deque()
+    for item in iterable:
+        pending.append(executor.submit(func, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def process_memory(pid: int | None = None) -> dict[str, int | None]:
+    """
+    Resident (RSS), proportional (PSS) and unique (USS) memory of a process in bytes.
+    USS is the memory that would be freed if the process exited, i.e. what a forked worker
+    costs on top of the pages it still shares with its parent.
+    """
+    pid = os.getpid() if pid is None else pid
+    if psutil is not None:
+        info = psutil.Process(pid).memory_full_info()
+        return {'rss': info.rss, 'pss': getattr(info, 'pss', None), 'uss': info.uss}
+    sizes = {}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup', 'r') as handle:
+            for line in handle:
+                key, _, value = line.partition(':')
+                if value.rstrip().endswith('kB'):
+                    sizes[key] = int(value.split()[0]) * 1024
+    except OSError:
+        return {'rss': None, 'pss': None, 'uss': None}
+    return {'rss': sizes.get('Rss'), 'pss': sizes.get('Pss'), 'uss': sizes.get('Private_Clean', 0) + sizes.get('Private_Dirty', 0)}
+
+
 def timed(func):
     total_time = 0.0
     call_count = 0
@@ -0,0 +1,52 @@
+"""Inputs and runs shared by the tests of the scored outputs, refilter, sweep, estimate and distributed mode."""
+import json
+import zlib
+from pathlib import Path
+from typing import Iterable
+
+from pipelib.components.core.pipeline import Pipeline
+from pipelib.components.core.settings import PipelineConfig
+from pipelib.components.filters import DedupFilter, PreliminaryFilter, ToxicityFilter
+from pipelib.components.modifiers import AttributeEvaluationStep
+from pipelib.io.reader import JsonlReader
+from pipelib.io.scores import score_metadata
+from pipelib.io.writer import RecordWriter
+
+WORDS = tuple('the quick brown fox jumps over a lazy dog while we watch'.split())
+
+
+def rotated_text(start: int, length: int, words: tuple[str, ...] = WORDS) -> str:
+    """length words of the rotation of words that starts at start, texts repeat every len(words) starts."""
+    return ' '.join(words[(start + j) % len(words)] for j in range(length))
+
+
+def write_corpus(path: Path, texts: Iterable[str]) -> None:
+    with open(path, 'w', encoding='utf-8') as handle:
+        for i, text in enumerate(texts):
+            handle.write(json.dumps({'text': text, 'url': f'https://example.com/{i}'}) + '\n')
+
+
+def write_scored_corpus(path: Path, count: int) -> None:
+    """Texts of 5 to 44 words, with duplicates and a spread of lengths for the preliminary filter."""
+    write_corpus(path, (rotated_text(i, 5 + i % 40) for i in range(count)))
+
+
+class DummyToxicity:
+    """Deterministic toxicity scores in [0, 1) from the text, in place of Detoxify."""
+
+    def predict(self, text):
+        return {'toxicity': zlib.crc32(text.encode('utf-8')) % 100 / 100}
+
+
+def run_scored(config: PipelineConfig, **writer_options) -> Pipeline:
+    """Run the model-free steps, dedup and the dummy toxicity filter over the input, writing the scores."""
+    pipeline = Pipeline(config)
+    for step in (AttributeEvaluationStep, PreliminaryFilter, DedupFilter, ToxicityFilter):
+        pipeline.register_step(step)
+    pipeline.steps[3].detoxify_model = DummyToxicity()
+    writer = RecordWriter(config.output_dir, score_metadata=score_metadata(pipeline.steps, config), **writer_options)
+    pipeline.register_record_write_callback(writer.write_record)
+    pipeline.register_omit_callback(writer.write_omit)
+    pipeline.process(JsonlReader(config.input_path))
+    writer.close()
+    return pipeline
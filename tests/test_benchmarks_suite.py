@@ -0,0 +1,57 @@
+import hashlib
+import tempfile
+import unittest
+from pathlib import Path
+
+from benchmarks.bench_suite import compare, run_suite
+from benchmarks.corpus import MIX, write_corpus
+
+
+class TestBenchmarkSuite(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp_dir.name)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_corpus_is_deterministic(self):
+        digests = []
+        for name, seed in (('a', 3), ('b', 3), ('c', 4)):
+            summary = write_corpus(self.dir / f'{name}.jsonl', 500, seed)
+            digests.append(hashlib.sha256((self.dir / f'{name}.jsonl').read_bytes()).hexdigest())
+
+        self.assertEqual(digests[0], digests[1])
+        self.assertNotEqual(digests[0], digests[2])
+        self.assertEqual(set(summary['kinds']), set(MIX))
+        self.assertEqual(sum(summary['kinds'].values()), 500)
+
+    def test_compare_flags_regressions_beyond_threshold(self):
+        baseline = {
+            'steps': {'A': {'records_per_second': 1000.0, 'latency_p95_ms': 1.0}, 'B': {'skipped': 'models disabled'}},
+            'end_to_end': {'serial': {'records_per_second': 100.0, 'latency_p95_ms': 10.0}},
+        }
+        results = {
+            'steps': {'A': {'records_per_second': 850.0, 'latency_p95_ms': 1.5}, 'B': {'records_per_second': 1.0}},
+            'end_to_end': {'serial': {'records_per_second': 60.0, 'latency_p95_ms': 9.0}},
+        }
+
+        regressions = compare(results, baseline, threshold=0.2)
+
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(regressions[0].startswith('steps.A.latency_p95_ms'))
+        self.assertTrue(regressions[1].startswith('end_to_end.serial.records_per_second'))
+        self.assertEqual(compare(results, baseline, threshold=0.6), [])
+
+    def test_suite_runs_without_models(self):
+        results = run_suite(200, 0, workers=2, batch_size=16, process_workers=0, with_models=False, selected_modes=['serial', 'batch'])
+
+        self.assertEqual(results['steps']['ToxicityFilter'], {'skipped': 'models disabled'})
+        # The reader skips the records without text
+        self.assertGreater(results['steps']['NormalizeModifier']['records'], 190)
+        self.assertEqual(set(results['end_to_end']), {'serial', 'batch'})
+        serial, batch = results['end_to_end']['serial'], results['end_to_end']['batch']
+        self.assertEqual(serial['records'], results['steps']['NormalizeModifier']['records'])
+        self.assertEqual(serial['omitted'], batch['omitted'])
+        self.assertGreater(serial['records_per_second'], 0)
+        self.assertEqual(compare(results, results, threshold=0.0), [])
@@ -0,0 +1,121 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from pipelib.components.core import Filter, FilterResult, Modifier
+from pipelib.components.core.cache import StepCache
+from pipelib.components.core.pipeline import Pipeline
+from pipelib.components.core.record import Record
+from pipelib.components.core.settings import PipelineConfig
+from pipelib.components.filters import ToxicityFilter
+
+
+class CountingFilter(Filter):
+    cache_config = ('min_char_len',)
+    calls = 0
+
+    def _filter(self, record: Record) -> FilterResult:
+        CountingFilter.calls += 1
+        record.lang = 'en'
+        return FilterResult.omit('too_short') if len(record.cleaned) < self.config.min_char_len else FilterResult.keep()
+
+
+class CountingModifier(Modifier):
+    cache_config = ()
+    calls = 0
+
+    def _modify(self, record: Record) -> None:
+        CountingModifier.calls += 1
+        record.cleaned = record.cleaned.replace('secret', '<REDACTED>')
+        record.anonymized = '<REDACTED>' in record.cleaned
+
+
+class DummyToxicity:
+    calls = 0
+
+    def predict(self, text):
+        DummyToxicity.calls += 1
+        return {'toxicity': len(text) / 40}
+
+
+class TestStepCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp_dir.name)
+        CountingFilter.calls = CountingModifier.calls = DummyToxicity.calls = 0
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _run(self, texts: list[str], batch_size: int = 1, **config) -> tuple[Pipeline, list[Record], list[Record]]:
+        pipeline = Pipeline(PipelineConfig(Path('in.jsonl'), Path('out'), cache_dir=self.dir, debug_info=True, batch_size=batch_size, **config))
+        pipeline.register_step(CountingFilter)
+        pipeline.register_step(CountingModifier)
+        kept, omitted = [], []
+        pipeline.register_record_write_callback(kept.append)
+        pipeline.register_omit_callback(omitted.append)
+        pipeline.process(Record(text, url='https://example.com') for text in texts)
+        return pipeline, kept, omitted
+
+    def test_rerun_reuses_results(self):
+        texts = [f'text {i % 10} with a secret ' + 'x' * (i % 10) for i in range(30)]
+        _, kept, omitted = self._run(texts, workers=1, min_char_len=25)
+        self.assertEqual((CountingFilter.calls, CountingModifier.calls), (10, 6))
+
+        for batch_size in (1, 8):
+            with self.subTest(batch_size=batch_size):
+                CountingFilter.calls = CountingModifier.calls = 0
+                pipeline, cached_kept, cached_omitted = self._run(texts, batch_size, workers=4, min_char_len=25)
+
+                self.assertEqual((CountingFilter.calls, CountingModifier.calls), (0, 0))
+                self.assertEqual(
+                    [(r.cleaned, r.lang, r.anonymized) for r in cached_kept],
+                    [(r.cleaned, r.lang, r.anonymized) for r in kept],
+                )
+                self.assertEqual([r.omit_reason for r in cached_omitted], [r.omit_reason for r in omitted])
+                insights = pipeline.generate_insights()
+                self.assertEqual(insights['steps']['CountingFilter']['cache_hits'], 30)
+                self.assertEqual(insights['steps']['CountingFilter']['cache_hit_rate'], 1.0)
+                self.assertGreater(insights['steps']['CountingModifier']['cache_time_saved_seconds'], 0.0)
+                self.assertEqual(insights['cache']['entries'], 16)
+
+    def test_config_change_misses(self):
+        texts = [f'text {i}' + 'x' * i for i in range(20)]
+        self._run(texts, min_char_len=10)
+        pipeline, _, _ = self._run(texts, min_char_len=12)
+
+        self.assertEqual(CountingFilter.calls, 40)
+        self.assertEqual(pipeline.generate_insights()['steps']['CountingFilter']['cache_misses'], 20)
+
+    def test_threshold_change_reuses_scores(self):
+        texts = [f'text {i} ' + 'x' * i for i in range(20)]
+        runs = []
+        for threshold in (0.5, 0.2):
+            pipeline = Pipeline(PipelineConfig(Path('in.jsonl'), Path('out'), cache_dir=self.dir, toxicity_threshold=threshold))
+            pipeline.register_step(ToxicityFilter)
+            pipeline.steps[0].detoxify_model = DummyToxicity()
+            kept = []
+            pipeline.register_record_write_callback(kept.append)
+            pipeline.process(Record(text, url='https://example.com') for text in texts)
+            runs.append([record.cleaned for record in kept])
+
+        self.assertEqual(DummyToxicity.calls, 20)
+        self.assertEqual(runs, [
+            [text for text in texts if len(text) / 40 <= threshold] for threshold in (0.5, 0.2)
+        ])
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = StepCache(self.dir, max_bytes=2_000)
+        for i in range(40):
+            cache.put('step', f'text {i}', {'cleaned': 'x' * 20}, 0.1)
+            self.assertIsNotNone(cache.get('step', 'text 0'))
+        stats = cache.stats()
+        cache.close()
+
+        self.assertLessEqual(stats['size_bytes'], 2_000)
+        self.assertGreater(stats['evictions'], 0)
+        cache = StepCache(self.dir, max_bytes=2_000)
+        self.assertEqual(cache.get('step', 'text 0'), ({'cleaned': 'x' * 20}, 0.1))
+        self.assertIsNone(cache.get('step', 'text 1'))
+        self.assertIsNotNone(cache.get('step', 'text 39'))
+        cache.close()
@@ -0,0 +1,64 @@
+import json
+import unittest
+from pathlib import Path
+
+from pipelib.components.core.pipeline import Pipeline
+from pipelib.components.core.record import Record
+from pipelib.components.core.settings import PipelineConfig
+from pipelib.components.core.step import Step
+from pipelib.components.filters import DedupFilter
+
+
+class Leaky(Step):
+    def __init__(self, config: PipelineConfig):
+        super().__init__(config)
+        self.kept = []
+
+    def process(self, record: Record) -> Record:
+        self.kept.append(bytearray(10_000))
+        return record
+
+    def state_sizes(self) -> dict[str, int]:
+        return {'kept': len(self.kept)}
+
+
+class TestMemory(unittest.TestCase):
+    def _run(self, **config) -> Pipeline:
+        pipeline = Pipeline(PipelineConfig(Path('in.jsonl'), Path('out'), debug_info=True, workers=1, **config))
+        pipeline.register_step(DedupFilter)
+        pipeline.register_step(Leaky)
+        pipeline.process([Record(f'text {i % 50}', url=None) for i in range(100)])
+        return pipeline
+
+    def test_samples_and_structures(self):
+        with self.assertLogs('pipelib.progress', level='INFO') as logs:
+            pipeline = self._run(memory_interval=1e-9)
+        memory = pipeline.generate_insights()['memory']
+        event = json.loads(logs.records[-1].getMessage())
+
+        structures = memory['structures']
+        self.assertEqual(sorted(structures), ['DedupFilter.dedup_hashes', 'DedupFilter.dedup_hashes_bytes', 'Leaky.kept'])
+        self.assertEqual((structures['DedupFilter.dedup_hashes'], structures['Leaky.kept']), (50, 50))
+        self.assertGreater(structures['DedupFilter.dedup_hashes_bytes'], 50 * 40)
+        self.assertEqual(event['memory']['structures'], structures)
+        self.assertGreater(len(memory['samples']), 100)
+        self.assertEqual(memory['samples'][0]['records'], 0)
+        self.assertGreaterEqual(memory['rss_bytes']['peak'], memory['rss_bytes']['first'])
+        self.assertIsNotNone(memory['rss_growth_bytes_per_1k_records'])
+        self.assertNotIn('trace', memory)
+
+    def test_tracemalloc_window(self):
+        memory = self._run(memory_interval=0, memory_trace=20).generate_insights()['memory']
+        trace = memory['trace']
+
+        self.assertEqual((trace['first_record'], trace['records']), (20, 20))
+        # Records 20 to 40 are new texts, each keeps 10kB in Leaky
+        leaky = trace['steps']['Leaky']
+        self.assertEqual(leaky['calls'], 20)
+        self.assertGreaterEqual(leaky['net_bytes'], 20 * 10_000)
+        self.assertIn('test_core_memory.py', trace['top_lines'][0]['line'])
+        self.assertEqual(memory['samples'], [])
+
+    def test_disabled(self):
+        pipeline = self._run(memory_interval=0)
+        self.assertNotIn('memory', pipeline.generate_insights())
@@ -0,0 +1,65 @@
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from pipelib.components.core.models import LazyModel, ModelRegistry, models, required_models, unresolved_models
+
+
+class TestModelRegistry(unittest.TestCase):
+    def test_loads_each_model_once(self):
+        registry = ModelRegistry()
+        calls = []
+
+        def loader():
+            calls.append(threading.current_thread().name)
+            time.sleep(0.05)
+            return object()
+
+        registry.register('slow', loader)
+        registry.warm_up(['slow'])
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            loaded = list(executor.map(lambda _: registry.get('slow'), range(8)))
+
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(calls[0].startswith('model-loader'))
+        self.assertTrue(all(model is loaded[0] for model in loaded))
+        self.assertGreater(registry.load_times()['slow'], 0.0)
+
+    def test_independent_models_load_concurrently(self):
+        registry = ModelRegistry()
+        for name in ('a', 'b', 'c'):
+            registry.register(name, lambda: time.sleep(0.2))
+
+        start = time.perf_counter()
+        registry.warm_up(['a', 'b', 'c'])
+        registry.wait()
+
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertEqual(set(registry.load_times()), {'a', 'b', 'c'})
+
+    def test_load_errors_are_raised_on_access(self):
+        registry = ModelRegistry()
+        registry.register('broken', lambda: 1 / 0)
+
+        with self.assertRaises(ZeroDivisionError):
+            registry.get('broken')
+        with self.assertRaises(KeyError):
+            registry.get('unknown')
+
+    def test_lazy_model_attribute(self):
+        models.register('test_lazy_model', lambda: 'loaded')
+
+        class Step:
+            model = LazyModel('test_lazy_model')
+
+        class SubStep(Step):
+            other = LazyModel('test_lazy_model')
+
+        step, stubbed = Step(), Step()
+        stubbed.model = 'stub'
+        self.assertEqual(step.model, 'loaded')
+        self.assertEqual(stubbed.model, 'stub')
+        self.assertEqual(required_models(SubStep), ['test_lazy_model'])
+        self.assertEqual(unresolved_models(SubStep()), ['test_lazy_model'])
+        self.assertEqual(unresolved_models(stubbed), [])
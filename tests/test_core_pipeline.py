@@ -0,0 +1,142 @@
+import os
+import unittest
+from pathlib import Path
+
+from pipelib.components.core import Filter, FilterResult
+from pipelib.components.core import prefork
+from pipelib.components.core.pipeline import Pipeline
+from pipelib.components.core.record import Record
+from pipelib.components.core.settings import PipelineConfig
+from pipelib.components.core.step import Step
+from pipelib.utils import batched
+
+
+class Tokenize(Step):
+    produces = ('tokens',)
+
+    def process(self, record: Record) -> Record:
+        record.tokens = record.cleaned.split()
+        return record
+
+
+class ShortFilter(Filter):
+    consumes = ('tokens',)
+
+    def _filter(self, record: Record) -> FilterResult:
+        return FilterResult.omit('too_short') if len(record.tokens) < 3 else FilterResult.keep()
+
+
+class SeenTokens(Step):
+    def __init__(self, config: PipelineConfig):
+        super().__init__(config)
+        self.seen = []
+
+    def process(self, record: Record) -> Record:
+        self.seen.append(record.tokens)
+        return record
+
+
+class Upper(Step):
+    def process(self, record: Record) -> Record:
+        record.cleaned = f'{record.cleaned.upper()}:{os.getpid()}'
+        return record
+
+
+class SeenFilter(Filter):
+    stateful = True
+
+    def __init__(self, config: PipelineConfig):
+        super().__init__(config)
+        self.seen = set()
+        self.pids = set()
+
+    def _filter(self, record: Record) -> FilterResult:
+        self.pids.add(os.getpid())
+        text = record.cleaned.split(':')[0]
+        if text in self.seen:
+            return FilterResult.omit('duplicate')
+        self.seen.add(text)
+        return FilterResult.keep()
+
+
+def attached_rings(_) -> list[str]:
+    return list(prefork._rings)
+
+
+class TestPipeline(unittest.TestCase):
+    def _run(self, batch_size: int, workers: int) -> tuple[Pipeline, list[Record], list[Record]]:
+        config = PipelineConfig(Path('in.jsonl'), Path('out'), workers=workers, batch_size=batch_size)
+        pipeline = Pipeline(config)
+        for step in (Tokenize, ShortFilter, SeenTokens):
+            pipeline.register_step(step)
+        kept, omitted = [], []
+        pipeline.register_record_write_callback(kept.append)
+        pipeline.register_omit_callback(omitted.append)
+        pipeline.process(Record(f'word ' * (i % 5), url='https://example.com') for i in range(40))
+        return pipeline, kept, omitted
+
+    def test_tokens_released_after_last_use(self):
+        for batch_size, workers in ((1, 1), (8, 1), (1, 4), (8, 4)):
+            with self.subTest(batch_size=batch_size, workers=workers):
+                pipeline, kept, omitted = self._run(batch_size, workers)
+
+                self.assertEqual(pipeline.release_after, {1: ('tokens',)})
+                self.assertEqual((len(kept), len(omitted)), (16, 24))
+                self.assertTrue(all(record.tokens is None for record in kept + omitted))
+                self.assertEqual(pipeline.steps[2].seen, [None] * 16)
+
+    def test_stages(self):
+        pipeline = Pipeline(PipelineConfig(Path('in.jsonl'), Path('out')))
+        for step in (Tokenize, ShortFilter, SeenFilter, Upper, SeenFilter, SeenFilter, Upper):
+            pipeline.register_step(step)
+
+        self.assertEqual(pipeline._stages(), [(0, 2), (2, 3), (3, 4), (4, 5), (5, 6), (6, 7)])
+
+    def test_prefork_workers(self):
+        for transport in ('shared', 'pickle'):
+            with self.subTest(transport=transport):
+                self._check_prefork_workers(transport)
+
+    def test_prefork_workers_close_unlinked_rings(self):
+        pipeline = Pipeline(PipelineConfig(Path('in.jsonl'), Path('out')))
+        pipeline.register_step(Upper)
+        with prefork.PreforkPool(pipeline, 2) as pool:
+            for _ in range(4):
+                records = [Record(f'word {i}', url='') for i in range(256)]
+                self.assertEqual(sum(map(len, pool.run_steps(0, 1, batched(records, 64)))), 256)
+            attached = pool._pool.map(attached_rings, range(8), chunksize=1)
+
+        self.assertEqual(pool.shared_batches, 16)
+        self.assertTrue(all(len(names) <= 1 for names in attached))
+
+    def _check_prefork_workers(self, transport: str):
+        config = PipelineConfig(Path('in.jsonl'), Path('out'), process_workers=2, debug_info=True, transport=transport)
+        pipeline = Pipeline(config)
+        for step in (Tokenize, ShortFilter, SeenFilter, Upper):
+            pipeline.register_step(step)
+        kept, omitted = [], []
+        pipeline.register_record_write_callback(kept.append)
+        pipeline.register_omit_callback(omitted.append)
+        records = [Record(f'word {i % 7} ' * (i % 5), url='https://example.com') for i in range(300)]
+        pipeline.process(records)
+
+        self.assertEqual(len(kept) + len(omitted), 300)
+        self.assertEqual([record.id for record in kept], sorted(record.id for record in kept))
+        self.assertEqual(sorted({record.cleaned.split(':')[0] for record in kept}), sorted({
+            (f'word {i % 7} ' * (i % 5)).upper() for i in range(300) if i % 5 >= 2
+        }))
+        worker_pids = {int(record.cleaned.split(':')[1]) for record in kept}
+        self.assertNotIn(os.getpid(), worker_pids)
+        self.assertEqual(pipeline.steps[2].pids, {os.getpid()})
+        self.assertEqual(
+            {reason: count for reason, count in pipeline.omit_reasons.items()},
+            {'too_short': 120, 'duplicate': 180 - len(kept)},
+        )
+        insights = pipeline.generate_insights()
+        self.assertEqual(insights['steps']['Tokenize']['number_of_calls'], 300)
+        self.assertEqual(insights['steps']['Upper']['number_of_calls'], len(kept))
+        self.assertEqual(insights['workers']['mode'], 'processes')
+        self.assertEqual(len(insights['workers']['worker_memory_bytes']), 2)
+        batches = 'shared_batches' if transport == 'shared' else 'pickled_batches'
+        self.assertEqual(insights['workers'][batches], 10)
+        self.assertTrue(all(record.url == 'https://example.com' for record in kept + omitted))
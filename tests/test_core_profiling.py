@@ -0,0 +1,86 @@
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+from pipelib.components.core import pipeline as pipeline_module
+from pipelib.components.core.pipeline import Pipeline
+from pipelib.components.core.profiling import Profiler
+from pipelib.components.core.record import Record
+from pipelib.components.core.settings import PipelineConfig
+from pipelib.components.core.step import Step
+
+
+class Count(Step):
+    def process(self, record: Record) -> Record:
+        record.char_count = len(record.cleaned)
+        return record
+
+
+class Slow(Step):
+    # Seconds on the clock of the step timings, advanced by the length of each record
+    clock = 0.0
+
+    def process(self, record: Record) -> Record:
+        Slow.clock += 1 + record.char_count / 100
+        time.sleep(0.005)
+        return record
+
+
+class TestProfiling(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp_dir.name)
+        self.records = [Record('x' * (10 + (i * 37) % 200), url=None) for i in range(60)]
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _run(self, **config) -> Pipeline:
+        pipeline = Pipeline(PipelineConfig(self.dir / 'in.jsonl', self.dir, debug_info=True, profile_top=5, **config))
+        pipeline.register_step(Count)
+        pipeline.register_step(Slow)
+        pipeline.process(self.records)
+        return pipeline
+
+    def test_slowest_calls_and_latency_by_char_count(self):
+        clock = SimpleNamespace(time=lambda: Slow.clock, perf_counter=time.perf_counter)
+        with mock.patch.object(pipeline_module, 'time', clock):
+            profile = self._run(workers=1).generate_insights()['profile']
+        longest = sorted((len(record.cleaned) for record in self.records), reverse=True)[:5]
+
+        self.assertEqual([entry['step'] for entry in profile['slowest']], ['Slow'] * 5)
+        self.assertEqual([entry['char_count'] for entry in profile['slowest']], longest)
+        self.assertAlmostEqual(profile['slowest'][0]['elapsed_seconds'], 1 + longest[0] / 100)
+        slow = profile['steps']['Slow']
+        self.assertEqual(slow['records'], 60)
+        self.assertAlmostEqual(slow['latency_char_count_correlation'], 1.0)
+        self.assertAlmostEqual(slow['seconds_per_char'], 0.01)
+        self.assertAlmostEqual(slow['base_seconds'], 1.0)
+        self.assertEqual(sum(bucket['records'] for bucket in slow['latency_by_char_count']), 60)
+        self.assertNotIn('trace', profile)
+
+    def test_traced_stacks(self):
+        pipeline = self._run(batch_size=4, profile_step='Slow', profile_records=20)
+        profile = pipeline.generate_insights()['profile']
+        path = self.dir / 'profile.folded'
+        pipeline.profiler.write_folded(path)
+        stacks = path.read_text(encoding='utf-8').splitlines()
+
+        self.assertEqual(profile['trace']['step'], 'Slow')
+        # Worker threads can start a few more batches before the window closes
+        self.assertGreaterEqual(profile['trace']['records'], 20)
+        self.assertLess(profile['trace']['records'], 60)
+        weights = {line.rpartition(' ')[0]: int(line.rpartition(' ')[2]) for line in stacks}
+        sleeping = [stack for stack in weights if stack.endswith('time.sleep')]
+        self.assertTrue(all(stack.split(';')[0] == 'Slow' for stack in weights))
+        self.assertTrue(sleeping and all('test_core_profiling:Slow.process' in stack for stack in sleeping))
+        # 20 records or more sleep 5ms each
+        self.assertGreater(sum(weights[stack] for stack in sleeping), 90_000)
+        self.assertFalse(any('Profiler.' in stack or 'setprofile' in stack for stack in weights))
+
+    def test_unknown_step(self):
+        with self.assertRaises(ValueError):
+            Profiler(['Count', 'Slow'], top=5, trace_step='Missing')
@@ -0,0 +1,61 @@
+import json
+import unittest
+import urllib.request
+from pathlib import Path
+
+from pipelib.components.core import Filter, FilterResult
+from pipelib.components.core.pipeline import Pipeline
+from pipelib.components.core.progress import MetricsServer, render_openmetrics
+from pipelib.components.core.record import Record
+from pipelib.components.core.settings import PipelineConfig
+
+
+class ShortFilter(Filter):
+    def _filter(self, record: Record) -> FilterResult:
+        return FilterResult.omit('too_short') if len(record.cleaned.split()) < 3 else FilterResult.keep()
+
+
+class TestProgress(unittest.TestCase):
+    def _run(self, **config) -> Pipeline:
+        pipeline = Pipeline(PipelineConfig(Path('in.jsonl'), Path('out'), debug_info=True, **config))
+        pipeline.register_step(ShortFilter)
+        pipeline.register_queue_callback('writer', lambda: 7)
+        pipeline.process([Record('a b c d' if i % 4 else 'a b', url=None) for i in range(100)])
+        return pipeline
+
+    def test_done_event(self):
+        with self.assertLogs('pipelib.progress', level='INFO') as logs:
+            pipeline = self._run(workers=2)
+        event = json.loads(logs.records[-1].getMessage())
+
+        self.assertEqual(event['event'], 'done')
+        self.assertEqual((event['records_in'], event['records_out']), (100, 100))
+        self.assertEqual((event['records_kept'], event['records_omitted']), (75, 25))
+        self.assertEqual(event['omit_reasons'], {'too_short': 25})
+        self.assertEqual(event['queues'], {'pipeline': 0, 'writer': 7})
+        self.assertEqual(event['steps']['ShortFilter']['calls'], 100)
+        self.assertEqual(event['steps']['ShortFilter']['omits'], 25)
+
+    def test_metrics_endpoint(self):
+        pipeline = self._run()
+        server = MetricsServer(pipeline.progress, port=0)
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{server.port}/metrics') as response:
+                content_type = response.headers['Content-Type']
+                body = response.read().decode('utf-8')
+        finally:
+            server.close()
+
+        self.assertTrue(content_type.startswith('application/openmetrics-text'))
+        lines = body.splitlines()
+        self.assertEqual(lines[-1], '# EOF')
+        self.assertIn('pipelib_records_in_total 100', lines)
+        self.assertIn('pipelib_records_out_total{status="omitted"} 25', lines)
+        self.assertIn('pipelib_omitted_total{reason="too_short"} 25', lines)
+        self.assertIn('pipelib_step_calls_total{step="ShortFilter"} 100', lines)
+        self.assertIn('pipelib_queue_depth{queue="writer"} 7', lines)
+        self.assertIn('# TYPE pipelib_step_latency_seconds gauge', lines)
+
+    def test_label_values_are_escaped(self):
+        text = render_openmetrics({'omit_reasons': {'say "hi"\\': 1}})
+        self.assertIn('pipelib_omitted_total{reason="say \\"hi\\"\\\\"} 1', text.splitlines())
@@ -0,0 +1,63 @@
+import unittest
+
+import numpy as np
+
+from pipelib.components.core.record import Record
+from pipelib.components.core.transport import BOOL_FIELDS, FLOAT_FIELDS, INT_FIELDS, TEXT_FIELDS, SharedRecordRing
+
+
+def make_record(i: int) -> Record:
+    record = Record(f'Café “{i}” \ud800 ' * (i + 1), url=f'https://example.com/{i}')
+    record.source_offset, record.source_length = 100 * i, 40
+    record.char_count = np.int64(10 * i)
+    record.tokens = ['caf', 'é'] * i
+    return record
+
+
+class TestSharedRecordRing(unittest.TestCase):
+    def setUp(self):
+        self.ring = SharedRecordRing(slots=2, capacity=4, slab_bytes=4096)
+
+    def tearDown(self):
+        self.ring.close()
+        self.ring.unlink()
+
+    def test_fields_cover_the_record(self):
+        fields = TEXT_FIELDS + INT_FIELDS + FLOAT_FIELDS + BOOL_FIELDS
+        self.assertEqual(sorted(fields), sorted(name for name in Record.__slots__ if name != '_source'))
+
+    def test_round_trip_through_a_worker_view(self):
+        records = [make_record(i) for i in range(3)]
+        input_end = self.ring.write(1, records)
+        worker = SharedRecordRing.attach(self.ring.handle)
+        try:
+            copies, texts = worker.read(1, len(records))
+            for record, copy in zip(records, copies):
+                self.assertEqual(copy.__getstate__(), record.__getstate__())
+            copies[0].omit, copies[0].omit_reason, copies[0].tokens = True, 'too_short', None
+            copies[2].cleaned, copies[2].lang, copies[2].lang_score = 'cleaned', 'en', 0.5
+            self.assertIsNotNone(worker.write(1, copies, input_end, previous=texts))
+        finally:
+            worker.close()
+
+        url = records[1].url
+        self.ring.update(1, records)
+
+        self.assertEqual([record.omit for record in records], [True, False, False])
+        self.assertEqual((records[0].omit_reason, records[0].tokens), ('too_short', None))
+        self.assertEqual((records[2].cleaned, records[2].lang, records[2].lang_score), ('cleaned', 'en', 0.5))
+        # Unchanged texts are not decoded again
+        self.assertIs(records[1].url, url)
+        self.assertEqual(records[1].tokens, ['caf', 'é'])
+        self.assertEqual(records[1].char_count, 10)
+
+    def test_does_not_write_what_does_not_fit(self):
+        records = [make_record(i) for i in range(5)]
+        self.assertIsNone(self.ring.write(0, records))
+        self.assertIsNone(self.ring.write(0, [Record('x' * 5000, url='')]))
+        record = make_record(0)
+        record.toxicity = 1
+        self.assertIsNone(self.ring.write(0, [record]))
+        record.toxicity = None
+        record.tokens = ['a\x1fb']
+        self.assertIsNone(self.ring.write(0, [record]))
@@ -0,0 +1,163 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from collections import Counter
+from pathlib import Path
+from unittest import mock
+
+from pipelib.components.core.pipeline import Pipeline
+from pipelib.components.core.settings import PipelineConfig
+from pipelib.components.filters import DedupFilter, PreliminaryFilter
+from pipelib.components.filters.dedup import hash_fingerprint
+from pipelib.components.modifiers import AttributeEvaluationStep, NormalizeModifier
+from pipelib.distributed import AUTHKEY_ENV, Coordinator, DedupClient, LeaseClient, authkey, run_worker, spawn_workers
+from pipelib.io import JsonlReader, RecordWriter
+from tests.fixtures import WORDS, rotated_text, write_corpus
+
+
+def make_pipeline(config: PipelineConfig) -> Pipeline:
+    pipeline = Pipeline(config)
+    for step in (NormalizeModifier, AttributeEvaluationStep, PreliminaryFilter, DedupFilter):
+        pipeline.register_step(step)
+    return pipeline
+
+
+def process(pipeline: Pipeline, config: PipelineConfig, records: JsonlReader) -> None:
+    writer = RecordWriter(config.output_dir, shard_size=50)
+    pipeline.register_record_write_callback(writer.write_record)
+    pipeline.register_omit_callback(writer.write_omit)
+    pipeline.process(records)
+    writer.close()
+
+
+class TestDistributed(unittest.TestCase):
+    def setUp(self):
+        # Every test starts without a secret, the coordinators generate their own
+        environ = mock.patch.dict(os.environ)
+        environ.start()
+        self.addCleanup(environ.stop)
+        os.environ.pop(AUTHKEY_ENV, None)
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp_dir.name)
+        self.input_path = self.dir / 'input.jsonl'
+        words = WORDS + tuple('it from the river bank'.split())
+        texts = []
+        for i in range(600):
+            # Every text comes back, in another case or spacing, among the later records
+            n = i % 150
+            text = rotated_text(n, 12 + n % 30, words) + f' number {n}'
+            texts.append(text.upper() if i % 3 == 1 else text.replace(' ', '  ') if i % 3 == 2 else text)
+        write_corpus(self.input_path, texts)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _config(self, output: str, **kwargs) -> PipelineConfig:
+        return PipelineConfig(
+            self.input_path, self.dir / output, workers=2, debug_info=False, progress_interval=3600.0,
+            memory_interval=0.0, task_bytes=8_000, dedup_partitions=2, **kwargs,
+        )
+
+    def _kept(self, manifest: dict, output_dir: Path) -> list[str]:
+        fingerprints = []
+        for task in manifest['tasks']:
+            with open(output_dir / task['directory'] / 'cleaned.jsonl', encoding='utf-8') as handle:
+                fingerprints.extend(hash_fingerprint(json.loads(line)['cleaned']) for line in handle)
+        return fingerprints
+
+    def _single_run(self) -> tuple[Pipeline, set[str]]:
+        config = self._config('single')
+        pipeline = make_pipeline(config)
+        process(pipeline, config, JsonlReader(self.input_path))
+        with open(config.output_dir / 'cleaned.jsonl', encoding='utf-8') as handle:
+            return pipeline, {hash_fingerprint(json.loads(line)['cleaned']) for line in handle}
+
+    def test_workers_match_a_single_run(self):
+        single, expected = self._single_run()
+        config = self._config('distributed')
+        coordinator = Coordinator(config)
+        address = coordinator.start('127.0.0.1:0')
+        workers = spawn_workers(3, address, config, make_pipeline, process)
+
+        manifest = coordinator.serve()
+        for worker in workers:
+            worker.join(timeout=30)
+
+        self.assertGreater(len(coordinator.tasks), 10)
+        self.assertTrue(all(task['state'] == 'done' for task in manifest['tasks']))
+        self.assertEqual(manifest['records'], 600)
+        self.assertEqual(manifest['kept'], 600 - single.omit_reasons.total())
+        self.assertEqual(Counter(manifest['omit_reasons']), single.omit_reasons)
+        kept = self._kept(manifest, config.output_dir)
+        self.assertEqual(len(kept), len(expected))
+        self.assertEqual(set(kept), expected)
+        self.assertEqual(sum(manifest['dedup']['fingerprints']), len(expected))
+        self.assertEqual(json.loads((config.output_dir / 'distributed.json').read_text())['kept'], manifest['kept'])
+
+    def test_record_ids_are_unique_across_tasks(self):
+        config = self._config('ids')
+        coordinator = Coordinator(config)
+        address = coordinator.start('127.0.0.1:0')
+        workers = spawn_workers(2, address, config, make_pipeline, process)
+
+        manifest = coordinator.serve()
+        for worker in workers:
+            worker.join(timeout=30)
+
+        ids = []
+        for task in manifest['tasks']:
+            directory = config.output_dir / task['directory']
+            for name in ('cleaned.jsonl', 'omit_data.jsonl'):
+                with open(directory / name, encoding='utf-8') as handle:
+                    ids.extend(json.loads(line)['id'] for line in handle)
+        self.assertEqual(len(ids), 600)
+        self.assertEqual(len(set(ids)), 600)
+        starts = {task['start'] for task in manifest['tasks']}
+        self.assertEqual(len(starts & {record_id - 1 for record_id in ids}), len(manifest['tasks']))
+
+    def test_expired_lease_is_retried_with_its_claims(self):
+        _, expected = self._single_run()
+        config = self._config('retried', lease_seconds=1.0)
+        coordinator = Coordinator(config)
+        address = coordinator.start('127.0.0.1:0')
+
+        # A worker leases the first task, claims the fingerprints of its records and disappears
+        dead = LeaseClient(address)
+        shared, ports, _ = dead.request('hello', 'dead')
+        _, task_id, start, end, attempt, _ = dead.request('lease', 'dead')
+        normalize = NormalizeModifier(config)
+        records = [normalize.process(record) for record in JsonlReader(self.input_path, byte_range=(start, end))]
+        claims = [(hash_fingerprint(record.cleaned), record.source_offset) for record in records]
+        self.assertTrue(all(DedupClient(tuple(f'127.0.0.1:{port}' for port in ports)).claim(claims)))
+        dead.close()
+        thread = threading.Thread(target=run_worker, args=(address, config, make_pipeline, process))
+        thread.start()
+
+        manifest = coordinator.serve()
+        thread.join(timeout=30)
+
+        self.assertEqual(manifest['tasks'][task_id]['attempts'], 2)
+        self.assertEqual(manifest['retried_tasks'], 1)
+        self.assertEqual(manifest['records'], 600)
+        self.assertEqual(set(self._kept(manifest, config.output_dir)), expected)
+        self.assertEqual(len(self._kept(manifest, config.output_dir)), len(expected))
+        self.assertEqual([path.name for path in (config.output_dir / 'tasks').iterdir() if path.name.startswith('task_00000')], ['task_00000_attempt2'])
+
+    def test_rejects_an_input_limit(self):
+        with self.assertRaises(ValueError):
+            Coordinator(self._config('limited', input_limit=10))
+
+    def test_needs_a_secret_beyond_loopback(self):
+        coordinator = Coordinator(self._config('exposed'))
+        with self.assertRaises(ValueError):
+            authkey()
+        with self.assertRaises(ValueError):
+            coordinator.start('0.0.0.0:0')
+
+        coordinator.start('127.0.0.1:0')
+        coordinator.close()
+
+        self.assertEqual(len(authkey()), 64)
+
@@ -0,0 +1,69 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from pipelib.components.core.pipeline import Pipeline
+from pipelib.components.core.settings import PipelineConfig
+from pipelib.components.filters import PreliminaryFilter
+from pipelib.components.modifiers import AttributeEvaluationStep
+from pipelib.estimate import estimate, estimate_config, format_estimate
+from pipelib.io.reader import JsonlReader
+from tests.fixtures import rotated_text
+
+
+class TestEstimate(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp_dir.name)
+        self.input_path = self.dir / 'input.jsonl'
+        with open(self.input_path, 'w', encoding='utf-8') as handle:
+            for i in range(2000):
+                # Short records are too short, and long ones come in runs, so sampling by bytes is length-biased
+                text = rotated_text(i, 3 + (i // 50 % 4) * 30)
+                handle.write(json.dumps({'text': text, 'url': f'https://example.com/{i}'}) + '\n')
+                if i % 100 == 0:
+                    handle.write('{"text": "broken\n')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _pipeline(self, config: PipelineConfig) -> Pipeline:
+        pipeline = Pipeline(config)
+        pipeline.register_step(AttributeEvaluationStep)
+        pipeline.register_step(PreliminaryFilter)
+        return pipeline
+
+    def test_estimate_covers_a_full_run(self):
+        config = PipelineConfig(self.input_path, self.dir / 'out', workers=4, batch_size=8)
+        full = self._pipeline(config)
+        kept = []
+        full.register_record_write_callback(kept.append)
+        full.process(JsonlReader(self.input_path))
+        output_bytes = sum(len(record.to_successful_jsonl().encode('utf-8')) for record in kept)
+
+        sample_config = estimate_config(config)
+        insights = estimate(self._pipeline(sample_config), JsonlReader(self.input_path), samples=400)
+
+        self.assertEqual((sample_config.workers, sample_config.batch_size, sample_config.debug_info), (1, 1, True))
+        self.assertEqual(insights['samples'], 400)
+        truths = {
+            'records': 2000,
+            'kept': len(kept),
+            'output_bytes': output_bytes,
+        }
+        for name, truth in truths.items():
+            with self.subTest(name=name):
+                self.assertLessEqual(insights[name]['low'], truth)
+                self.assertGreaterEqual(insights[name]['high'], truth)
+        too_short = insights['omit_reasons']['too_short']
+        self.assertLessEqual(too_short['low'], full.omit_reasons['too_short'])
+        self.assertGreaterEqual(too_short['high'], full.omit_reasons['too_short'])
+        retention = insights['retention_rate']
+        self.assertLessEqual(retention['low'], len(kept) / 2000)
+        self.assertGreaterEqual(retention['high'], len(kept) / 2000)
+        calls = insights['steps']['AttributeEvaluationStep']['number_of_calls']
+        self.assertLessEqual(calls['low'], 2000)
+        self.assertGreaterEqual(calls['high'], 2000)
+        self.assertGreater(insights['total_time_seconds']['estimate'], 0)
+        self.assertIn('retention:', format_estimate(insights))
@@ -44,3 +44,31 @@ class TestCodeSnippetFilter(unittest.TestCase):
         record = code_snippet.process(record)
         self.assertTrue(record.omit)
         self.assertEqual(record.omit_reason, "code_snippet")
+
+    def test_batch_filter_matches_filter(self):
+        texts = [
+            "def greet(name):\n    return f\"Hello {name}\"",
+            "import os\nimport sys\nx = 1\ny = 2\n",
+            "The weather was lovely, so we walked to the park and had a picnic by the lake.",
+            "if (a) { b(); }\nwhile (c) { d[0] = e; }\n",
+            "public static void main ( String [ ] args ) ;",
+            "   \n\t\n",
+            "{}[]();=<>",
+        ]
+        pipeline_config = PipelineConfig(input_path=Path(''), output_dir=Path(''))
+        code_snippet = CodeSnippetFilter(pipeline_config)
+        records = [Record(text, url="https://example.com") for text in texts]
+        for record in records[::2]:
+            AttributeEvaluationStep(pipeline_config).process(record)
+
+        self.assertEqual(code_snippet._batch_filter(records), [code_snippet._filter(record) for record in records])
+
+    def test_strong_code_patterns(self):
+        code_snippet = CodeSnippetFilter(PipelineConfig(input_path=Path(''), output_dir=Path('')))
+
+        self.assertTrue(code_snippet._has_strong_code_patterns("handler = function onClick(event) {"))
+        self.assertTrue(code_snippet._has_strong_code_patterns("a.b() and c.d() then e.f()"))
+        self.assertFalse(code_snippet._has_strong_code_patterns("a.b() and c.d()"))
+        self.assertTrue(code_snippet._has_strong_code_patterns("a = 1\nb = 2\nc = 'x'\nd = [3]"))
+        # "a =" swallows the next line, as ASSIGNMENT_PATTERN.findall does, leaving three assignments
+        self.assertFalse(code_snippet._has_strong_code_patterns("a =\nb = 1\nc = 2\nd = 3"))
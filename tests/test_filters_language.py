@@ -19,6 +19,18 @@ class TestLanguageFilter(unittest.TestCase):
         self.assertFalse(record.omit)
         filter_step.lang_detect_model.detect.assert_not_called()
 
+    def test_detect_without_requiring(self):
+        config = PipelineConfig(input_path=Path(''), output_dir=Path(''), require_english=False, detect_language=True)
+        filter_step = LanguageFilter(config)
+        filter_step.lang_detect_model = mock.Mock()
+        filter_step.lang_detect_model.detect.return_value = [{'lang': 'es', 'score': 0.9}]
+
+        record = Record("hola mundo", url="https://example.com")
+        record = filter_step.process(record)
+
+        self.assertFalse(record.omit)
+        self.assertEqual((record.lang, record.lang_score), ('es', 0.9))
+
     def test_omit_non_english(self):
         config = PipelineConfig(input_path=Path(''), output_dir=Path(''), require_english=True)
         filter_step = LanguageFilter(config)
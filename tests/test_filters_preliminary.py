@@ -71,3 +71,21 @@ class TestPreliminaryFilter(unittest.TestCase):
         )
         record = self.filter.process(record)
         self.assertFalse(record.omit)
+
+    def test_batch_filter_matches_filter(self):
+        records = [
+            self._make_record("abcd", char_count=4),
+            self._make_record("a" * 21, char_count=21),
+            self._make_record("valid text", ascii_ratio=0.5, symbol_ratio=0.3),
+            self._make_record("valid text", symbol_ratio=0.3),
+            self._make_record("aaaaaaaaaa", char_count=10),
+            self._make_record("This is acceptable text.", char_count=15),
+        ]
+        expected = [self.filter._filter(record) for record in records]
+
+        self.filter.batch_process(records)
+
+        self.assertEqual([record.omit_reason for record in records], [result.reason for result in expected])
+        self.assertEqual([record.omit_reason for record in records][:5], [
+            "too_short", "too_long", "non_ascii_heavy", "symbol_heavy", "long_repeat",
+        ])
@@ -0,0 +1,61 @@
+import gzip
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from pipelib.io.compression import BackgroundCompressedWriter, CompressionStats, detect_codec, open_output, zstandard
+from pipelib.io.reader import JsonlReader
+
+
+class TestCompression(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp_dir.name)
+        self.lines = [json.dumps({'text': f'record {i} ' + 'x' * (i % 40), 'url': f'https://example.com/{i}'}) for i in range(3000)]
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _write(self, codec: str, stats: CompressionStats) -> Path:
+        handle = open_output(self.dir / 'out.jsonl', codec, stats)
+        for line in self.lines:
+            handle.write(line)
+            handle.write('\n')
+        handle.close()
+        return self.dir / ('out.jsonl' + {'none': '', 'gzip': '.gz', 'zstd': '.zst'}[codec])
+
+    def _roundtrip(self, codec: str):
+        stats = CompressionStats()
+        path = self._write(codec, stats)
+
+        self.assertEqual(detect_codec(path), codec)
+        reader = JsonlReader(path, workers=2, range_size=1024)
+        self.assertEqual([record.url for record in reader], [json.loads(line)['url'] for line in self.lines])
+        self.assertEqual(reader.progress(), 1.0)
+        self.assertEqual(stats.bytes_in, sum(len(line) + 1 for line in self.lines))
+        self.assertGreater(stats.bytes_in, stats.bytes_out)
+
+    def test_gzip_roundtrip(self):
+        self._roundtrip('gzip')
+        path = self.dir / 'out.jsonl.gz'
+        self.assertEqual(gzip.decompress(path.read_bytes()).decode('utf-8').splitlines(), self.lines)
+
+    @unittest.skipIf(zstandard is None, "zstandard is not installed")
+    def test_zstd_roundtrip(self):
+        self._roundtrip('zstd')
+
+    def test_uncompressed_output(self):
+        path = self._write('none', CompressionStats())
+        self.assertEqual(detect_codec(path), 'none')
+        self.assertEqual(path.read_text(encoding='utf-8').splitlines(), self.lines)
+
+    def test_close_releases_the_thread_after_an_error(self):
+        writer = BackgroundCompressedWriter(self.dir / 'out.jsonl.gz', 'gzip')
+        writer._error = OSError('disk full')
+        writer.write('line\n')
+
+        with self.assertRaises(OSError):
+            writer.close()
+        self.assertFalse(writer._thread.is_alive())
+        self.assertTrue(writer._handle.closed)
@@ -0,0 +1,59 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from pipelib.components.core.record import Record
+from pipelib.io.parquet import COLUMNS, ParquetShardWriter, pq
+from pipelib.io.writer import RecordWriter
+
+
+@unittest.skipIf(pq is None, 'pyarrow is not installed')
+class TestParquetOutput(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.output_dir = Path(self.tmp_dir.name)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _record(self, i: int) -> Record:
+        record = Record(f"text {i}", url="https://example.com")
+        record.lang = 'en'
+        record.char_count = len(record.cleaned)
+        return record
+
+    def test_row_groups_are_bounded(self):
+        path = self.output_dir / 'shard.parquet'
+        writer = ParquetShardWriter(path, row_group_size=4)
+        records = [self._record(i) for i in range(10)]
+        for record in records:
+            writer.write_record(record)
+        writer.close()
+
+        parquet_file = pq.ParquetFile(path)
+        self.assertEqual(parquet_file.metadata.num_row_groups, 3)
+        self.assertEqual(tuple(parquet_file.schema_arrow.names), COLUMNS)
+        table = parquet_file.read()
+        self.assertEqual(table.column('id').to_pylist(), [record.id for record in records])
+        self.assertEqual(table.column('cleaned').to_pylist(), [record.cleaned for record in records])
+        self.assertEqual(table.column('token_count').to_pylist(), [None] * 10)
+
+    def test_record_writer_parquet_shards(self):
+        writer = RecordWriter(self.output_dir, shard_size=10, compression='zstd', output_format='parquet')
+        kept = []
+        for i in range(25):
+            record = self._record(i)
+            kept.append(record.id)
+            writer.write_record(record)
+        writer.close()
+
+        shard_paths = sorted((self.output_dir / 'shards').iterdir(), key=lambda p: int(p.stem.split('_')[1]))
+        self.assertEqual([p.name for p in shard_paths], ['shard_0.parquet', 'shard_1.parquet', 'shard_2.parquet'])
+        tables = [pq.read_table(p) for p in shard_paths]
+        self.assertEqual([table.num_rows for table in tables], [10, 10, 5])
+        self.assertEqual([i for table in tables for i in table.column('id').to_pylist()], kept)
+        self.assertTrue((self.output_dir / 'cleaned.jsonl.zst').exists())
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            RecordWriter(self.output_dir, shard_size=10, output_format='csv')
@@ -0,0 +1,125 @@
+import json
+import pickle
+import tempfile
+import unittest
+from pathlib import Path
+
+from pipelib.io.reader import JsonlReader, split_byte_ranges
+
+
+class TestJsonlReader(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp_dir.name) / 'input.jsonl'
+        lines = []
+        for i in range(200):
+            if i % 17 == 0:
+                lines.append('{"text": "broken')
+            elif i % 23 == 0:
+                lines.append(json.dumps({'text': '', 'url': 'https://example.com/empty'}))
+            else:
+                lines.append(json.dumps({'text': f'record number {i} café', 'url': f'https://example.com/{i}'}))
+        self.path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+        self.expected = [
+            (obj['text'], obj['url'])
+            for obj in (json.loads(line) for line in lines if not line.endswith('broken'))
+            if obj['text']
+        ]
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_split_byte_ranges_are_newline_aligned(self):
+        data = self.path.read_bytes()
+        ranges = list(split_byte_ranges(data, range_size=100))
+
+        self.assertEqual(ranges[0][0], 0)
+        self.assertEqual(ranges[-1][1], len(data))
+        for (_, end), (next_start, _) in zip(ranges, ranges[1:]):
+            self.assertEqual(end, next_start)
+            self.assertEqual(data[end - 1:end], b'\n')
+
+    def test_reads_records_in_order(self):
+        for workers in (1, 4):
+            for decoder in ('json', 'auto'):
+                with self.subTest(workers=workers, decoder=decoder):
+                    reader = JsonlReader(self.path, workers=workers, decoder=decoder, range_size=256)
+                    records = [(record.original, record.url) for record in reader]
+
+                    self.assertEqual(records, self.expected)
+                    self.assertEqual(reader.progress(), 1.0)
+
+    def test_keeps_lone_surrogates(self):
+        self.path.write_bytes(b'{"text": "abc \\ud83d end"}\n{"text": "ok"}\n')
+        for decoder in ('json', 'auto'):
+            with self.subTest(decoder=decoder):
+                reader = JsonlReader(self.path, decoder=decoder)
+
+                self.assertEqual([record.original for record in reader], ['abc \ud83d end', 'ok'])
+
+    def test_limit(self):
+        # The limit counts input lines, the broken line 0, line 17 and the empty line 23 included
+        for workers, range_size in ((1, 1 << 20), (4, 256)):
+            with self.subTest(workers=workers, range_size=range_size):
+                reader = JsonlReader(self.path, workers=workers, limit=30, range_size=range_size)
+                records = list(reader)
+
+                self.assertEqual([record.original for record in records], [text for text, _ in self.expected[:27]])
+                self.assertEqual(reader.progress(), 1.0)
+                self.assertEqual(reader.lines_read, 30)
+        self.assertLess(reader.bytes_read, reader.bytes_total)
+
+    def test_byte_ranges_partition_the_records(self):
+        data = self.path.read_bytes()
+        ranges = list(split_byte_ranges(data, range_size=700))
+        records = []
+        for byte_range in ranges:
+            reader = JsonlReader(self.path, workers=2, range_size=256, byte_range=byte_range)
+            records.extend((record.original, record.url) for record in reader)
+            self.assertEqual(reader.progress(), 1.0)
+            self.assertEqual(reader.bytes_read, byte_range[1] - byte_range[0])
+
+        self.assertGreater(len(ranges), 3)
+        self.assertEqual(records, self.expected)
+        with self.assertRaises(ValueError):
+            JsonlReader(self.path, codec='gzip', byte_range=ranges[0])
+
+    def test_empty_file(self):
+        self.path.write_bytes(b'')
+        self.assertEqual(list(JsonlReader(self.path)), [])
+
+    def test_original_is_read_back_from_the_input(self):
+        reader = JsonlReader(self.path, workers=2, range_size=256)
+        records = list(reader)
+
+        self.assertTrue(all(record._original is None for record in records))
+        for record in records:
+            record.cleaned = 'replaced'
+        self.assertEqual([(record.original, record.url) for record in records], self.expected)
+
+    def test_pickled_records_leave_the_input_behind(self):
+        records = list(JsonlReader(self.path, limit=3))
+        copies = pickle.loads(pickle.dumps(records))
+
+        self.assertEqual([(copy.id, copy.cleaned, copy.url) for copy in copies], [(record.id, record.cleaned, record.url) for record in records])
+        self.assertTrue(all(copy._source is None and copy.original is None for copy in copies))
+        copies[0].cleaned = 'replaced'
+        records[0].__setstate__(copies[0].__getstate__())
+        self.assertEqual((records[0].cleaned, records[0].original), ('replaced', self.expected[0][0]))
+
+    def test_sample_reads_whole_lines_in_each_stratum(self):
+        data = self.path.read_bytes()
+        samples = JsonlReader(self.path).sample(20, seed=3)
+        records = [record for record, _ in samples if record is not None]
+
+        self.assertEqual(len(samples), 20)
+        for record, length in samples:
+            if record is not None:
+                self.assertEqual(record.source_length, length)
+                self.assertEqual(json.loads(data[record.source_offset:record.source_offset + length])['text'], record.original)
+        offsets = [record.source_offset for record in records]
+        self.assertEqual(offsets, sorted(offsets))
+        self.assertEqual([record.source_offset for record, _ in JsonlReader(self.path).sample(20, seed=3) if record], offsets)
+        self.assertTrue(all((record.original, record.url) in self.expected for record in records))
+        with self.assertRaises(ValueError):
+            JsonlReader(self.path, codec='gzip').sample(5)
@@ -0,0 +1,68 @@
+import gzip
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from pipelib.io.reader import JsonlReader
+from pipelib.io.rehydrate import load_omit_log, rehydrate
+from pipelib.io.writer import RecordWriter
+
+
+class TestCompactOmitLog(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp_dir.name)
+        self.lines = [json.dumps({'text': f'record {i} naïve ' + 'z' * (i % 50), 'url': f'https://example.com/{i}'}) for i in range(500)]
+        self.lines[7] = '{"text": "broken'
+        data = ('\n'.join(self.lines) + '\n').encode('utf-8')
+        (self.dir / 'input.jsonl').write_bytes(data)
+        (self.dir / 'input.jsonl.gz').write_bytes(gzip.compress(data))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _run(self, input_name: str, output_dir: Path) -> dict[int, str]:
+        writer = RecordWriter(output_dir, shard_size=100, omit_log='compact', omit_sample_rate=0.5)
+        originals = {}
+        for record in JsonlReader(self.dir / input_name, workers=2, range_size=512):
+            if record.id % 3 == 0:
+                record.omit = True
+                record.omit_reason = 'too_short'
+                originals[record.id] = record.original
+                writer.write_omit(record)
+            else:
+                writer.write_record(record)
+        writer.close()
+        return originals
+
+    def test_rehydrate(self):
+        for input_name in ('input.jsonl', 'input.jsonl.gz'):
+            with self.subTest(input=input_name):
+                output_dir = self.dir / input_name.replace('.', '_')
+                originals = self._run(input_name, output_dir)
+
+                entries = load_omit_log(output_dir / 'omit_data.jsonl')
+                self.assertEqual([entry['id'] for entry in entries], sorted(originals))
+                self.assertTrue(all('original' not in entry for entry in entries))
+                rows = list(rehydrate(self.dir / input_name, entries))
+                self.assertEqual({row['id']: row['original'] for row in rows}, originals)
+                self.assertEqual({row['reason'] for row in rows}, {'too_short'})
+
+                some_ids = sorted(originals)[5:8]
+                rows = list(rehydrate(self.dir / input_name, load_omit_log(output_dir / 'omit_data.jsonl', some_ids)))
+                self.assertEqual([row['id'] for row in rows], some_ids)
+
+                samples = [json.loads(line) for line in (output_dir / 'omit_sample.jsonl').read_text(encoding='utf-8').splitlines()]
+                self.assertTrue(0 < len(samples) < len(originals))
+                self.assertTrue(all(sample['original'] == originals[sample['id']] for sample in samples))
+
+    def test_full_omit_log_is_rejected(self):
+        writer = RecordWriter(self.dir / 'full', shard_size=100)
+        for record in JsonlReader(self.dir / 'input.jsonl', limit=3):
+            record.omit_reason = 'too_short'
+            writer.write_omit(record)
+        writer.close()
+
+        with self.assertRaises(ValueError):
+            load_omit_log(self.dir / 'full' / 'omit_data.jsonl')
@@ -0,0 +1,66 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from pipelib.components.core.record import Record
+from pipelib.io.tokens import Tokenizer, TokenShardWriter, load_token_shard, token_dtype, train_tokenizer
+from pipelib.io.writer import RecordWriter
+
+TEXTS = [
+    "The quick brown fox jumps over the lazy dog.",
+    "Data pipelines clean, filter and deduplicate text before training.",
+    "Unicode survives the round trip: café, naïve, 東京, emoji 🚀.",
+    "",
+    "Numbers like 3.14159 and 2,718 are tokenized byte by byte when rare.",
+]
+
+
+@unittest.skipIf(Tokenizer is None, 'tokenizers is not installed')
+class TestTokenShards(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tokenizer = train_tokenizer(TEXTS * 20, vocab_size=400)
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.output_dir = Path(self.tmp_dir.name)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_token_dtype(self):
+        self.assertEqual(token_dtype(32_000), np.uint16)
+        self.assertEqual(token_dtype(65_536), np.uint16)
+        self.assertEqual(token_dtype(100_000), np.uint32)
+
+    def test_shard_round_trip(self):
+        writer = TokenShardWriter(self.output_dir / 'shard_0', self.tokenizer, batch_size=2)
+        for text in TEXTS:
+            writer.write_text(text)
+        writer.close()
+
+        tokens, offsets = load_token_shard(self.output_dir / 'shard_0')
+        self.assertEqual(tokens.dtype, np.uint16)
+        self.assertEqual(len(offsets), len(TEXTS) + 1)
+        self.assertEqual(int(offsets[-1]), writer.tokens_written)
+        for i, text in enumerate(TEXTS):
+            ids = tokens[offsets[i]:offsets[i + 1]].tolist()
+            self.assertEqual(ids, self.tokenizer.encode(text, add_special_tokens=False).ids)
+            self.assertEqual(self.tokenizer.decode(ids), text)
+
+    def test_record_writer_token_shards(self):
+        writer = RecordWriter(self.output_dir, shard_size=4, tokenizer=self.tokenizer)
+        for text in TEXTS * 2:
+            record = Record(text, url="https://example.com")
+            writer.write_record(record)
+        writer.close()
+
+        shard_dir = self.output_dir / 'shards'
+        counts = [len(load_token_shard(shard_dir / f'shard_{i}')[1]) - 1 for i in range(3)]
+        self.assertEqual(counts, [4, 4, 2])
+        self.assertEqual(
+            writer.stats()['tokens_written'],
+            sum(int(load_token_shard(shard_dir / f'shard_{i}')[1][-1]) for i in range(3)),
+        )
@@ -0,0 +1,93 @@
+import gzip
+import hashlib
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from pipelib.components.core.record import Record
+from pipelib.io.writer import RecordWriter
+
+
+class TestRecordWriter(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.output_dir = Path(self.tmp_dir.name)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _read_jsonl(self, path: Path) -> list[dict]:
+        return [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+
+    def test_writes_cleaned_shards_and_omits(self):
+        writer = RecordWriter(self.output_dir, shard_size=10, queue_size=4)
+        kept = []
+        for i in range(30):
+            record = Record(f"text {i}", url="https://example.com")
+            if i % 4 == 0:
+                record.omit = True
+                record.omit_reason = 'too_short'
+                writer.write_omit(record)
+            else:
+                kept.append(record.id)
+                writer.write_record(record)
+        writer.close()
+
+        self.assertEqual([row['id'] for row in self._read_jsonl(self.output_dir / 'cleaned.jsonl')], kept)
+        shards = [self._read_jsonl(self.output_dir / 'shards' / f'shard_{i}.jsonl') for i in range(3)]
+        self.assertEqual([len(shard) for shard in shards], [10, 10, 2])
+        self.assertEqual([row['id'] for shard in shards for row in shard], kept)
+        omits = self._read_jsonl(self.output_dir / 'omit_data.jsonl')
+        self.assertEqual([row['reason'] for row in omits], ['too_short'] * 8)
+
+        stats = writer.stats()
+        self.assertEqual(stats['records_written'], 22)
+        self.assertEqual(stats['omits_written'], 8)
+        self.assertEqual(stats['queue_depth'], 0)
+        self.assertLessEqual(stats['max_queue_depth'], 4)
+        self.assertEqual(
+            stats['bytes_written'],
+            2 * (self.output_dir / 'cleaned.jsonl').stat().st_size + (self.output_dir / 'omit_data.jsonl').stat().st_size,
+        )
+
+    def test_size_aware_shards_and_manifest(self):
+        writer = RecordWriter(self.output_dir, shard_size=1000, compression='gzip', shard_bytes=2000)
+        lines = []
+        for i in range(50):
+            record = Record(f"text {i} " + 'y' * (i * 5), url="https://example.com")
+            record.token_count = 2
+            lines.append(record.to_successful_jsonl())
+            writer.write_record(record)
+        writer.close()
+
+        manifest = json.loads((self.output_dir / 'manifest.json').read_text(encoding='utf-8'))
+        self.assertEqual(manifest['shard_by'], {'unit': 'bytes', 'target': 2000})
+        self.assertEqual(manifest['total_records'], 50)
+        self.assertEqual(manifest['total_tokens'], 100)
+        self.assertGreater(len(manifest['shards']), 2)
+        shard_files = sorted(p.name for p in (self.output_dir / 'shards').iterdir())
+        self.assertEqual(sorted(Path(shard['path']).name for shard in manifest['shards']), shard_files)
+
+        rows = []
+        for shard in manifest['shards']:
+            path = self.output_dir / shard['path']
+            self.assertEqual(shard['bytes'], path.stat().st_size)
+            self.assertEqual(shard['sha256'], hashlib.sha256(path.read_bytes()).hexdigest())
+            text = gzip.decompress(path.read_bytes()).decode('utf-8')
+            self.assertEqual(shard['uncompressed_bytes'], len(text))
+            shard_rows = text.splitlines(keepends=True)
+            self.assertEqual(shard['records'], len(shard_rows))
+            # A shard closes at the first record that reaches the target
+            self.assertLess(shard['uncompressed_bytes'] - len(shard_rows[-1]), 2000)
+            rows.extend(shard_rows)
+        self.assertEqual(rows, lines)
+
+    def test_no_empty_trailing_shard(self):
+        writer = RecordWriter(self.output_dir, shard_size=5)
+        for i in range(10):
+            writer.write_record(Record(f"text {i}", url="https://example.com"))
+        writer.close()
+
+        self.assertEqual(sorted(p.name for p in (self.output_dir / 'shards').iterdir()), ['shard_0.jsonl', 'shard_1.jsonl'])
+        self.assertEqual(writer.stats()['shards'], 2)
@@ -3,7 +3,9 @@ from pathlib import Path
 
 from pipelib.components.core.settings import PipelineConfig
 from pipelib.components.core.record import Record
-from pipelib.components.modifiers.attribute_evaluate import AttributeEvaluationStep
+from pipelib.components.modifiers.attribute_evaluate import (
+    AttributeEvaluationStep, compute_char_counts, compute_char_counts_reference,
+)
 
 
 class TestAttributeEvaluationStep(unittest.TestCase):
@@ -18,4 +20,15 @@ class TestAttributeEvaluationStep(unittest.TestCase):
         self.assertEqual(record.char_count, len("Hi there!!!"))
         self.assertEqual(record.token_count, 2)
         self.assertAlmostEqual(record.ascii_ratio, 1.0)
-        self.assertAlmostEqual(record.symbol_ratio, 3 / len("Hi there!!!"))
\ No newline at end of file
+        self.assertAlmostEqual(record.symbol_ratio, 3 / len("Hi there!!!"))
+
+    def test_char_counts_match_reference_implementation(self):
+        samples = [
+            "",
+            "Hi there!!!",
+            "caf\u00e9 \u00bfqu\u00e9? \u4e2d\u6587\u3002 \u2014 \u00a0nbsp \U0001d518\U0001f600",
+            "\u212a\u0130 \ud800 \x00\x1f\t\n",
+        ]
+        for text in samples:
+            with self.subTest(text=text):
+                self.assertEqual(compute_char_counts(text), compute_char_counts_reference(text))
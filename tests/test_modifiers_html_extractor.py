@@ -1,9 +1,21 @@
 import unittest
+import threading
 from pathlib import Path
 
 from pipelib.components.core.settings import PipelineConfig
 from pipelib.components.core.record import Record
-from pipelib.components.modifiers.html_extractor import HTMLExtractorModifier
+from pipelib.components.modifiers.html_extractor import (
+    HTMLExtractorModifier, CleanHTMLParser, LxmlCleanHTMLParser, etree, resolve_parser_class,
+)
+
+SAMPLE_DOCUMENTS = [
+    "<html><body><nav>Menu</nav><p>Hello <a href=\"#\">world</a>!</p><div class=\"ad\">Buy now</div></body></html>",
+    "<p>Question &amp; answer: is the <b>service</b>&nbsp;running?</p><blockquote><p>How often?</p></blockquote>"
+    "<pre><code>/etc/cron.daily</code></pre><ul><li>one</li><li>two &#169; &#x41;</li></ul>",
+    "<div><h2>Title</h2><table><tr><td>a</td><td>b</td></tr></table><script>var x = 1;</script>tail</div>",
+    "<p>unclosed paragraph <p>another <em>emphasis",
+    "<!-- comment --><div id='sidebar'>side</div><p>after</p>",
+]
 
 
 class TestHTMLExtractorModifier(unittest.TestCase):
@@ -32,3 +44,38 @@ class TestHTMLExtractorModifier(unittest.TestCase):
 
         self.assertFalse(record.html_extracted)
         self.assertEqual(record.cleaned, "Just plain text")
+
+    @unittest.skipIf(etree is None, "lxml is not installed")
+    def test_backends_are_equivalent(self):
+        stdlib_parser = CleanHTMLParser()
+        lxml_parser = LxmlCleanHTMLParser()
+        for html in SAMPLE_DOCUMENTS:
+            with self.subTest(html=html):
+                self.assertEqual(
+                    HTMLExtractorModifier._post_process(lxml_parser.extract_text(html)),
+                    HTMLExtractorModifier._post_process(stdlib_parser.extract_text(html)),
+                )
+
+    @unittest.skipIf(etree is None, "lxml is not installed")
+    def test_backend_differences(self):
+        # Documented on LxmlCleanHTMLParser, the reason 'auto' is not lxml
+        for html, stdlib_text, lxml_text in (
+            ('<p>a<div>b</div>c</p>', 'ab\nc', 'a\nb\nc'),
+            ('<p>a <!-- c --> b</p>', 'ab', 'a b'),
+        ):
+            with self.subTest(html=html):
+                self.assertEqual(HTMLExtractorModifier._post_process(CleanHTMLParser().extract_text(html)), stdlib_text)
+                self.assertEqual(HTMLExtractorModifier._post_process(LxmlCleanHTMLParser().extract_text(html)), lxml_text)
+
+    def test_auto_backend_is_stdlib(self):
+        self.assertIs(resolve_parser_class('auto'), CleanHTMLParser)
+
+    def test_parser_per_thread(self):
+        modifier = HTMLExtractorModifier(PipelineConfig(input_path=Path(''), output_dir=Path(''), html_backend='stdlib'))
+        parsers = []
+        thread = threading.Thread(target=lambda: parsers.append(modifier.parser))
+        thread.start()
+        thread.join()
+
+        self.assertIs(modifier.parser, modifier.parser)
+        self.assertIsNot(modifier.parser, parsers[0])
@@ -3,7 +3,7 @@ from pathlib import Path
 
 from pipelib.components.core.settings import PipelineConfig
 from pipelib.components.core.record import Record
-from pipelib.components.modifiers.normalize import NormalizeModifier
+from pipelib.components.modifiers.normalize import NormalizeModifier, normalize_text, normalize_text_reference
 
 
 class TestNormalizeModifier(unittest.TestCase):
@@ -16,4 +16,16 @@ class TestNormalizeModifier(unittest.TestCase):
 
         modifier.process(record)
 
-        self.assertEqual(record.cleaned, "Hello\"world\" & test \nNext")
\ No newline at end of file
+        self.assertEqual(record.cleaned, "Hello\"world\" & test \nNext")
+
+    def test_matches_reference_implementation(self):
+        samples = [
+            "",
+            "plain ascii text",
+            "tabs\t\tand  spaces \t mixed\n\n\n\nlines \n \n",
+            "&lt;b&gt; &#11;entity control&#x201c;quoted&#x201d; &amp;amp;",
+            "\x00\x01nul\x7f \u2018single\u2019 caf\u00e9 \U0001d518 \ud800",
+        ]
+        for text in samples:
+            with self.subTest(text=text):
+                self.assertEqual(normalize_text(text), normalize_text_reference(text))
@@ -3,7 +3,7 @@ from pathlib import Path
 
 from pipelib.components.core.settings import PipelineConfig
 from pipelib.components.core.record import Record
-from pipelib.components.modifiers.pii import PIIModifier
+from pipelib.components.modifiers.pii import PIIModifier, split_into_chunks
 
 
 class TestPIIModifier(unittest.TestCase):
@@ -26,4 +26,47 @@ class TestPIIModifier(unittest.TestCase):
         self.assertIn('<EMAIL_ADDRESS>', record.cleaned)
         self.assertNotIn('John Doe', record.cleaned)
         self.assertNotIn('john@example.com', record.cleaned)
-        self.assertNotIn('<PHONE_NUMBER>', record.cleaned)
\ No newline at end of file
+        self.assertNotIn('<PHONE_NUMBER>', record.cleaned)
+
+    def test_split_into_chunks_covers_text(self):
+        text = "Alice met Bob in Paris. They talked for hours.\n\nLater, Carol called Dave. " * 20
+        spans = split_into_chunks(text, chunk_size=200, overlap=40)
+
+        self.assertGreater(len(spans), 1)
+        self.assertEqual(spans[0][0], 0)
+        self.assertEqual(spans[-1][1], len(text))
+        for (start, end), (next_start, next_end) in zip(spans, spans[1:]):
+            self.assertLessEqual(end - start, 200)
+            self.assertLess(start, next_start)
+            self.assertLessEqual(next_start, end)
+
+    def test_close_shuts_down_chunk_executor(self):
+        modifier = PIIModifier(PipelineConfig(Path('in.jsonl'), Path('out'), workers=2))
+        executor = modifier._chunk_executor
+
+        modifier.close()
+
+        self.assertIsNone(modifier._chunk_executor)
+        with self.assertRaises(RuntimeError):
+            executor.submit(len, 'text')
+
+    def test_chunked_anonimize_matches_whole_document(self):
+        paragraphs = [
+            "John Doe can be reached at john@example.com or 212-555-0187.",
+            "Maria Garcia moved from Madrid to Chicago last year.",
+            "The server at 192.168.0.12 was configured by Ahmed Khan.",
+            "Nothing sensitive is mentioned in this paragraph at all.",
+        ]
+        text = "\n\n".join(paragraphs * 15)
+        whole_config = PipelineConfig(input_path=Path(''), output_dir=Path(''), workers=1, pii_chunk_size=len(text))
+        chunked_config = PipelineConfig(
+            input_path=Path(''), output_dir=Path(''), workers=2, pii_chunk_size=300, pii_chunk_overlap=60,
+        )
+        whole_record = Record(text, url="https://example.com")
+        chunked_record = Record(text, url="https://example.com")
+
+        PIIModifier(whole_config).anonimize(whole_record)
+        PIIModifier(chunked_config).anonimize(chunked_record)
+
+        self.assertTrue(chunked_record.anonymized)
+        self.assertEqual(chunked_record.cleaned, whole_record.cleaned)
@@ -0,0 +1,73 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from pipelib.components.core.settings import PipelineConfig
+from pipelib.io.reader import JsonlReader
+from pipelib.io.rehydrate import load_omit_log, rehydrate
+from pipelib.io.scores import load_scores
+from pipelib.refilter import refilter
+from tests.fixtures import run_scored, write_scored_corpus
+
+
+class TestRefilter(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp_dir.name)
+        self.input_path = self.dir / 'input.jsonl'
+        write_scored_corpus(self.input_path, 400)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _run(self, output_dir: Path, **thresholds) -> tuple[list[str], dict[int, str]]:
+        """Run the pipeline, returning the kept texts and the omit reasons by input offset."""
+        run_scored(PipelineConfig(self.input_path, output_dir, workers=1, **thresholds), shard_size=50, omit_log='compact')
+        return self._outputs(output_dir)
+
+    def _outputs(self, output_dir: Path) -> tuple[list[str], dict[int, str]]:
+        # Record ids differ between runs, input offsets do not
+        kept = [json.loads(line)['cleaned'] for line in (output_dir / 'cleaned.jsonl').read_text(encoding='utf-8').splitlines()]
+        omitted = {entry['offset']: entry['reason'] for entry in load_omit_log(output_dir / 'omit_data.jsonl')}
+        return kept, omitted
+
+    def test_scores_are_written_for_every_record(self):
+        kept, omitted = self._run(self.dir / 'run', toxicity_threshold=0.6)
+        table, metadata = load_scores(self.dir / 'run' / 'scores.parquet')
+        rows = {row['source_offset']: row for row in table.to_pylist()}
+        kept_rows = [row for row in rows.values() if row['omit_reason'] is None]
+
+        self.assertEqual(len(rows), 400)
+        self.assertEqual({offset: row['omit_reason'] for offset, row in rows.items() if row['omit_reason']}, omitted)
+        self.assertEqual(len(kept_rows), len(kept))
+        self.assertTrue(all(row['toxicity'] is not None and row['toxicity'] <= 0.6 for row in kept_rows))
+        self.assertTrue(all(rows[offset]['toxicity'] is None for offset, reason in omitted.items() if reason == 'too_short'))
+        self.assertEqual(metadata['steps'][-1], 'pipelib.components.filters.toxicity.ToxicityFilter')
+        self.assertEqual(metadata['config']['toxicity_threshold'], 0.6)
+
+    def test_refilter_matches_a_full_run(self):
+        self._run(self.dir / 'run', toxicity_threshold=0.6, min_char_len=50)
+        expected = self._run(self.dir / 'strict', toxicity_threshold=0.4, min_char_len=80)
+
+        insights = refilter(self.dir / 'run', self.dir / 'refiltered', toxicity_threshold=0.4, min_char_len=80)
+
+        self.assertEqual(self._outputs(self.dir / 'refiltered'), expected)
+        self.assertEqual(insights['reprocess'], 0)
+
+    def test_looser_thresholds_list_records_to_reprocess(self):
+        kept, omitted = self._run(self.dir / 'run', toxicity_threshold=0.4, min_char_len=80)
+
+        insights = refilter(self.dir / 'run', self.dir / 'loose', toxicity_threshold=0.6, min_char_len=50)
+        loose_kept, loose_omitted = self._outputs(self.dir / 'loose')
+        entries = load_omit_log(self.dir / 'loose' / 'reprocess.jsonl')
+
+        self.assertEqual(loose_kept, kept)
+        self.assertEqual(insights['reprocess'], len(entries))
+        self.assertGreater(len(entries), 0)
+        self.assertEqual(set(loose_omitted) | {entry['offset'] for entry in entries}, set(omitted))
+        self.assertTrue(all(entry['reason'] == omitted[entry['offset']] for entry in entries))
+        self.assertEqual({entry['reason'] for entry in entries}, {'toxic_content', 'too_short'})
+        originals = {record.source_offset: record.original for record in JsonlReader(self.input_path)}
+        offsets = {entry['id']: entry['offset'] for entry in entries}
+        self.assertTrue(all(row['original'] == originals[offsets[row['id']]] for row in rehydrate(self.input_path, entries)))
@@ -0,0 +1,64 @@
+import tempfile
+import unittest
+from collections import Counter
+from pathlib import Path
+
+from pipelib.components.core.settings import PipelineConfig
+from pipelib.sweep import evaluate_sweep, format_sweep, loosest_config, parse_grid, select_variant, sweep_variants
+from tests.fixtures import run_scored, write_scored_corpus
+
+
+class TestSweep(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp_dir.name)
+        self.input_path = self.dir / 'input.jsonl'
+        write_scored_corpus(self.input_path, 300)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_parse_grid(self):
+        grid = parse_grid(['min_char_len=50,100', 'toxicity-threshold=0.5,0.7,0.9', 'require_english=true,false'])
+
+        self.assertEqual(grid, {'min_char_len': [50, 100], 'toxicity_threshold': [0.5, 0.7, 0.9], 'require_english': [True, False]})
+        self.assertEqual(len(sweep_variants(grid)), 12)
+        with self.assertRaises(ValueError):
+            parse_grid(['workers=1,2'])
+
+    def test_loosest_config_detects_the_language_some_variants_require(self):
+        config = PipelineConfig(self.input_path, self.dir / 'base')
+        variants = sweep_variants({'require_english': [True, False], 'min_char_len': [50, 80]})
+
+        base_config = loosest_config(config, variants)
+
+        self.assertEqual((base_config.require_english, base_config.detect_language), (False, True))
+        self.assertFalse(loosest_config(config, sweep_variants({'require_english': [False]})).detect_language)
+
+    def test_select_variant(self):
+        variants = sweep_variants({'min_char_len': [50, 80, 120]})
+
+        self.assertEqual(select_variant(variants, 2), {'min_char_len': 120})
+        for index in (3, -1):
+            with self.assertRaises(IndexError):
+                select_variant(variants, index)
+
+    def test_variants_match_separate_runs(self):
+        variants = sweep_variants({'min_char_len': [50, 80, 120], 'toxicity_threshold': [0.4, 0.6]})
+        config = PipelineConfig(self.input_path, self.dir / 'base', workers=1, debug_info=True)
+        base_config = loosest_config(config, variants)
+        self.assertEqual((base_config.min_char_len, base_config.toxicity_threshold), (50, 0.6))
+        pipeline = run_scored(base_config, shard_size=100)
+        step_seconds = [elapsed / calls if calls else 0.0 for elapsed, calls, _ in pipeline.step_call_insights]
+
+        results = evaluate_sweep(self.dir / 'base', variants, step_seconds)
+
+        for idx, (variant, result) in enumerate(zip(variants, results)):
+            with self.subTest(variant=variant):
+                run = run_scored(PipelineConfig(self.input_path, self.dir / f'variant_{idx}', workers=1, **variant), shard_size=100)
+                self.assertEqual(result['kept'], 300 - run.omit_reasons.total())
+                self.assertEqual(Counter(result['omit_reasons']), run.omit_reasons)
+                self.assertEqual(result['undetermined'], 0)
+        estimates = [result['estimated_step_seconds'] for result in results]
+        self.assertTrue(estimates[0] >= estimates[2] >= estimates[4] > 0)
+        self.assertIn('min_char_len=120 toxicity_threshold=0.6', format_sweep(results))